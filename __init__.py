@@ -1 +0,0 @@
-touch __init__.py
\ No newline at end of file
@@ -0,0 +1,267 @@
+# benchmarks/bench_parser.py - офлайн-замеры парсера, дедупликации и обхода
+#
+# Запуск:  python -m benchmarks.bench_parser --json bench.json
+# Сравнение с прошлым прогоном:  python -m benchmarks.bench_parser --compare bench.json
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+from typing import List, Dict, Any, Callable
+
+from bs4 import BeautifulSoup
+
+from benchmarks.fake_portal import FakePortal
+from benchmarks.synthetic import listing_page
+from parsers.extractors import EXTRACTORS
+from parsers.web_parser import WebParser
+
+FIXTURES_DIR = Path(__file__).parent / 'fixtures'
+ORG_NAME = WebParser.ORGANIZATION_NAMES['federal']
+CURRENT_URL = WebParser.SOURCE_URLS['federal']
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Перцентиль по методу ближайшего ранга"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def measure(func: Callable[[], Any], repeat: int, items_per_call: int) -> Dict[str, Any]:
+    """Время каждого вызова, перцентили, пропускная способность и пиковая память"""
+    func()  # прогрев
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    total = sum(timings)
+    return {
+        'calls': repeat,
+        'items_per_call': items_per_call,
+        'items_per_sec': round(items_per_call * repeat / total, 1) if total else None,
+        'p50_ms': round(percentile(timings, 50) * 1000, 3),
+        'p95_ms': round(percentile(timings, 95) * 1000, 3),
+        'p99_ms': round(percentile(timings, 99) * 1000, 3),
+        'mean_ms': round(statistics.mean(timings) * 1000, 3),
+        'peak_kb': round(peak / 1024, 1),
+    }
+
+
+def load_pages(sizes: List[int]) -> Dict[str, str]:
+    """Записанные страницы из fixtures/ и синтетические страницы заданных размеров"""
+    pages = {}
+    for path in sorted(FIXTURES_DIR.glob('*.html')):
+        pages[f"fixture:{path.stem}"] = path.read_text(encoding='utf-8')
+    for size in sizes:
+        pages[f"synthetic:{size}"] = listing_page(size, page=1, pages=2, seed=size)
+    return pages
+
+
+def bench_parse_page(pages: Dict[str, str], repeat: int) -> Dict[str, Any]:
+    results = {}
+    for backend in EXTRACTORS:
+        parser = WebParser(limit=10 ** 9, extractor=backend)
+        if parser.extractor.name != backend:
+            continue  # движок недоступен (например, нет lxml)
+        for name, html in pages.items():
+            docs_count = len(parser.process_page(html, CURRENT_URL, ORG_NAME)[0])
+            results[f"parse_page[{backend}]:{name}"] = measure(
+                lambda: parser.process_page(html, CURRENT_URL, ORG_NAME), repeat, docs_count
+            )
+    return results
+
+
+def bench_soup_helpers(pages: Dict[str, str], repeat: int) -> Dict[str, Any]:
+    results = {}
+    parser = WebParser(limit=10 ** 9, extractor='soup')
+    for name, html in pages.items():
+        soup = BeautifulSoup(html, 'html.parser')
+        containers = soup.find_all('div', class_=['document-item', 'doc-item'])
+        if containers:
+            results[f"extract_document_from_container:{name}"] = measure(
+                lambda: [parser.extract_document_from_container(c, ORG_NAME) for c in containers],
+                repeat, len(containers)
+            )
+        results[f"find_next_page:{name}"] = measure(
+            lambda: parser.find_next_page(soup, CURRENT_URL), repeat, 1
+        )
+    return results
+
+
+def bench_add_documents(archive_sizes: List[int], batch: int, repeat: int) -> Dict[str, Any]:
+    """Путь add_documents: архив archive_size документов, пакет из batch (половина новых)"""
+    import database
+
+    results = {}
+    for backend in ('json', 'sqlite', 'log'):
+        for archive_size in archive_sizes:
+            with tempfile.TemporaryDirectory() as tmp:
+                database.USERS_FILE = os.path.join(tmp, 'users.json')
+                database.DOCUMENTS_DB_FILE = os.path.join(tmp, 'documents.json')
+                database.SQLITE_DB_FILE = os.path.join(tmp, 'bot.db')
+                database.DOCUMENTS_LOG_FILE = os.path.join(tmp, 'documents.jsonl')
+                database.USERS_LOG_FILE = os.path.join(tmp, 'users.jsonl')
+                database.SUBSCRIPTIONS_FILE = os.path.join(tmp, 'subscriptions.json')
+                storage = database.create_storage(backend)
+                database.set_storage(storage)
+
+                archive = [_document(i) for i in range(archive_size)]
+                storage.save_documents(archive)
+                counter = [archive_size]
+
+                def add_batch():
+                    start = counter[0] - batch // 2
+                    database.add_documents([_document(i) for i in range(start, start + batch)])
+                    counter[0] += batch - batch // 2
+
+                results[f"add_documents[{backend}]:archive={archive_size}"] = measure(add_batch, repeat, batch)
+                storage.close()
+    database._storage = None
+    return results
+
+
+def _document(number: int) -> Dict[str, Any]:
+    return {
+        "organization": ORG_NAME,
+        "documentTitle": f"Приказ № {number}",
+        "url": f"http://publication.pravo.gov.ru/Document/View/{number:016d}",
+        "publishDate": "01.01.2024",
+    }
+
+
+def bench_crawl(pages: int, documents_per_page: int, latency: float) -> Dict[str, Any]:
+    """Полный обход трех ведомств через локальный стенд"""
+    from parsers.async_parser import AsyncWebParser
+
+    async def run() -> Dict[str, Any]:
+        portal = FakePortal(pages, documents_per_page, latency)
+        await portal.start()
+        results = {}
+        try:
+            limit = pages * documents_per_page
+            sync_parser = portal.attach(WebParser(limit=limit))
+            portal.requests = 0
+            started = time.perf_counter()
+            docs = await asyncio.to_thread(sync_parser.get_documents)
+            elapsed = time.perf_counter() - started
+            results['crawl[sync]'] = _crawl_result(docs, elapsed, portal.requests)
+
+            async_parser = portal.attach(AsyncWebParser(limit=limit))
+            portal.requests = 0
+            started = time.perf_counter()
+            docs = await async_parser.get_documents()
+            elapsed = time.perf_counter() - started
+            await async_parser.close()
+            results['crawl[async]'] = _crawl_result(docs, elapsed, portal.requests)
+        finally:
+            await portal.stop()
+        return results
+
+    return asyncio.run(run())
+
+
+def _crawl_result(docs: List[Dict[str, Any]], elapsed: float, requests: int) -> Dict[str, Any]:
+    return {
+        'documents': len(docs),
+        'requests': requests,
+        'elapsed_s': round(elapsed, 3),
+        'items_per_sec': round(len(docs) / elapsed, 1) if elapsed else None,
+    }
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any]):
+    """Печатает изменение ключевых метрик относительно прошлого прогона"""
+    print("\nСравнение с базовым прогоном (>1.00 - быстрее):")
+    for name, metrics in current['results'].items():
+        base = baseline.get('results', {}).get(name)
+        if not base:
+            continue
+        if metrics.get('items_per_sec') and base.get('items_per_sec'):
+            ratio = metrics['items_per_sec'] / base['items_per_sec']
+            marker = '⚠️ ' if ratio < 0.9 else ''
+            print(f"  {marker}{name}: {ratio:.2f}x")
+
+
+def record_fixtures():
+    """Сохраняет текущие первые страницы источников в fixtures/"""
+    parser = WebParser()
+    for key, url in parser.SOURCE_URLS.items():
+        response = parser.session.get(url, timeout=30)
+        response.raise_for_status()
+        path = FIXTURES_DIR / f"{key}_recorded.html"
+        path.write_text(response.text, encoding='utf-8')
+        print(f"💾 {url} -> {path}")
+
+
+def main():
+    cli = argparse.ArgumentParser(description="Замеры производительности парсера")
+    cli.add_argument('--sizes', default='100,1000,5000', help='размеры синтетических страниц')
+    cli.add_argument('--repeat', type=int, default=20)
+    cli.add_argument('--archive-sizes', default='1000,20000')
+    cli.add_argument('--batch', type=int, default=100)
+    cli.add_argument('--crawl-pages', type=int, default=10)
+    cli.add_argument('--crawl-latency', type=float, default=0.05)
+    cli.add_argument('--skip-crawl', action='store_true')
+    cli.add_argument('--json', help='куда записать результаты в JSON')
+    cli.add_argument('--compare', help='JSON прошлого прогона для сравнения')
+    cli.add_argument('--record', action='store_true', help='записать живые страницы в fixtures/')
+    args = cli.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    if args.record:
+        record_fixtures()
+        return
+
+    pages = load_pages([int(size) for size in args.sizes.split(',') if size])
+    results = {}
+    results.update(bench_parse_page(pages, args.repeat))
+    results.update(bench_soup_helpers(pages, args.repeat))
+    results.update(bench_add_documents(
+        [int(size) for size in args.archive_sizes.split(',') if size], args.batch, max(3, args.repeat // 4)
+    ))
+    if not args.skip_crawl:
+        results.update(bench_crawl(args.crawl_pages, 30, args.crawl_latency))
+
+    report = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'python': sys.version.split()[0],
+            'platform': platform.platform(),
+            'repeat': args.repeat,
+        },
+        'results': results,
+    }
+
+    for name, metrics in results.items():
+        print(f"{name:70s} " + ' '.join(f"{k}={v}" for k, v in metrics.items()))
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\n💾 Результаты записаны в {args.json}")
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            compare(report, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+# benchmarks/fake_portal.py - локальная замена publication.pravo.gov.ru для замеров
+import argparse
+import asyncio
+import logging
+import zlib
+from dataclasses import replace
+from typing import Dict, Tuple
+
+from aiohttp import web
+
+from benchmarks.synthetic import listing_page
+
+logger = logging.getLogger(__name__)
+
+DEPARTMENTS = {
+    "federal": "262",
+    "regional": "39ec279e-970f-43c0-85b7-4aba57163bb7",
+    "rosobrnadzor": "320",
+}
+
+
+class FakePortal:
+    """aiohttp-сервер с листингами ведомств и счетчиком запросов"""
+
+    def __init__(self, pages: int = 10, documents_per_page: int = 30, latency: float = 0.05):
+        self.pages = pages
+        self.documents_per_page = documents_per_page
+        self.latency = latency
+        self.requests = 0
+        self._cache: Dict[Tuple[str, int], str] = {}
+        self._runner = None
+        self.base_url = None
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get('/Department/View/{department}', self.department)
+        app.router.add_get('/Document/View/{document}', self.document)
+        return app
+
+    async def department(self, request: web.Request) -> web.Response:
+        self.requests += 1
+        await asyncio.sleep(self.latency)
+        department = request.match_info['department']
+        page = int(request.query.get('page', '1'))
+        if page > self.pages:
+            return web.Response(status=404)
+
+        key = (department, page)
+        if key not in self._cache:
+            seed = zlib.crc32(department.encode()) % 10000 * 100 + page
+            self._cache[key] = listing_page(self.documents_per_page, page, self.pages, seed=seed,
+                                            path=request.path)
+        return web.Response(text=self._cache[key], content_type='text/html')
+
+    async def document(self, request: web.Request) -> web.Response:
+        self.requests += 1
+        await asyncio.sleep(self.latency)
+        document = request.match_info['document']
+        return web.Response(
+            text=(
+                '<html><body><div class="document-card">'
+                f'<h1>Документ {document}</h1>'
+                '<dl><dt>Вид документа:</dt><dd>Приказ</dd>'
+                f'<dt>Номер документа:</dt><dd>{document[-4:]}</dd>'
+                '<dt>Дата подписания:</dt><dd>01.02.2024</dd></dl>'
+                f'<a href="/file/pdf?eoNumber={document}">Скачать PDF</a>'
+                '</div></body></html>'
+            ),
+            content_type='text/html'
+        )
+
+    async def start(self, host: str = '127.0.0.1', port: int = 0) -> str:
+        """Запускает сервер и возвращает его базовый URL"""
+        self._runner = web.AppRunner(self.app())
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        sockets = site._server.sockets
+        bound_port = sockets[0].getsockname()[1] if sockets else port
+        self.base_url = f"http://{host}:{bound_port}"
+        return self.base_url
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    def source_urls(self) -> Dict[str, str]:
+        """SOURCE_URLS парсера, направленные на этот сервер"""
+        return {
+            key: f"{self.base_url}/Department/View/{department}?sort=PublicationDate_desc&page=1"
+            for key, department in DEPARTMENTS.items()
+        }
+
+    def attach(self, parser):
+        """Перенаправляет экземпляр парсера на этот сервер"""
+        parser.BASE_URL = self.base_url
+        urls = self.source_urls()
+        parser.set_sources([
+            replace(source, url=urls[key]) for key, source in parser.sources.items() if key in urls
+        ])
+        return parser
+
+
+async def _serve(args):
+    portal = FakePortal(args.pages, args.documents, args.latency)
+    base_url = await portal.start(args.host, args.port)
+    logger.info(f"🧪 Тестовый портал: {base_url}")
+    for key, url in portal.source_urls().items():
+        logger.info(f"   {key}: {url}")
+    await asyncio.Event().wait()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    cli = argparse.ArgumentParser(description="Локальный стенд листингов pravo.gov.ru")
+    cli.add_argument('--host', default='127.0.0.1')
+    cli.add_argument('--port', type=int, default=8080)
+    cli.add_argument('--pages', type=int, default=10)
+    cli.add_argument('--documents', type=int, default=30)
+    cli.add_argument('--latency', type=float, default=0.05)
+    asyncio.run(_serve(cli.parse_args()))
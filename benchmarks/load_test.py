@@ -0,0 +1,365 @@
+# benchmarks/load_test.py - нагрузочный прогон обработчиков бота на локальном Bot API
+#
+# Запуск:  python -m benchmarks.load_test --storage json --chats 2000 --rate 300 --duration 20
+# Все хранилища подряд:  python -m benchmarks.load_test --storage json,sqlite,log --json load.json
+#
+# Bot из aiogram направлен на FakeBotAPI (ответы на sendMessage и т.п. без токена),
+# апдейты подаются в тот же Dispatcher, что и в main.py (create_dispatcher),
+# а обход источников для /update идет на FakePortal.
+import argparse
+import asyncio
+import itertools
+import json
+import logging
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from aiogram import Bot
+from aiogram.client.default import DefaultBotProperties
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+from aiogram.types import Update
+from aiohttp import web
+
+import database
+from benchmarks.bench_parser import percentile
+from benchmarks.fake_portal import FakePortal
+from benchmarks.post_updates import message_update
+from bot.broadcast import Broadcaster
+from bot.middlewares import ConcurrencyLimitMiddleware
+from bot.pagination import DocsPage
+from main import create_dispatcher, create_refresher
+from metrics import metrics
+from parsers.async_parser import AsyncWebParser
+from search.index import SearchIndex
+
+logger = logging.getLogger(__name__)
+
+TOKEN = "123456:LOADTEST"
+
+# Команда -> доля в потоке апдейтов
+DEFAULT_MIX = "start=2,stats=2,docs=4,docs_page=3,search=2,help=1,update=0.05"
+
+COMMAND_TEXTS = {
+    "start": "/start",
+    "stats": "/stats",
+    "docs": "/docs",
+    "docs_source": "/docs federal",
+    "search": "/search приказ аттестация",
+    "help": "/help",
+    "subscribe": "/subscribe federal",
+    "update": "/update",
+}
+
+_message_ids = itertools.count(1)
+
+
+class FakeBotAPI:
+    """aiohttp-сервер с методами Bot API, которые вызывают обработчики
+
+    На каждый вызов отвечает правдоподобным результатом (Message, True, User)
+    через latency секунд и считает вызовы по методам.
+    """
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.calls: Dict[str, int] = {}
+        self._runner = None
+        self.base_url = None
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post('/bot{token}/{method}', self.handle)
+        return app
+
+    async def handle(self, request: web.Request) -> web.Response:
+        method = request.match_info['method']
+        self.calls[method] = self.calls.get(method, 0) + 1
+        data = await request.post()
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return web.json_response({"ok": True, "result": self.result(method.lower(), data)})
+
+    @staticmethod
+    def result(method: str, data) -> Any:
+        if method == "getme":
+            return {"id": 123456, "is_bot": True, "first_name": "Load", "username": "load_test_bot"}
+        if method in ("sendmessage", "editmessagetext"):
+            chat_id = int(data.get("chat_id", 0))
+            return {
+                "message_id": int(data.get("message_id") or next(_message_ids)),
+                "date": int(time.time()),
+                "chat": {"id": chat_id, "type": "private"},
+                "text": data.get("text", ""),
+            }
+        return True
+
+    async def start(self, host: str = '127.0.0.1', port: int = 0) -> str:
+        """Запускает сервер и возвращает его базовый URL"""
+        self._runner = web.AppRunner(self.app(), access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        sockets = site._server.sockets
+        bound_port = sockets[0].getsockname()[1] if sockets else port
+        self.base_url = f"http://{host}:{bound_port}"
+        return self.base_url
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+
+class LoopLagMonitor:
+    """Задержка event loop: насколько позже заказанного просыпается sleep(interval)"""
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.lags: List[float] = []
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(self.interval)
+            self.lags.append(max(0.0, loop.time() - started - self.interval))
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            'p50_ms': round(percentile(self.lags, 50) * 1000, 2),
+            'p99_ms': round(percentile(self.lags, 99) * 1000, 2),
+            'max_ms': round(max(self.lags, default=0.0) * 1000, 2),
+        }
+
+
+def callback_update(chat_id: int, data: str) -> Dict[str, Any]:
+    """Апдейт с нажатием inline-кнопки под сообщением бота"""
+    update = message_update(chat_id, "")
+    message = update.pop("message")
+    message["from"] = {"id": 123456, "is_bot": True, "first_name": "Load"}
+    update["callback_query"] = {
+        "id": str(update["update_id"]),
+        "from": {"id": chat_id, "is_bot": False, "first_name": "Load"},
+        "chat_instance": str(chat_id),
+        "message": message,
+        "data": data,
+    }
+    return update
+
+
+def synthetic_update(command: str, chat_id: int, rnd: random.Random) -> Dict[str, Any]:
+    if command == "docs_page":
+        return callback_update(chat_id, DocsPage(page=rnd.randint(1, 20)).pack())
+    return message_update(chat_id, COMMAND_TEXTS[command])
+
+
+def parse_mix(mix: str) -> Tuple[List[str], List[float]]:
+    commands, weights = [], []
+    for item in mix.split(','):
+        name, _, weight = item.partition('=')
+        name = name.strip()
+        if name != "docs_page" and name not in COMMAND_TEXTS:
+            raise ValueError(f"Неизвестная команда в --mix: {name}")
+        commands.append(name)
+        weights.append(float(weight or 1))
+    return commands, weights
+
+
+def _document(number: int, rnd: random.Random, organizations: List[str]) -> Dict[str, Any]:
+    return {
+        "organization": rnd.choice(organizations),
+        "documentTitle": f"Приказ № {number} «Об аттестации педагогических работников»",
+        "url": f"http://publication.pravo.gov.ru/Document/View/{number:016d}",
+        "publishDate": f"{rnd.randint(1, 28):02d}.{rnd.randint(1, 12):02d}.{rnd.randint(2015, 2024)}",
+    }
+
+
+def use_temp_storage(backend: str, tmp: str):
+    """Направляет все файлы хранилища в tmp и создает хранилище backend"""
+    database.USERS_FILE = os.path.join(tmp, 'users.json')
+    database.DOCUMENTS_DB_FILE = os.path.join(tmp, 'documents.json')
+    database.SUBSCRIPTIONS_FILE = os.path.join(tmp, 'subscriptions.json')
+    database.SQLITE_DB_FILE = os.path.join(tmp, 'bot.db')
+    database.DOCUMENTS_LOG_FILE = os.path.join(tmp, 'documents.jsonl')
+    database.USERS_LOG_FILE = os.path.join(tmp, 'users.jsonl')
+    storage = database.create_storage(backend)
+    database.set_storage(storage)
+    return storage
+
+
+async def run_load(backend: str, args) -> Dict[str, Any]:
+    """Один прогон: поднимает стенд на хранилище backend и подает поток апдейтов"""
+    commands, weights = parse_mix(args.mix)
+    rnd = random.Random(args.seed)
+    portal = FakePortal(args.portal_pages, 30, args.portal_latency)
+    api = FakeBotAPI(args.api_latency)
+    await portal.start()
+    await api.start()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        storage = use_temp_storage(backend, tmp)
+        parser = portal.attach(AsyncWebParser(limit=args.crawl_limit))
+        organizations = list(parser.ORGANIZATION_NAMES.values())
+        if args.archive:
+            storage.save_documents([_document(i, rnd, organizations) for i in range(args.archive)])
+        if args.users:
+            storage.save_users({str(1_000_000 + i) for i in range(args.users)})
+
+        search_index = SearchIndex(os.path.join(tmp, 'search.db')) if args.search_index else None
+        db = database.DatabaseCache(storage, search_index=search_index,
+                                    dedup_file=os.path.join(tmp, 'dedup.idx'))
+        db.load()
+        db.subscriptions.set_organizations(parser.ORGANIZATION_NAMES)
+
+        bot = Bot(
+            token=TOKEN,
+            session=AiohttpSession(api=TelegramAPIServer.from_base(api.base_url)),
+            default=DefaultBotProperties(parse_mode="HTML"),
+        )
+        broadcaster = Broadcaster(bot, get_recipients=db.get_users, on_blocked=db.remove_user,
+                                  route=db.subscriptions.route, global_rate=args.broadcast_rate,
+                                  per_chat_interval=0)
+        refresher = create_refresher(db, parser, broadcaster)
+        limiter = ConcurrencyLimitMiddleware(args.max_concurrent)
+        dp = create_dispatcher(db, parser, broadcaster, refresher, limiter=limiter)
+
+        latencies: Dict[str, List[float]] = {command: [] for command in commands}
+        errors: Dict[str, int] = {}
+        monitor = LoopLagMonitor()
+
+        async def feed(command: str, raw: Dict[str, Any]):
+            update = Update.model_validate(raw, context={"bot": bot})
+            started = time.perf_counter()
+            try:
+                await dp.feed_update(bot, update)
+            except Exception as e:
+                errors[command] = errors.get(command, 0) + 1
+                logger.debug(f"Ошибка обработки {command}: {e!r}")
+            latencies[command].append(time.perf_counter() - started)
+
+        count = args.count or int(args.rate * args.duration)
+        logger.info(f"🧪 {backend}: {count} апдейтов, {args.rate}/с, {args.chats} чатов")
+        tasks = []
+        monitor.start()
+        started = time.perf_counter()
+        try:
+            for index in range(count):
+                delay = started + index / args.rate - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                command = rnd.choices(commands, weights)[0]
+                raw = synthetic_update(command, 1_000_000 + rnd.randrange(args.chats), rnd)
+                tasks.append(asyncio.create_task(feed(command, raw)))
+            await asyncio.gather(*tasks)
+            elapsed = time.perf_counter() - started
+        finally:
+            await monitor.stop()
+            await refresher.stop()
+            await broadcaster.join()
+            await bot.session.close()
+            await parser.close()
+            storage.close()
+            if search_index is not None:
+                search_index.close()
+            await api.stop()
+            await portal.stop()
+
+    by_command = {}
+    for command, values in latencies.items():
+        if not values:
+            continue
+        by_command[command] = {
+            'count': len(values),
+            'errors': errors.get(command, 0),
+            'p50_ms': round(percentile(values, 50) * 1000, 2),
+            'p95_ms': round(percentile(values, 95) * 1000, 2),
+            'p99_ms': round(percentile(values, 99) * 1000, 2),
+            'mean_ms': round(statistics.mean(values) * 1000, 2),
+            'max_ms': round(max(values) * 1000, 2),
+        }
+    return {
+        'updates': count,
+        'elapsed_s': round(elapsed, 2),
+        'throughput': round(count / elapsed, 1) if elapsed else None,
+        'errors': sum(errors.values()),
+        'loop_lag': monitor.summary(),
+        'api_calls': dict(sorted(api.calls.items())),
+        'portal_requests': portal.requests,
+        'commands': by_command,
+    }
+
+
+def print_report(backend: str, result: Dict[str, Any]):
+    print(f"\n=== {backend}: {result['updates']} апдейтов за {result['elapsed_s']} с "
+          f"({result['throughput']}/с), ошибок: {result['errors']}")
+    print("event loop lag: " + ' '.join(f"{k}={v}" for k, v in result['loop_lag'].items()))
+    print("Bot API: " + ', '.join(f"{k}={v}" for k, v in result['api_calls'].items()))
+    for command, stats in sorted(result['commands'].items()):
+        print(f"  {command:12s} " + ' '.join(f"{k}={v}" for k, v in stats.items()))
+
+
+def main():
+    cli = argparse.ArgumentParser(description="Нагрузочный прогон обработчиков бота")
+    cli.add_argument('--storage', default='json', help='хранилища через запятую (json,sqlite,log)')
+    cli.add_argument('--rate', type=float, default=200, help='апдейтов в секунду')
+    cli.add_argument('--duration', type=float, default=10, help='длительность подачи, с')
+    cli.add_argument('--count', type=int, default=0, help='число апдейтов (вместо --duration)')
+    cli.add_argument('--chats', type=int, default=2000, help='число разных чатов')
+    cli.add_argument('--mix', default=DEFAULT_MIX, help='команды и их доли, например docs=3,stats=1')
+    cli.add_argument('--archive', type=int, default=5000, help='документов в базе до прогона')
+    cli.add_argument('--users', type=int, default=0, help='подписчиков в базе до прогона')
+    cli.add_argument('--max-concurrent', type=int, default=100, help='как MAX_CONCURRENT_UPDATES')
+    cli.add_argument('--api-latency', type=float, default=0.02, help='задержка ответа Bot API, с')
+    cli.add_argument('--broadcast-rate', type=float, default=1000, help='сообщений рассылки в секунду')
+    cli.add_argument('--portal-pages', type=int, default=5)
+    cli.add_argument('--portal-latency', type=float, default=0.05)
+    cli.add_argument('--crawl-limit', type=int, default=30, help='документов с источника за обход')
+    cli.add_argument('--no-search-index', dest='search_index', action='store_false')
+    cli.add_argument('--seed', type=int, default=42)
+    cli.add_argument('--json', help='куда записать результаты в JSON')
+    cli.add_argument('-v', '--verbose', action='store_true', help='логи бота')
+    args = cli.parse_args()
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING,
+                        format="%(asctime)s - %(levelname)s - %(message)s", force=True)
+    results = {}
+    for backend in [name.strip() for name in args.storage.split(',') if name.strip()]:
+        metrics.reset()
+        results[backend] = asyncio.run(run_load(backend, args))
+        print_report(backend, results[backend])
+
+    if args.json:
+        report = {
+            'meta': {
+                'timestamp': datetime.now().isoformat(timespec='seconds'),
+                'python': sys.version.split()[0],
+                'platform': platform.platform(),
+                'args': vars(args),
+            },
+            'results': results,
+        }
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\n💾 Результаты записаны в {args.json}")
+
+
+if __name__ == "__main__":
+    main()
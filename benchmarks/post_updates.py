@@ -0,0 +1,94 @@
+# benchmarks/post_updates.py - отправка синтетических апдейтов в webhook бота
+# Запуск бота:  BOT_MODE=webhook WEBHOOK_SECRET=test BOT_TOKEN=123:local python main.py
+# Отправка:     python -m benchmarks.post_updates --secret test --count 500 --rate 100
+import argparse
+import asyncio
+import itertools
+import logging
+import random
+import statistics
+import time
+from typing import Any, Dict, List
+
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+COMMANDS = ("/start", "/stats", "/docs", "/help", "/search приказ")
+
+_update_ids = itertools.count(1)
+
+
+def message_update(chat_id: int, text: str) -> Dict[str, Any]:
+    """Апдейт с текстовым сообщением из личного чата"""
+    update_id = next(_update_ids)
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private", "first_name": "Load"},
+            "from": {"id": chat_id, "is_bot": False, "first_name": "Load"},
+            "text": text,
+        },
+    }
+
+
+async def post_updates(url: str, count: int, rate: float, chats: int,
+                       commands: List[str], secret: str = "") -> Dict[str, Any]:
+    """Отправляет count апдейтов с частотой rate в секунду, возвращает сводку ответов"""
+    headers = {"X-Telegram-Bot-Api-Secret-Token": secret} if secret else {}
+    latencies: List[float] = []
+    statuses: Dict[int, int] = {}
+    rnd = random.Random(42)
+
+    async with aiohttp.ClientSession(headers=headers) as session:
+        async def post(update: Dict[str, Any]):
+            started = time.perf_counter()
+            try:
+                async with session.post(url, json=update) as response:
+                    await response.read()
+                    status = response.status
+            except aiohttp.ClientError:
+                status = 0
+            latencies.append(time.perf_counter() - started)
+            statuses[status] = statuses.get(status, 0) + 1
+
+        tasks = []
+        started = time.perf_counter()
+        for index in range(count):
+            delay = started + index / rate - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            update = message_update(1_000_000 + rnd.randrange(chats), rnd.choice(commands))
+            tasks.append(asyncio.create_task(post(update)))
+        await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "sent": count,
+        "elapsed_s": round(elapsed, 2),
+        "rate": round(count / elapsed, 1),
+        "statuses": statuses,
+        "p50_ms": round(statistics.median(latencies) * 1000, 2),
+        "p99_ms": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000, 2),
+    }
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    cli = argparse.ArgumentParser(description="Синтетические апдейты для webhook-режима")
+    cli.add_argument('--url', default='http://127.0.0.1:8080/webhook')
+    cli.add_argument('--secret', default='', help='значение WEBHOOK_SECRET')
+    cli.add_argument('--count', type=int, default=100)
+    cli.add_argument('--rate', type=float, default=50, help='апдейтов в секунду')
+    cli.add_argument('--chats', type=int, default=1000, help='число разных чатов')
+    cli.add_argument('--commands', default=','.join(COMMANDS), help='команды через запятую')
+    args = cli.parse_args()
+
+    summary = asyncio.run(post_updates(
+        args.url, args.count, args.rate, args.chats, args.commands.split(','), args.secret
+    ))
+    for key, value in summary.items():
+        print(f"{key}: {value}")
@@ -0,0 +1,73 @@
+# benchmarks/synthetic.py - генератор синтетических страниц листинга
+import random
+from typing import Optional
+
+DOCUMENT_TYPES = [
+    "Приказ Министерства просвещения Российской Федерации",
+    "Постановление Правительства Республики Саха (Якутия)",
+    "Распоряжение Федеральной службы по надзору в сфере образования и науки",
+    "Приказ Министерства образования и науки Республики Саха (Якутия)",
+]
+
+SUBJECTS = [
+    "Об утверждении федерального государственного образовательного стандарта",
+    "О внесении изменений в порядок организации и осуществления образовательной деятельности",
+    "Об утверждении показателей мониторинга системы образования",
+    "О проведении государственной итоговой аттестации",
+    "Об установлении требований к аккредитационным показателям",
+]
+
+
+def listing_page(documents: int, page: int = 1, pages: int = 1, seed: Optional[int] = None,
+                 layout: str = "containers", path: str = "/Department/View/262") -> str:
+    """Страница листинга ведомства с documents документами
+
+    layout: containers - div.document-item (основной путь парсера),
+    links - только ссылки без контейнеров (запасной путь).
+    """
+    rnd = random.Random(seed if seed is not None else page)
+    items = []
+    for i in range(documents):
+        number = (page - 1) * documents + i
+        date = f"{rnd.randint(1, 28):02d}.{rnd.randint(1, 12):02d}.{rnd.randint(2015, 2024)}"
+        title = f"{rnd.choice(DOCUMENT_TYPES)} от {date} № {rnd.randint(1, 999)} «{rnd.choice(SUBJECTS)}»"
+        href = f"/Document/View/{number:04d}{rnd.randint(0, 10 ** 12):012d}"
+        if layout == "links":
+            items.append(
+                f'<tr><td class="num">{number + 1}</td>'
+                f'<td><a href="{href}">{title}</a></td>'
+                f'<td>Опубликован: {date}</td></tr>'
+            )
+        else:
+            items.append(
+                f'<div class="document-item">'
+                f'<div class="document-number">№ {number + 1}</div>'
+                f'<a class="document-link" href="{href}" title="{rnd.choice(SUBJECTS)}">{title}</a>'
+                f'<div class="document-info"><span class="document-date">Дата опубликования: {date}</span>'
+                f'<span class="document-pages">Страниц: {rnd.randint(1, 80)}</span></div>'
+                f'</div>'
+            )
+
+    if layout == "links":
+        body = f'<table class="documents-table"><tbody>{"".join(items)}</tbody></table>'
+    else:
+        body = f'<div class="documents-list">{"".join(items)}</div>'
+
+    pagination = ""
+    if page < pages:
+        pagination = (
+            '<ul class="pagination">'
+            f'<li><a href="{path}?sort=PublicationDate_desc&amp;page={max(1, page - 1)}">&lt;</a></li>'
+            f'<li class="active"><span>{page}</span></li>'
+            f'<li><a href="{path}?sort=PublicationDate_desc&amp;page={page + 1}">&gt;</a></li>'
+            '</ul>'
+        )
+
+    return (
+        '<!DOCTYPE html><html lang="ru"><head><meta charset="utf-8">'
+        '<title>Официальное опубликование правовых актов</title>'
+        '<script>window.dataLayer = [{"updated": "01.01.2000"}];</script></head>'
+        '<body><header class="header"><nav><a href="/">Главная</a></nav></header>'
+        f'<main class="content">{body}{pagination}</main>'
+        '<footer>© pravo.gov.ru</footer></body></html>'
+    )
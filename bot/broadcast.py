@@ -0,0 +1,312 @@
+# bot/broadcast.py - рассылка новых документов подписчикам
+import asyncio
+import html
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import List, Dict, Any, Iterable, Callable, Awaitable, Optional, Tuple
+
+from aiogram import Bot
+from aiogram.exceptions import (
+    TelegramRetryAfter, TelegramForbiddenError, TelegramBadRequest, TelegramNetworkError
+)
+
+logger = logging.getLogger(__name__)
+
+# Лимит Telegram на длину текста сообщения
+MAX_MESSAGE_LENGTH = 4096
+
+
+class RateLimiter:
+    """Ограничитель частоты (token bucket) с возможностью общей паузы"""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity or rate
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def pause(self, seconds: float):
+        """Останавливает выдачу токенов (например, после RetryAfter)"""
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    async def acquire(self):
+        """Ждет свободный токен"""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    await asyncio.sleep(self._paused_until - now)
+                    continue
+
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+@dataclass
+class BroadcastStats:
+    """Прогресс рассылки"""
+    documents: int = 0
+    total: int = 0
+    delivered: int = 0
+    failed: int = 0
+    blocked: int = 0
+    messages_sent: int = 0
+    retry_after_hits: int = 0
+    started_at: float = field(default_factory=time.monotonic)
+    finished_at: Optional[float] = None
+
+    @property
+    def processed(self) -> int:
+        return self.delivered + self.failed + self.blocked
+
+    @property
+    def elapsed(self) -> float:
+        return (self.finished_at or time.monotonic()) - self.started_at
+
+    def summary(self) -> str:
+        return (
+            f"{self.processed}/{self.total} чатов, доставлено {self.delivered}, "
+            f"ошибок {self.failed}, заблокировали {self.blocked}, "
+            f"сообщений {self.messages_sent}, {self.elapsed:.1f} с"
+        )
+
+
+def format_document_block(doc: Dict[str, Any]) -> str:
+    """Краткая карточка документа (HTML) для рассылки и /docs"""
+    org_short = doc.get('organization', '').split()[-1] if doc.get('organization') else ''
+    block = (
+        f"📋 <b>{html.escape(doc.get('documentTitle', 'Без названия'), quote=False)}</b>\n"
+        f"{html.escape(org_short, quote=False)} • {doc.get('publishDate', 'Дата не указана')}\n"
+    )
+    if doc.get('documentNumber'):
+        kind = doc.get('documentType', 'Документ')
+        block += f"{html.escape(kind, quote=False)} № {html.escape(doc['documentNumber'], quote=False)}"
+        if doc.get('signingDate'):
+            block += f" от {doc['signingDate']}"
+        block += "\n"
+    block += f"<a href='{html.escape(doc.get('url', ''))}'>🔗 Открыть документ</a>"
+    if doc.get('pdfUrl'):
+        block += f" • <a href='{html.escape(doc['pdfUrl'])}'>PDF</a>"
+    return block
+
+
+def format_documents_messages(documents: List[Dict[str, Any]], per_message: int = 5) -> List[str]:
+    """Собирает документы в сообщения (не больше per_message и 4096 символов в каждом)"""
+    header = f"🔔 <b>Новые документы ({len(documents)}):</b>\n\n"
+    blocks = [format_document_block(doc) for doc in documents]
+
+    messages = []
+    current: List[str] = []
+    current_length = len(header)
+    for block in blocks:
+        block_length = len(block) + 2
+        if current and (len(current) >= per_message or current_length + block_length > MAX_MESSAGE_LENGTH):
+            messages.append("\n\n".join(current))
+            current, current_length = [], 0
+        current.append(block)
+        current_length += block_length
+
+    if current:
+        messages.append("\n\n".join(current))
+    if messages:
+        messages[0] = header + messages[0]
+    return messages
+
+
+class Broadcaster:
+    """Рассылает новые документы подписчикам через очередь и пул воркеров
+
+    Общий лимитер держит суммарную скорость ниже флуд-лимита Telegram
+    (~30 сообщений/с), сообщения в один чат идут не чаще per_chat_interval
+    (в том числе между соседними рассылками).
+    RetryAfter приостанавливает всю рассылку на указанное время и не
+    расходует попытки: сообщение ждет флуд-лимит суммарно до max_flood_wait
+    секунд, а сетевые ошибки повторяются не больше max_attempts раз.
+    route (если задан) подбирает каждому получателю его документы по фильтрам.
+    start объединяет пакеты, пришедшие во время рассылки, в следующую, так что
+    подписчик получает одно уведомление за рассылку, а не за каждый пакет обхода.
+    """
+
+    def __init__(self, bot: Bot,
+                 get_recipients: Callable[[], Iterable[str]],
+                 on_blocked: Optional[Callable[[int], Awaitable[Any]]] = None,
+                 route: Optional[Callable[[List[Dict[str, Any]], List[str]],
+                                          Dict[str, List[Dict[str, Any]]]]] = None,
+                 workers: int = 50,
+                 global_rate: float = 25,
+                 per_chat_interval: float = 1.0,
+                 docs_per_message: int = 5,
+                 max_attempts: int = 3,
+                 max_flood_wait: float = 600.0,
+                 progress_interval: float = 10.0):
+        self.bot = bot
+        self.get_recipients = get_recipients
+        self.on_blocked = on_blocked
+        self.route = route
+        self.workers = workers
+        self.limiter = RateLimiter(global_rate)
+        self.per_chat_interval = per_chat_interval
+        self.docs_per_message = docs_per_message
+        self.max_attempts = max_attempts
+        self.max_flood_wait = max_flood_wait
+        self.progress_interval = progress_interval
+        self.current: Optional[BroadcastStats] = None
+        self.last: Optional[BroadcastStats] = None
+        self._run_lock = asyncio.Lock()
+        self._tasks = set()
+        # Документы, ждущие следующей рассылки start
+        self._pending: List[Dict[str, Any]] = []
+        self._drain: Optional[asyncio.Task] = None
+        # Время последней отправки в чат (monotonic) для per_chat_interval
+        self._last_sent: Dict[int, float] = {}
+
+    def start(self, documents: List[Dict[str, Any]]) -> asyncio.Task:
+        """Запускает рассылку в фоне, не блокируя обработчик
+
+        Если рассылка уже идет, документы уйдут следующей одной рассылкой
+        вместе с остальными пакетами, пришедшими за это время.
+        """
+        self._pending.extend(documents)
+        if self._drain is None or self._drain.done():
+            self._drain = asyncio.create_task(self._drain_pending())
+            self._tasks.add(self._drain)
+            self._drain.add_done_callback(self._tasks.discard)
+        return self._drain
+
+    async def _drain_pending(self):
+        while self._pending:
+            documents, self._pending = self._pending, []
+            try:
+                await self.broadcast(documents)
+            except Exception as e:
+                logger.error(f"❌ Ошибка рассылки: {e}")
+
+    async def join(self):
+        """Ждет окончания запущенных в фоне рассылок"""
+        while self._tasks:
+            await asyncio.gather(*list(self._tasks), return_exceptions=True)
+
+    async def broadcast(self, documents: List[Dict[str, Any]]) -> BroadcastStats:
+        """Рассылает документы всем подписчикам, возвращает итоговую статистику"""
+        async with self._run_lock:
+            recipients = list(self.get_recipients())
+            if self.route is not None:
+                deliveries = self.route(documents, recipients)
+            else:
+                deliveries = {chat_id: documents for chat_id in recipients}
+            stats = BroadcastStats(documents=len(documents), total=len(deliveries))
+            self.current = stats
+
+            if not documents or not deliveries:
+                stats.finished_at = time.monotonic()
+                self.current, self.last = None, stats
+                return stats
+
+            logger.info(f"📣 Рассылка {len(documents)} документов для {len(deliveries)} подписчиков")
+            self._forget_idle_chats()
+
+            # У подписчиков с одинаковой подборкой общий список сообщений
+            formatted: Dict[Optional[Tuple[str, ...]], List[str]] = {}
+            queue: asyncio.Queue = asyncio.Queue(maxsize=self.workers * 10)
+            workers = [
+                asyncio.create_task(self._worker(queue, stats))
+                for _ in range(min(self.workers, len(deliveries)))
+            ]
+            reporter = asyncio.create_task(self._report_progress(stats))
+
+            try:
+                for chat_id, chat_documents in deliveries.items():
+                    key = None if chat_documents is documents else tuple(doc['url'] for doc in chat_documents)
+                    messages = formatted.get(key)
+                    if messages is None:
+                        messages = formatted[key] = format_documents_messages(
+                            chat_documents, self.docs_per_message
+                        )
+                    await queue.put((int(chat_id), messages))
+                await queue.join()
+            finally:
+                for worker in workers:
+                    worker.cancel()
+                reporter.cancel()
+                await asyncio.gather(*workers, reporter, return_exceptions=True)
+
+            stats.finished_at = time.monotonic()
+            self.current, self.last = None, stats
+            logger.info(f"✅ Рассылка завершена: {stats.summary()}")
+            return stats
+
+    async def _worker(self, queue: asyncio.Queue, stats: BroadcastStats):
+        while True:
+            chat_id, messages = await queue.get()
+            try:
+                await self._deliver(chat_id, messages, stats)
+            except Exception as e:
+                stats.failed += 1
+                logger.error(f"❌ Ошибка рассылки в чат {chat_id}: {e}")
+            finally:
+                queue.task_done()
+
+    async def _deliver(self, chat_id: int, messages: List[str], stats: BroadcastStats):
+        """Отправляет все сообщения рассылки в один чат"""
+        for text in messages:
+            attempt = 0
+            flood_wait = 0.0
+            while True:
+                await self._wait_chat_interval(chat_id)
+                await self.limiter.acquire()
+                try:
+                    await self.bot.send_message(chat_id, text, disable_web_page_preview=True)
+                    self._last_sent[chat_id] = time.monotonic()
+                    stats.messages_sent += 1
+                    break
+                except TelegramRetryAfter as e:
+                    # Флуд-лимит не сбой доставки: ждем и повторяем, не тратя попытки
+                    stats.retry_after_hits += 1
+                    flood_wait += e.retry_after
+                    if flood_wait > self.max_flood_wait:
+                        raise
+                    self.limiter.pause(e.retry_after)
+                    logger.warning(f"⏳ Флуд-лимит Telegram, пауза {e.retry_after} с")
+                except TelegramForbiddenError:
+                    stats.blocked += 1
+                    if self.on_blocked:
+                        await self.on_blocked(chat_id)
+                    return
+                except TelegramBadRequest as e:
+                    stats.failed += 1
+                    logger.warning(f"⚠️ Не удалось отправить в чат {chat_id}: {e.message}")
+                    return
+                except TelegramNetworkError as e:
+                    attempt += 1
+                    if attempt >= self.max_attempts:
+                        raise
+                    logger.warning(f"🔁 Сетевая ошибка для чата {chat_id}, повтор {attempt}: {e}")
+                    await asyncio.sleep(attempt)
+
+        stats.delivered += 1
+
+    async def _wait_chat_interval(self, chat_id: int):
+        last = self._last_sent.get(chat_id)
+        if last is not None:
+            delay = last + self.per_chat_interval - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+    def _forget_idle_chats(self):
+        """Убирает чаты, которым уже можно писать без паузы"""
+        threshold = time.monotonic() - self.per_chat_interval
+        self._last_sent = {
+            chat_id: sent for chat_id, sent in self._last_sent.items() if sent > threshold
+        }
+
+    async def _report_progress(self, stats: BroadcastStats):
+        while True:
+            await asyncio.sleep(self.progress_interval)
+            logger.info(f"📣 Прогресс рассылки: {stats.summary()}")
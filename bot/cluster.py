@@ -0,0 +1,159 @@
+# bot/cluster.py - несколько процессов бота над общим хранилищем
+import asyncio
+import logging
+import os
+import socket
+from dataclasses import dataclass
+from typing import List, Dict, Any, Callable, Awaitable, Optional
+
+from storage.base import Storage
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class ClusterConfig:
+    """Номер процесса и число процессов (WORKER_INDEX / WORKER_COUNT)"""
+    worker_count: int = 1
+    worker_index: int = 0
+    lease_ttl: float = 30.0           # аренда ведущего, с
+    poll_interval: float = 2.0        # опрос очереди рассылки, с
+    outbox_retention: float = 86400   # сколько хранить разосланные пакеты, с
+
+    def __post_init__(self):
+        if not 0 <= self.worker_index < self.worker_count:
+            raise ValueError(f"WORKER_INDEX={self.worker_index} вне диапазона 0..{self.worker_count - 1}")
+
+    @classmethod
+    def from_env(cls) -> "ClusterConfig":
+        return cls(
+            worker_count=int(os.getenv("WORKER_COUNT", "1")),
+            worker_index=int(os.getenv("WORKER_INDEX", "0")),
+            lease_ttl=float(os.getenv("LEADER_LEASE_TTL", "30")),
+            poll_interval=float(os.getenv("OUTBOX_POLL_INTERVAL", "2")),
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.worker_count > 1
+
+    @property
+    def worker(self) -> str:
+        return f"worker-{self.worker_index}"
+
+    def owns(self, chat_id) -> bool:
+        """Рассылка в этот чат - задача этого процесса"""
+        return int(chat_id) % self.worker_count == self.worker_index
+
+
+class LeaderElection:
+    """Выбор ведущего процесса через аренду в общей базе
+
+    Ведущий продлевает аренду каждые ttl/3 секунд; если он завис или упал,
+    через ttl аренду забирает другой процесс. Обход источников идет только
+    у ведущего (on_elected / on_lost включают и выключают его).
+    """
+
+    def __init__(self, storage: Storage, ttl: float = 30.0, name: str = "crawler",
+                 holder: Optional[str] = None):
+        self.storage = storage
+        self.ttl = ttl
+        self.name = name
+        self.holder = holder or f"{socket.gethostname()}:{os.getpid()}"
+        self.is_leader = False
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self, on_elected: Callable[[], Awaitable[Any]],
+              on_lost: Callable[[], Awaitable[Any]]) -> asyncio.Task:
+        self._task = asyncio.create_task(self._run(on_elected, on_lost))
+        return self._task
+
+    async def stop(self):
+        """Останавливает продление и освобождает аренду, чтобы ее сразу забрал другой"""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self.is_leader:
+            self.is_leader = False
+            await asyncio.to_thread(self.storage.release_lease, self.name, self.holder)
+
+    async def _run(self, on_elected, on_lost):
+        while True:
+            try:
+                acquired = await asyncio.to_thread(self.storage.acquire_lease, self.name, self.holder, self.ttl)
+            except Exception as e:
+                # Без продления аренды нельзя считать себя ведущим
+                logger.error(f"❌ Ошибка продления аренды ведущего: {e}")
+                acquired = False
+
+            try:
+                if acquired and not self.is_leader:
+                    self.is_leader = True
+                    logger.info(f"👑 {self.holder} стал ведущим процессом")
+                    await on_elected()
+                elif not acquired and self.is_leader:
+                    self.is_leader = False
+                    logger.warning(f"⚠️ {self.holder} больше не ведущий процесс")
+                    await on_lost()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"❌ Ошибка смены ведущего: {e}")
+            await asyncio.sleep(self.ttl / 3)
+
+
+class BroadcastRelay:
+    """Доставляет пакеты из общей очереди рассылки подписчикам своего процесса
+
+    Ведущий кладет новые документы в очередь (enqueue_broadcast), каждый
+    процесс забирает пакеты после своего курсора и рассылает их своей доле
+    чатов. Пакеты, накопившиеся к очередному опросу (обход сохраняет их по
+    мере разбора), рассылаются одной рассылкой. Курсор сохраняется после
+    рассылки, поэтому при падении пакеты будут разосланы повторно, а не потеряны.
+    """
+
+    def __init__(self, storage: Storage, worker: str,
+                 deliver: Callable[[List[Dict[str, Any]]], Awaitable[Any]],
+                 poll_interval: float = 2.0,
+                 on_poll: Optional[Callable[[], Awaitable[Any]]] = None):
+        self.storage = storage
+        self.worker = worker
+        self.deliver = deliver
+        self.poll_interval = poll_interval
+        self.on_poll = on_poll
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> asyncio.Task:
+        self._task = asyncio.create_task(self._run())
+        return self._task
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self):
+        cursor = await asyncio.to_thread(self.storage.broadcast_cursor, self.worker)
+        if cursor is None:
+            # Новый процесс не рассылает историю очереди
+            cursor = await asyncio.to_thread(self.storage.last_broadcast_id)
+            await asyncio.to_thread(self.storage.save_broadcast_cursor, self.worker, cursor)
+        logger.info(f"📮 {self.worker}: очередь рассылки с пакета {cursor}")
+
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                if self.on_poll is not None:
+                    await self.on_poll()
+                batches = await asyncio.to_thread(self.storage.pending_broadcasts, cursor)
+                if not batches:
+                    continue
+                await self.deliver([doc for _, documents in batches for doc in documents])
+                cursor = batches[-1][0]
+                await asyncio.to_thread(self.storage.save_broadcast_cursor, self.worker, cursor)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"❌ Ошибка очереди рассылки: {e}")
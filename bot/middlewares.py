@@ -0,0 +1,132 @@
+# bot/middlewares.py - middleware обработчиков aiogram
+import asyncio
+import time
+from typing import Any, AsyncGenerator, Awaitable, Callable, Dict, Optional, Set
+
+from aiogram import BaseMiddleware, Bot, Dispatcher
+from aiogram.types import CallbackQuery, Message, TelegramObject, Update
+
+from metrics import metrics
+
+
+def command_label(event: TelegramObject) -> str:
+    """Имя команды для метрик (/start, /docs, callback:docs, ...) или other"""
+    if isinstance(event, Message) and event.text and event.text.startswith('/'):
+        return event.text.split()[0].split('@')[0].lower()
+    if isinstance(event, CallbackQuery) and event.data:
+        return f"callback:{event.data.split(':')[0]}"
+    return 'other'
+
+
+class HandlerMetricsMiddleware(BaseMiddleware):
+    """Замеряет время обработчиков по командам"""
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        command = command_label(event)
+        started = time.perf_counter()
+        status = 'ok'
+        try:
+            return await handler(event, data)
+        except Exception:
+            status = 'error'
+            raise
+        finally:
+            metrics.observe('handler_latency_seconds', time.perf_counter() - started, command=command)
+            metrics.inc('handler_calls_total', command=command, status=status)
+
+
+class ConcurrencyLimitMiddleware(BaseMiddleware):
+    """Ограничивает число одновременно обрабатываемых апдейтов
+
+    Апдейты обрабатываются отдельными задачами, поэтому медленный обработчик
+    одного чата не задерживает другие. Слот занимается там, где задача
+    создается: в webhook - до ответа Telegram (bot.webhook.LimitedRequestHandler),
+    в polling - до чтения следующего апдейта (LimitedDispatcher). Пока все
+    слоты заняты, новые апдейты ждут на стороне Telegram, и число задач
+    не растет без предела. Апдейты, поданные напрямую (dp.feed_update),
+    занимают слот в middleware. drain() дожидается всех принятых апдейтов.
+    """
+
+    def __init__(self, limit: int = 100):
+        self.limit = limit
+        self._semaphore = asyncio.Semaphore(limit)
+        self._pending = 0
+        # Апдейты, слот для которых занят при приеме
+        self._admitted: Set[int] = set()
+        self._idle = asyncio.Event()
+        self._idle.set()
+
+    async def acquire(self, update_id: Optional[int] = None):
+        """Ждет свободный слот; update_id отмечает апдейт, принятый со слотом"""
+        started = time.perf_counter()
+        await self._semaphore.acquire()
+        metrics.observe('update_queue_wait_seconds', time.perf_counter() - started)
+        self._pending += 1
+        self._idle.clear()
+        metrics.set('updates_pending', self._pending)
+        if update_id is not None:
+            self._admitted.add(update_id)
+
+    def release(self, update_id: Optional[int] = None):
+        self._admitted.discard(update_id)
+        self._semaphore.release()
+        self._pending -= 1
+        metrics.set('updates_pending', self._pending)
+        if not self._pending:
+            self._idle.set()
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        if getattr(event, 'update_id', None) in self._admitted:
+            return await handler(event, data)
+        await self.acquire()
+        try:
+            return await handler(event, data)
+        finally:
+            self.release()
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    async def drain(self, timeout: float) -> bool:
+        """Ждет завершения принятых апдейтов, False - если не успели за timeout"""
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+
+class LimitedDispatcher(Dispatcher):
+    """Dispatcher, который в polling читает следующий апдейт только при свободном слоте
+
+    aiogram создает задачу на каждый полученный апдейт (handle_as_tasks), поэтому
+    слот занимается в _listen_updates до создания задачи, а освобождается после
+    _process_update. Методы внутренние, поведение проверено на aiogram 3.17.
+    """
+
+    def __init__(self, limiter: ConcurrencyLimitMiddleware, **kwargs: Any):
+        super().__init__(**kwargs)
+        self.limiter = limiter
+        self.update.outer_middleware(limiter)
+
+    async def _listen_updates(self, bot: Bot, **kwargs: Any) -> AsyncGenerator[Update, None]:
+        async for update in super()._listen_updates(bot, **kwargs):
+            await self.limiter.acquire(update.update_id)
+            yield update
+
+    async def _process_update(self, bot: Bot, update: Update, call_answer: bool = True, **kwargs: Any) -> bool:
+        try:
+            return await super()._process_update(bot, update, call_answer, **kwargs)
+        finally:
+            self.limiter.release(update.update_id)
@@ -0,0 +1,66 @@
+# bot/pagination.py - постраничный просмотр архива (/docs) с кнопками навигации
+from collections import OrderedDict
+from typing import List, Dict, Any, Tuple, Optional
+
+from aiogram.filters.callback_data import CallbackData
+from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
+
+from bot.broadcast import format_document_block
+
+
+class DocsPage(CallbackData, prefix="docs"):
+    """Кнопка перехода на страницу архива (0 - самые новые документы)"""
+    page: int
+    # Ключ источника (federal, ...); пустое значение aiogram распаковывает как None
+    source: Optional[str] = None
+
+
+class RenderCache:
+    """Готовые карточки документов (LRU)
+
+    Ключ - URL и реквизиты: после обогащения карточка перерисовывается.
+    """
+
+    def __init__(self, maxsize: int = 2000):
+        self.maxsize = maxsize
+        self._blocks: "OrderedDict[Tuple[Any, ...], str]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def render(self, doc: Dict[str, Any]) -> str:
+        key = (doc.get('url'), doc.get('documentNumber'), doc.get('pdfUrl'))
+        block = self._blocks.get(key)
+        if block is not None:
+            self._blocks.move_to_end(key)
+            self.hits += 1
+            return block
+
+        self.misses += 1
+        block = self._blocks[key] = format_document_block(doc)
+        if len(self._blocks) > self.maxsize:
+            self._blocks.popitem(last=False)
+        return block
+
+
+def page_count(total: int, per_page: int) -> int:
+    return max((total + per_page - 1) // per_page, 1)
+
+
+def render_docs_page(documents: List[Dict[str, Any]], page: int, total: int, per_page: int,
+                     cache: RenderCache, source: str = "") -> Tuple[str, Optional[InlineKeyboardMarkup]]:
+    """Текст страницы архива и клавиатура навигации"""
+    pages = page_count(total, per_page)
+    first = page * per_page + 1
+    header = f"📄 <b>Документы {first}–{first + len(documents) - 1} из {total}</b>\n\n"
+    text = header + "\n\n".join(cache.render(doc) for doc in documents)
+
+    if pages == 1:
+        return text, None
+    source = source or None
+    buttons = []
+    if page > 0:
+        buttons.append(InlineKeyboardButton(text="« Новее", callback_data=DocsPage(page=page - 1, source=source).pack()))
+    buttons.append(InlineKeyboardButton(text=f"{page + 1}/{pages}", callback_data=DocsPage(page=page, source=source).pack()))
+    if page + 1 < pages:
+        buttons.append(InlineKeyboardButton(text="Старее »", callback_data=DocsPage(page=page + 1, source=source).pack()))
+    return text, InlineKeyboardMarkup(inline_keyboard=[buttons])
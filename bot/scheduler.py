@@ -0,0 +1,94 @@
+# bot/scheduler.py - фоновое обновление базы и объединение параллельных /update
+import asyncio
+import logging
+import random
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Awaitable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class RefreshResult:
+    """Результат одного обновления базы"""
+    fetched: int
+    added: int = 0          # сколько новых документов сохранено
+    finished_at: float = field(default_factory=time.monotonic)
+    cached: bool = False
+    partial: bool = False   # обход прерван по CRAWL_DEADLINE
+
+    @property
+    def age(self) -> float:
+        return time.monotonic() - self.finished_at
+
+
+class RefreshCoordinator:
+    """Single-flight обновление: параллельные вызовы ждут уже идущий обход
+
+    Последний результат переиспользуется в течение result_ttl секунд,
+    фоновая задача запускает обновление раз в interval ± jitter секунд.
+    """
+
+    def __init__(self, refresh_func: Callable[[], Awaitable[RefreshResult]],
+                 result_ttl: float = 60):
+        self.refresh_func = refresh_func
+        self.result_ttl = result_ttl
+        self.last: Optional[RefreshResult] = None
+        self._inflight: Optional[asyncio.Future] = None
+        self._scheduler: Optional[asyncio.Task] = None
+
+    @property
+    def in_progress(self) -> bool:
+        return self._inflight is not None
+
+    async def refresh(self, force: bool = False) -> RefreshResult:
+        """Возвращает свежий результат, запуская обход только если он еще не идет"""
+        if not force and self.last is not None and self.last.age < self.result_ttl:
+            return RefreshResult(
+                fetched=self.last.fetched,
+                added=self.last.added,
+                finished_at=self.last.finished_at,
+                cached=True,
+                partial=self.last.partial,
+            )
+
+        if self._inflight is None:
+            self._inflight = asyncio.ensure_future(self._run())
+        else:
+            logger.info("🔗 Обновление уже идет, присоединяемся к нему")
+
+        # shield: отмена одного ожидающего не прерывает общий обход
+        return await asyncio.shield(self._inflight)
+
+    async def _run(self) -> RefreshResult:
+        try:
+            result = await self.refresh_func()
+            self.last = result
+            return result
+        finally:
+            self._inflight = None
+
+    def start(self, interval: float, jitter: float = 0) -> asyncio.Task:
+        """Запускает периодическое обновление в фоне"""
+        self._scheduler = asyncio.create_task(self._run_periodic(interval, jitter))
+        return self._scheduler
+
+    async def stop(self):
+        """Останавливает фоновое обновление"""
+        if self._scheduler is not None:
+            self._scheduler.cancel()
+            await asyncio.gather(self._scheduler, return_exceptions=True)
+            self._scheduler = None
+
+    async def _run_periodic(self, interval: float, jitter: float):
+        logger.info(f"⏰ Автообновление каждые {interval:.0f} ± {jitter:.0f} с")
+        while True:
+            await asyncio.sleep(max(1.0, interval + random.uniform(-jitter, jitter)))
+            try:
+                result = await self.refresh(force=True)
+                logger.info(f"⏰ Автообновление: получено {result.fetched}, новых {result.added}")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"❌ Ошибка автообновления: {e}")
@@ -0,0 +1,128 @@
+# bot/webhook.py - прием апдейтов через webhook (aiohttp) вместо long polling
+import asyncio
+import logging
+import os
+import signal
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+from aiohttp import web
+from aiogram import Bot, Dispatcher
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+
+from bot.middlewares import ConcurrencyLimitMiddleware
+
+logger = logging.getLogger(__name__)
+
+
+class LimitedRequestHandler(SimpleRequestHandler):
+    """Отвечает Telegram и запускает обработку апдейта, только заняв слот limiter
+
+    Пока все слоты заняты, запрос ждет, а Telegram не присылает новые апдейты,
+    поэтому фоновых задач не больше limiter.limit. Переопределен внутренний
+    метод SimpleRequestHandler (aiogram 3.17).
+    """
+
+    def __init__(self, *args: Any, limiter: ConcurrencyLimitMiddleware, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self.limiter = limiter
+
+    async def _handle_request_background(self, bot: Bot, request: web.Request) -> web.Response:
+        update = await request.json(loads=bot.session.json_loads)
+        update_id = update.get('update_id')
+        await self.limiter.acquire(update_id)
+        task = asyncio.create_task(self._limited_feed_update(bot, update, update_id))
+        self._background_feed_update_tasks.add(task)
+        task.add_done_callback(self._background_feed_update_tasks.discard)
+        return web.json_response({}, dumps=bot.session.json_dumps)
+
+    async def _limited_feed_update(self, bot: Bot, update: Dict[str, Any], update_id: Optional[int]):
+        try:
+            await self._background_feed_update(bot=bot, update=update)
+        finally:
+            self.limiter.release(update_id)
+
+
+@dataclass(frozen=True)
+class WebhookConfig:
+    """Параметры webhook-сервера"""
+    url: str = ""                      # публичный адрес; пустой - webhook не регистрируется
+    path: str = "/webhook"
+    host: str = "0.0.0.0"
+    port: int = 8080
+    secret_token: Optional[str] = None  # обязателен: без него апдейты может прислать кто угодно
+    drain_timeout: float = 30.0        # сколько ждать обработки принятых апдейтов при остановке
+    reuse_port: bool = False           # общий порт для нескольких процессов (SO_REUSEPORT)
+
+    @classmethod
+    def from_env(cls) -> "WebhookConfig":
+        return cls(
+            url=os.getenv("WEBHOOK_URL", ""),
+            path=os.getenv("WEBHOOK_PATH", "/webhook"),
+            host=os.getenv("WEBHOOK_HOST", "0.0.0.0"),
+            port=int(os.getenv("WEBHOOK_PORT", "8080")),
+            secret_token=os.getenv("WEBHOOK_SECRET") or None,
+            drain_timeout=float(os.getenv("WEBHOOK_DRAIN_TIMEOUT", "30")),
+            reuse_port=os.getenv("WEBHOOK_REUSE_PORT", "0") == "1",
+        )
+
+
+async def run_webhook(dp: Dispatcher, bot: Bot, config: WebhookConfig,
+                      limiter: Optional[ConcurrencyLimitMiddleware] = None,
+                      stop_event: Optional[asyncio.Event] = None):
+    """Принимает апдейты по HTTP до SIGINT/SIGTERM (или stop_event)
+
+    Telegram получает ответ, как только для апдейта есть слот limiter (без
+    limiter - сразу), апдейт обрабатывается в фоне. Запросы без
+    верного X-Telegram-Bot-Api-Secret-Token отклоняются; без secret_token
+    сервер не запускается (ValueError), иначе любой, кто видит порт, мог бы
+    прислать поддельный апдейт от имени администратора. При остановке сервер
+    перестает принимать соединения, дожидается принятых апдейтов
+    (не дольше drain_timeout) и только потом закрывает сессию бота.
+    Webhook при остановке не удаляется: Telegram придержит апдейты до перезапуска.
+    """
+    if not config.secret_token:
+        raise ValueError("для webhook нужен WEBHOOK_SECRET")
+
+    app = web.Application()
+    if limiter is not None:
+        handler = LimitedRequestHandler(dispatcher=dp, bot=bot, secret_token=config.secret_token, limiter=limiter)
+    else:
+        handler = SimpleRequestHandler(dispatcher=dp, bot=bot, secret_token=config.secret_token)
+    handler.register(app, path=config.path)
+    setup_application(app, dp, bot=bot)
+
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, config.host, config.port, reuse_port=config.reuse_port or None)
+    await site.start()
+    logger.info(f"🌐 Webhook слушает http://{config.host}:{config.port}{config.path}")
+
+    if config.url:
+        await bot.set_webhook(
+            config.url,
+            secret_token=config.secret_token,
+            allowed_updates=dp.resolve_used_update_types(),
+        )
+        logger.info(f"🔗 Webhook зарегистрирован: {config.url}")
+
+    stop_event = stop_event or asyncio.Event()
+    loop = asyncio.get_running_loop()
+    installed = []
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop_event.set)
+            installed.append(sig)
+        except (NotImplementedError, RuntimeError):
+            pass  # Windows: остановка через KeyboardInterrupt
+
+    try:
+        await stop_event.wait()
+        logger.info("🛑 Остановка webhook-сервера...")
+    finally:
+        for sig in installed:
+            loop.remove_signal_handler(sig)
+        await site.stop()
+        if limiter is not None and not await limiter.drain(config.drain_timeout):
+            logger.warning(f"⚠️ Не дождались обработки {limiter.pending} апдейтов")
+        await runner.cleanup()
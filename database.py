@@ -1,114 +1,509 @@
-# database.py - полная версия с пользователями и документами
-import json
-import os
-import logging
-from typing import List, Dict, Any, Set
-
-logger = logging.getLogger(__name__)
-
-# Файлы базы данных
-USERS_FILE = 'data/users.json'
-DOCUMENTS_DB_FILE = 'data/documents.json'
-
-# ==============================
-# 📊 ФУНКЦИИ ДЛЯ РАБОТЫ С ПОЛЬЗОВАТЕЛЯМИ
-# ==============================
-
-def init_database():
-    """Инициализация базы данных"""
-    os.makedirs('data', exist_ok=True)
-
-def load_users() -> Set[str]:
-    """Загружает список пользователей из файла"""
-    init_database()
-    if not os.path.exists(USERS_FILE):
-        return set()
-    try:
-        with open(USERS_FILE, 'r', encoding='utf-8') as f:
-            return set(json.load(f))
-    except Exception as e:
-        logger.error(f"Ошибка загрузки users: {e}")
-        return set()
-
-def save_users(users: Set[str]):
-    """Сохраняет список пользователей в файл"""
-    init_database()
-    try:
-        with open(USERS_FILE, 'w', encoding='utf-8') as f:
-            json.dump(list(users), f, ensure_ascii=False, indent=2)
-    except Exception as e:
-        logger.error(f"Ошибка сохранения users: {e}")
-
-def add_user(user_id: int):
-    """Добавляет пользователя в список подписчиков"""
-    users = load_users()
-    user_str = str(user_id)
-    if user_str not in users:
-        users.add(user_str)
-        save_users(users)
-        logger.info(f"✅ Добавлен пользователь: {user_id}")
-
-def remove_user(user_id: int):
-    """Удаляет пользователя из списка подписчиков"""
-    users = load_users()
-    user_str = str(user_id)
-    if user_str in users:
-        users.discard(user_str)
-        save_users(users)
-        logger.info(f"❌ Удален пользователь: {user_id}")
-
-def get_user_count() -> int:
-    """Возвращает количество пользователей"""
-    return len(load_users())
-
-# ==============================
-# 📄 ФУНКЦИИ ДЛЯ РАБОТЫ С ДОКУМЕНТАМИ
-# ==============================
-
-def init_documents_db():
-    """Инициализация базы документов"""
-    os.makedirs('data', exist_ok=True)
-    if not os.path.exists(DOCUMENTS_DB_FILE):
-        with open(DOCUMENTS_DB_FILE, 'w', encoding='utf-8') as f:
-            json.dump([], f, ensure_ascii=False, indent=2)
-
-def save_documents(documents: List[Dict[str, Any]]):
-    """Сохраняет документы в базу"""
-    init_documents_db()
-    try:
-        with open(DOCUMENTS_DB_FILE, 'w', encoding='utf-8') as f:
-            json.dump(documents, f, ensure_ascii=False, indent=2)
-    except Exception as e:
-        logger.error(f"Ошибка сохранения документов: {e}")
-
-def load_documents() -> List[Dict[str, Any]]:
-    """Загружает документы из базы"""
-    init_documents_db()
-    try:
-        with open(DOCUMENTS_DB_FILE, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    except Exception:
-        return []
-
-def add_documents(new_documents: List[Dict[str, Any]]) -> int:
-    """Добавляет новые документы в базу, возвращает количество добавленных"""
-    existing_docs = load_documents()
-    existing_urls = {doc['url'] for doc in existing_docs}
-    
-    truly_new = [doc for doc in new_documents if doc['url'] not in existing_urls]
-    
-    if truly_new:
-        all_docs = existing_docs + truly_new
-        save_documents(all_docs)
-        logger.info(f"✅ Добавлено {len(truly_new)} новых документов")
-    
-    return len(truly_new)
-
-def get_recent_documents(limit: int = 5) -> List[Dict[str, Any]]:
-    """Возвращает последние документы"""
-    documents = load_documents()
-    return documents[-limit:] if documents else []
-
-def get_document_count() -> int:
-    """Возвращает количество документов в базе"""
-    return len(load_documents())
\ No newline at end of file
+# database.py - полная версия с пользователями и документами
+import os
+import asyncio
+import logging
+from typing import (
+    List, Dict, Any, Set, Optional, Iterable, AsyncIterable, Awaitable, Callable, Tuple
+)
+
+from metrics import metrics
+from search.index import SearchIndex, parse_query
+from search.matcher import SubscriptionMatcher, Subscription
+from storage.base import Storage, DOCUMENT_FIELDS
+from storage.dedup import DedupIndex
+from storage.records import DocumentIndex
+from parsers.urls import document_key
+
+logger = logging.getLogger(__name__)
+
+# Файлы базы данных
+USERS_FILE = 'data/users.json'
+DOCUMENTS_DB_FILE = 'data/documents.json'
+SUBSCRIPTIONS_FILE = 'data/subscriptions.json'
+SQLITE_DB_FILE = 'data/bot.db'
+SEARCH_DB_FILE = 'data/search.db'
+DOCUMENTS_LOG_FILE = 'data/documents.jsonl'
+USERS_LOG_FILE = 'data/users.jsonl'
+DEDUP_INDEX_FILE = 'data/dedup.idx'
+
+# Backend хранилища: sqlite (по умолчанию), json или log (журнал JSON Lines)
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "sqlite").lower()
+
+# Полнотекстовый индекс для /search (SEARCH_INDEX=0 отключает)
+SEARCH_INDEX_ENABLED = os.getenv("SEARCH_INDEX", "1") != "0"
+
+# Сколько самых новых документов кэш держит в памяти (более старые страницы читаются из хранилища)
+DOCUMENT_CACHE_SIZE = int(os.getenv("DOCUMENT_CACHE_SIZE", "10000"))
+# Сколько последних документов ведомый процесс сверяет по реквизитам при синхронизации
+DETAILS_SYNC_DOCUMENTS = 200
+
+_storage = None
+
+def create_storage(backend: str = None) -> Storage:
+    """Создает хранилище выбранного типа"""
+    backend = (backend or STORAGE_BACKEND).lower()
+    if backend == "json":
+        from storage.json_storage import JsonStorage
+        return JsonStorage(USERS_FILE, DOCUMENTS_DB_FILE, SUBSCRIPTIONS_FILE)
+    if backend == "sqlite":
+        from storage.sqlite_storage import SqliteStorage
+        return SqliteStorage(SQLITE_DB_FILE, USERS_FILE, DOCUMENTS_DB_FILE, SUBSCRIPTIONS_FILE)
+    if backend == "log":
+        from storage.log_storage import LogStorage
+        return LogStorage(DOCUMENTS_LOG_FILE, USERS_FILE, DOCUMENTS_DB_FILE, SUBSCRIPTIONS_FILE,
+                          users_log=USERS_LOG_FILE)
+    raise ValueError(f"Неизвестный STORAGE_BACKEND: {backend}")
+
+def get_storage() -> Storage:
+    """Возвращает общее хранилище, создавая его при первом обращении"""
+    global _storage
+    if _storage is None:
+        _storage = create_storage()
+        _storage.init()
+        logger.info(f"🗄 Хранилище: {type(_storage).__name__}")
+    return _storage
+
+def set_storage(storage: Storage):
+    """Подменяет общее хранилище (например, для другого backend-а)"""
+    global _storage
+    if _storage is not None and _storage is not storage:
+        _storage.close()
+    storage.init()
+    _storage = storage
+
+# ==============================
+# 📊 ФУНКЦИИ ДЛЯ РАБОТЫ С ПОЛЬЗОВАТЕЛЯМИ
+# ==============================
+
+def init_database():
+    """Инициализация базы данных"""
+    os.makedirs('data', exist_ok=True)
+    get_storage()
+
+def load_users() -> Set[str]:
+    """Загружает список пользователей"""
+    return get_storage().load_users()
+
+def save_users(users: Set[str]):
+    """Сохраняет список пользователей"""
+    get_storage().save_users(users)
+
+def add_user(user_id: int):
+    """Добавляет пользователя в список подписчиков"""
+    if get_storage().add_user(str(user_id)):
+        logger.info(f"✅ Добавлен пользователь: {user_id}")
+
+def remove_user(user_id: int):
+    """Удаляет пользователя из списка подписчиков"""
+    if get_storage().remove_user(str(user_id)):
+        logger.info(f"❌ Удален пользователь: {user_id}")
+
+def get_user_count() -> int:
+    """Возвращает количество пользователей"""
+    return get_storage().user_count()
+
+# ==============================
+# 📄 ФУНКЦИИ ДЛЯ РАБОТЫ С ДОКУМЕНТАМИ
+# ==============================
+
+def init_documents_db():
+    """Инициализация базы документов"""
+    init_database()
+
+def save_documents(documents: List[Dict[str, Any]]):
+    """Сохраняет документы в базу"""
+    try:
+        get_storage().save_documents(documents)
+    except Exception as e:
+        logger.error(f"Ошибка сохранения документов: {e}")
+
+def load_documents() -> List[Dict[str, Any]]:
+    """Загружает документы из базы"""
+    try:
+        return get_storage().load_documents()
+    except Exception:
+        return []
+
+def add_documents(new_documents: List[Dict[str, Any]]) -> int:
+    """Добавляет новые документы в базу, возвращает количество добавленных"""
+    truly_new = get_storage().add_documents(new_documents)
+    
+    if truly_new:
+        logger.info(f"✅ Добавлено {len(truly_new)} новых документов")
+    
+    return len(truly_new)
+
+def add_document_stream(pages: Iterable[List[Dict[str, Any]]], batch_size: int = 0) -> int:
+    """Сохраняет документы из постраничного потока (WebParser.iter_documents)
+
+    Запись идет пакетами не меньше batch_size документов (0 - каждая страница),
+    возвращает количество добавленных.
+    """
+    added = 0
+    batch: List[Dict[str, Any]] = []
+    for page_docs in pages:
+        batch.extend(page_docs)
+        if len(batch) >= batch_size:
+            added += add_documents(batch)
+            batch = []
+    if batch:
+        added += add_documents(batch)
+    return added
+
+def get_known_urls() -> Set[str]:
+    """Возвращает URL всех документов в базе (для инкрементального парсинга)"""
+    return get_storage().known_urls()
+
+def get_recent_documents(limit: int = 5) -> List[Dict[str, Any]]:
+    """Возвращает последние документы"""
+    return get_storage().recent_documents(limit)
+
+def get_documents_page(offset: int, limit: int) -> List[Dict[str, Any]]:
+    """Возвращает документы от новых к старым, пропустив offset самых новых"""
+    return get_storage().documents_page(offset, limit)
+
+def get_document_count() -> int:
+    """Возвращает количество документов в базе"""
+    return get_storage().document_count()
+
+# ==============================
+# ⚡ КЭШ В ПАМЯТИ
+# ==============================
+
+class DatabaseCache:
+    """Кэш подписчиков и документов в памяти с записью в хранилище (write-through)
+
+    Состояние загружается один раз при старте; счетчики, проверка подписки
+    и документы отдаются из памяти. Изменения под asyncio-блокировкой сначала
+    пишутся в хранилище (в отдельном потоке), затем в кэш.
+
+    Из документов в памяти только окно: window самых новых по дате публикации
+    (компактные записи с индексом по дате), так что память не растет с архивом.
+    Страницы внутри окна отдаются из него, более старые - storage.documents_page
+    в том же порядке. Окно точно совпадает с началом архива на _exact_counts
+    позиций (по каждой организации); новые документы добавляются в окно,
+    а при переполнении на четверть оно обрезается обратно до window.
+    """
+
+    def __init__(self, storage: Optional[Storage] = None,
+                 search_index: Optional[SearchIndex] = None,
+                 dedup_file: Optional[str] = None,
+                 window: int = DOCUMENT_CACHE_SIZE):
+        self._storage = storage
+        self.dedup_file = dedup_file
+        self.search_index = search_index
+        self.window = window
+        self.subscriptions = SubscriptionMatcher()
+        self._users: Set[str] = set()
+        self._known_urls = DedupIndex()
+        self.documents = DocumentIndex()
+        self._document_count = 0
+        # Окно содержит весь архив
+        self._complete = True
+        # Сколько первых документов окна (всего - None, по организации) совпадает с архивом
+        self._exact_counts: Dict[Optional[str], int] = {}
+        # Количество документов по организациям (когда окно не весь архив)
+        self._org_counts: Dict[str, int] = {}
+        self._data_version: Optional[int] = None
+        self._lock = asyncio.Lock()
+        self.loaded = False
+
+    @property
+    def storage(self) -> Storage:
+        return self._storage or get_storage()
+
+    def load(self):
+        """Загружает состояние из хранилища"""
+        storage = self.storage
+        self._data_version = storage.data_version()
+        self._users = storage.load_users()
+        self._known_urls.close()
+        self._known_urls = DedupIndex(self.dedup_file).load(storage)
+        self._document_count = storage.document_count()
+        self._load_window()
+        self.subscriptions.load(storage.load_subscriptions())
+        if self.search_index is not None:
+            self._backfill_search_index()
+        self.loaded = True
+        logger.info(
+            f"⚡ Кэш загружен: {len(self._users)} пользователей, {self._document_count} документов "
+            f"(в памяти {len(self.documents)})"
+        )
+
+    def _load_window(self):
+        """Читает из хранилища window самых новых документов"""
+        # Страница идет от новых к старым, в индекс документы добавляются от старых к новым
+        self.documents = DocumentIndex(reversed(self.storage.documents_page(0, self.window)))
+        self._mark_exact()
+
+    def _mark_exact(self):
+        """Запоминает, что окно сейчас - точное начало архива"""
+        self._complete = len(self.documents) >= self._document_count
+        self._exact_counts = {None: len(self.documents)}
+        self._exact_counts.update(
+            (name, self.documents.count(name)) for name in self.documents.organizations.names()
+        )
+        self._org_counts = {}
+
+    def _add_to_window(self, documents: List[Dict[str, Any]]):
+        self.documents.extend(documents)
+        for doc in documents:
+            organization = doc.get('organization', '')
+            if organization in self._org_counts:
+                self._org_counts[organization] += 1
+        if len(self.documents) > self.window + self.window // 4:
+            self.documents.trim(self.window)
+            self._mark_exact()
+
+    def _reload_shared(self) -> bool:
+        """Перечитывает подписчиков, фильтры и новые документы после записи другим процессом
+
+        Документы, добавленные ведущим, дописываются в окно, а у последних
+        DETAILS_SYNC_DOCUMENTS документов обновляются реквизиты (ведущий
+        загружает их сразу после добавления). Индекс дедупликации ведомым не
+        нужен: обход идет только у ведущего, а новый ведущий перед обходом
+        перечитывает кэш целиком (reload). Поисковый индекс - общий файл SQLite,
+        его пополняет ведущий.
+        """
+        storage = self.storage
+        version = storage.data_version()
+        if version is None or version == self._data_version:
+            return False
+        self._users = storage.load_users()
+        self.subscriptions.load(storage.load_subscriptions())
+        previous_count = self._document_count
+        self._document_count = storage.document_count()
+        missing = self._document_count - previous_count
+        if missing < 0:
+            self._load_window()
+        else:
+            # Последние документы в порядке добавления: новые и недавние (для реквизитов)
+            recent = storage.recent_documents(missing + DETAILS_SYNC_DOCUMENTS)
+            known = recent[:len(recent) - missing] if missing else recent
+            self.documents.update_details({
+                doc['url']: {key: value for key, value in doc.items() if key not in DOCUMENT_FIELDS}
+                for doc in known
+            })
+            if missing:
+                self._add_to_window(recent[-missing:])
+            self._org_counts = {}
+        self._data_version = version
+        return True
+
+    async def sync(self) -> bool:
+        """Обновляет кэш, если общее хранилище изменил другой процесс (PRAGMA data_version)"""
+        async with self._lock:
+            return await asyncio.to_thread(self._reload_shared)
+
+    async def reload(self):
+        """Полностью перечитывает кэш (например, перед обходом у нового ведущего)"""
+        async with self._lock:
+            await asyncio.to_thread(self.load)
+
+    def _backfill_search_index(self):
+        """Дозаполняет индекс, если в хранилище есть непроиндексированные документы"""
+        indexed = self.search_index.document_count()
+        if indexed >= self._document_count:
+            return
+        added = self.search_index.add_documents(self.storage.load_documents())
+        logger.info(f"🔎 Поисковый индекс дополнен: {added} документов")
+
+    # 📊 Пользователи
+
+    def has_user(self, user_id: int) -> bool:
+        return str(user_id) in self._users
+
+    def get_user_count(self) -> int:
+        return len(self._users)
+
+    def get_users(self) -> Set[str]:
+        return set(self._users)
+
+    async def add_user(self, user_id: int) -> bool:
+        """Добавляет подписчика, возвращает True если он новый"""
+        user_str = str(user_id)
+        if user_str in self._users:
+            return False
+        async with self._lock:
+            if user_str in self._users:
+                return False
+            with metrics.timer('storage_write_seconds', op='add_user'):
+                await asyncio.to_thread(self.storage.add_user, user_str)
+            self._users.add(user_str)
+        logger.info(f"✅ Добавлен пользователь: {user_id}")
+        return True
+
+    async def remove_user(self, user_id: int) -> bool:
+        """Удаляет подписчика, возвращает True если он был"""
+        user_str = str(user_id)
+        if user_str not in self._users:
+            return False
+        async with self._lock:
+            if user_str not in self._users:
+                return False
+            with metrics.timer('storage_write_seconds', op='remove_user'):
+                await asyncio.to_thread(self.storage.remove_user, user_str)
+            self._users.discard(user_str)
+            self.subscriptions.remove(user_str)
+        logger.info(f"❌ Удален пользователь: {user_id}")
+        return True
+
+    # 🎯 Фильтры подписчиков
+
+    def get_subscription(self, user_id: int) -> Subscription:
+        return self.subscriptions.get(str(user_id))
+
+    async def set_subscription(self, user_id: int, sources: Optional[List[str]] = None,
+                               keywords: Optional[List[str]] = None) -> Subscription:
+        """Меняет фильтры подписчика; None оставляет соответствующую часть без изменений"""
+        user_str = str(user_id)
+        async with self._lock:
+            current = self.subscriptions.get(user_str)
+            sources = list(current.sources) if sources is None else sources
+            keywords = list(current.keywords) if keywords is None else keywords
+            with metrics.timer('storage_write_seconds', op='save_subscription'):
+                await asyncio.to_thread(self.storage.save_subscription, user_str, sources, keywords)
+            self.subscriptions.set(user_str, sources, keywords)
+        return self.subscriptions.get(user_str)
+
+    # 📄 Документы
+
+    def get_document_count(self, organization: Optional[str] = None) -> int:
+        if organization is None:
+            return self._document_count
+        if self._complete:
+            return self.documents.count(organization)
+        count = self._org_counts.get(organization)
+        if count is None:
+            count = self._org_counts[organization] = self.storage.document_count(organization)
+        return count
+
+    def get_known_urls(self) -> DedupIndex:
+        """Индекс известных документов (поддерживает `url in ...` и len)"""
+        return self._known_urls
+
+    def get_recent_documents(self, limit: int = 5) -> List[Dict[str, Any]]:
+        """Последние по дате публикации документы (от старых к новым)"""
+        return self.documents.recent(limit)[::-1]
+
+    def _in_window(self, offset: int, limit: int, organization: Optional[str]) -> bool:
+        return self._complete or offset + limit <= self._exact_counts.get(organization, 0)
+
+    async def get_documents_page(self, offset: int, limit: int,
+                                 organization: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Страница архива по дате публикации от новых к старым (старые страницы - из хранилища)"""
+        if self._in_window(offset, limit, organization):
+            return self.documents.recent(limit, offset, organization)
+        with metrics.timer('storage_read_seconds', op='documents_page'):
+            return await asyncio.to_thread(self.storage.documents_page, offset, limit, organization)
+
+    async def add_documents(self, new_documents: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Добавляет документы, возвращает действительно новые"""
+        async with self._lock:
+            # Один документ может прийти дважды в пакете (контейнер и ссылка)
+            candidates = []
+            batch_keys = set()
+            for doc in new_documents:
+                key = document_key(doc['url'])
+                if key not in batch_keys and doc['url'] not in self._known_urls:
+                    batch_keys.add(key)
+                    candidates.append(doc)
+            truly_new = []
+            if candidates:
+                with metrics.timer('storage_write_seconds', op='add_documents'):
+                    truly_new = await asyncio.to_thread(self.storage.add_documents, candidates)
+            self._known_urls.add(doc['url'] for doc in truly_new)
+            self._document_count += len(truly_new)
+            self._add_to_window(truly_new)
+            if truly_new and self.search_index is not None:
+                try:
+                    await asyncio.to_thread(self.search_index.add_documents, truly_new)
+                except Exception as e:
+                    # Индекс дозаполнится при следующем запуске
+                    logger.error(f"Ошибка индексации документов: {e}")
+
+        metrics.inc('documents_seen_total', len(new_documents))
+        metrics.inc('documents_new_total', len(truly_new))
+        if new_documents:
+            metrics.set('dedup_ratio', 1 - len(truly_new) / len(new_documents))
+        if truly_new:
+            logger.info(f"✅ Добавлено {len(truly_new)} новых документов")
+        return truly_new
+
+    async def add_document_stream(
+        self, pages: AsyncIterable[List[Dict[str, Any]]],
+        on_added: Optional[Callable[[List[Dict[str, Any]]], Awaitable[Any]]] = None,
+        batch_size: int = 0,
+    ) -> Tuple[int, int]:
+        """Сохраняет документы из потока страниц (AsyncWebParser.iter_documents)
+
+        Каждый пакет (не меньше batch_size документов, 0 - каждая страница)
+        дедуплицируется и записывается сразу; on_added вызывается для новых
+        документов пакета, не дожидаясь конца обхода. Документы после пакета
+        не хранятся, память не растет с объемом обхода.
+        Возвращает (сколько документов получено, сколько добавлено).
+        """
+        seen = added = 0
+        batch: List[Dict[str, Any]] = []
+
+        async def flush():
+            nonlocal added
+            new_docs = await self.add_documents(batch)
+            if new_docs:
+                added += len(new_docs)
+                if on_added is not None:
+                    await on_added(new_docs)
+
+        async for page_docs in pages:
+            seen += len(page_docs)
+            batch.extend(page_docs)
+            if len(batch) >= batch_size:
+                await flush()
+                batch = []
+        if batch:
+            await flush()
+        return seen, added
+
+    async def update_document_details(self, documents: List[Dict[str, Any]], fields: Iterable[str]):
+        """Сохраняет доп. поля документов (например, реквизиты из карточек)"""
+        fields = tuple(fields)
+        details = {
+            doc['url']: {field: doc[field] for field in fields if field in doc}
+            for doc in documents
+        }
+        details = {url: values for url, values in details.items() if values}
+        if not details:
+            return
+        async with self._lock:
+            with metrics.timer('storage_write_seconds', op='update_details'):
+                await asyncio.to_thread(self.storage.update_document_details, details)
+            self.documents.update_details(details)
+
+    async def enqueue_broadcast(self, documents: List[Dict[str, Any]]) -> int:
+        """Ставит новые документы в общую очередь рассылки (режим нескольких процессов)"""
+        with metrics.timer('storage_write_seconds', op='enqueue_broadcast'):
+            return await asyncio.to_thread(self.storage.enqueue_broadcast, documents)
+
+    async def search(self, text: str, limit: int = 10,
+                     organizations: Optional[Dict[str, str]] = None) -> List[Dict[str, Any]]:
+        """Поиск по названиям документов (пустой список, если индекс отключен)
+
+        organizations - сопоставление ключей источников (federal, ...) названиям
+        организаций для фильтра орг:
+        """
+        if self.search_index is None:
+            return []
+        query = parse_query(text, organizations)
+        with metrics.timer('search_seconds'):
+            return await asyncio.to_thread(self.search_index.search, query, limit)
+
+_cache = None
+
+def get_cache() -> DatabaseCache:
+    """Возвращает общий кэш, загружая его при первом обращении"""
+    global _cache
+    if _cache is None:
+        search_index = SearchIndex(SEARCH_DB_FILE) if SEARCH_INDEX_ENABLED else None
+        _cache = DatabaseCache(search_index=search_index, dedup_file=DEDUP_INDEX_FILE)
+        _cache.load()
+    return _cache
\ No newline at end of file
@@ -1,193 +1,521 @@
-# main.py - с новым WebParser
-import asyncio
-import logging
-import os
-from aiogram import Bot, Dispatcher, types
-from aiogram.filters import Command
-from aiogram.client.default import DefaultBotProperties
-
-# Импорты из database.py
-from database import (
-    add_user, remove_user, get_user_count, 
-    add_documents, get_recent_documents, get_document_count
-)
-
-# Импорты нового парсера
-from parsers.web_parser import get_parser
-
-# Настройка логирования
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(message)s"
-)
-logger = logging.getLogger(__name__)
-
-async def main():
-    try:
-        BOT_TOKEN = os.getenv("BOT_TOKEN")
-        if not BOT_TOKEN:
-            logger.error("❌ BOT_TOKEN не найден")
-            return
-        
-        logger.info("✅ Токен найден, запускаем бота...")
-        
-        bot = Bot(token=BOT_TOKEN, default=DefaultBotProperties(parse_mode="HTML"))
-        dp = Dispatcher()
-        parser = get_parser()
-
-        @dp.message(Command("start"))
-        async def start_command(message: types.Message):
-            user_id = message.from_user.id
-            add_user(user_id)
-            user_count = get_user_count()
-            doc_count = get_document_count()
-            
-            await message.answer(
-                "👋 <b>Добро пожаловать в бот правовых актов!</b>\n\n"
-                "✅ Вы подписаны на обновления\n"
-                f"📊 Пользователей: {user_count}\n"
-                f"📄 Документов в базе: {doc_count}\n\n"
-                "⚡ <b>Команды:</b>\n"
-                "/docs - последние документы\n"
-                "/update - обновить базу\n"
-                "/help - справка\n"
-                "/stats - статистика\n"
-                "/unsubscribe - отписаться"
-            )
-
-        @dp.message(Command("help"))
-        async def help_command(message: types.Message):
-            await message.answer(
-                "ℹ️ <b>Справка по боту:</b>\n\n"
-                "📋 <b>Основные команды:</b>\n"
-                "/start - подписаться и начать работу\n"
-                "/docs - показать последние документы\n"
-                "/update - обновить базу документов\n"
-                "/stats - статистика бота\n"
-                "/unsubscribe - отписаться от обновлений\n\n"
-                "🔔 <b>Источники:</b>\n"
-                "• Минпросвещения России\n"
-                "• Минобрнауки Якутии\n"
-                "• Рособрнадзор"
-            )
-
-        @dp.message(Command("stats"))
-        async def stats_command(message: types.Message):
-            user_count = get_user_count()
-            doc_count = get_document_count()
-            recent_docs = get_recent_documents(3)
-            
-            stats_text = (
-                "📊 <b>Статистика бота:</b>\n\n"
-                f"• Пользователей: {user_count}\n"
-                f"• Документов: {doc_count}\n"
-                f"• Статус: 🟢 Активен\n"
-                f"• Парсер: WebParser\n\n"
-            )
-            
-            if recent_docs:
-                stats_text += "📅 <b>Последние документы:</b>\n"
-                for doc in recent_docs:
-                    org_short = doc['organization'].split()[-1]  # Берем последнее слово
-                    stats_text += f"• {doc['publishDate']} - {org_short}\n"
-            
-            await message.answer(stats_text)
-
-        @dp.message(Command("unsubscribe"))
-        async def unsubscribe_command(message: types.Message):
-            user_id = message.from_user.id
-            remove_user(user_id)
-            await message.answer(
-                "🔔 Вы отписаны от обновлений.\n"
-                "Чтобы снова подписаться, отправьте /start"
-            )
-
-        @dp.message(Command("docs"))
-        async def docs_command(message: types.Message):
-            """Показывает последние документы"""
-            documents = get_recent_documents(5)
-            if not documents:
-                await message.answer(
-                    "📭 <b>В базе пока нет документов</b>\n\n"
-                    "Используйте команду /update для загрузки документов."
-                )
-                return
-            
-            await message.answer(f"📄 <b>Последние {len(documents)} документов:</b>")
-            
-            for i, doc in enumerate(documents, 1):
-                # Сокращаем длинное название организации
-                org_name = doc['organization']
-                if len(org_name) > 40:
-                    org_name = org_name[:40] + "..."
-                
-                text = (
-                    f"<b>📋 Документ {i}</b>\n"
-                    f"<b>Организация:</b> {org_name}\n"
-                    f"<b>Дата:</b> {doc.get('publishDate', 'Не указана')}\n"
-                    f"<b>Название:</b> {doc.get('documentTitle', 'Без названия')}\n"
-                    f"<a href='{doc.get('url', '')}'>🔗 Открыть документ</a>"
-                )
-                await message.answer(text)
-                await asyncio.sleep(0.3)  # Задержка между сообщениями
-
-        @dp.message(Command("update"))
-        async def update_command(message: types.Message):
-            """Обновляет базу документов"""
-            wait_msg = await message.answer(
-                "🔄 <b>Загрузка новых документов...</b>\n\n"
-                "Это может занять 1-2 минуты.\n"
-                "Парсим официальные источники..."
-            )
-            
-            try:
-                new_docs = parser.get_documents()
-                if new_docs:
-                    added_count = add_documents(new_docs)
-                    if added_count > 0:
-                        await wait_msg.edit_text(
-                            f"✅ <b>Обновление завершено!</b>\n\n"
-                            f"Добавлено <b>{added_count}</b> новых документов.\n"
-                            f"Всего в базе: <b>{get_document_count()}</b>\n\n"
-                            f"Используйте /docs для просмотра"
-                        )
-                    else:
-                        await wait_msg.edit_text(
-                            "✅ <b>Все документы актуальны</b>\n\n"
-                            "Новых документов не найдено.\n"
-                            f"Всего в базе: <b>{get_document_count()}</b>"
-                        )
-                else:
-                    await wait_msg.edit_text(
-                        "❌ <b>Не удалось загрузить документы</b>\n\n"
-                        "Возможно, проблема с доступом к источникам.\n"
-                        "Попробуйте позже или проверьте логи."
-                    )
-            except Exception as e:
-                logger.error(f"Ошибка обновления: {e}")
-                await wait_msg.edit_text(
-                    "❌ <b>Ошибка при обновлении базы</b>\n\n"
-                    "Технические проблемы. Попробуйте позже."
-                )
-
-        @dp.message()
-        async def echo(message: types.Message):
-            await message.answer(
-                "ℹ️ <b>Используйте команды:</b>\n"
-                "/start - начать работу\n"
-                "/docs - последние документы\n" 
-                "/update - обновить базу\n"
-                "/help - справка\n"
-                "/stats - статистика"
-            )
-
-        logger.info("🚀 Бот запускается с WebParser...")
-        await dp.start_polling(bot)
-
-    except Exception as e:
-        logger.error(f"❌ Критическая ошибка: {e}")
-        import traceback
-        traceback.print_exc()
-
-if __name__ == "__main__":
+# main.py - с новым WebParser
+import asyncio
+import html
+import logging
+import os
+from dataclasses import replace
+from typing import Iterable, Optional
+from aiogram import Bot, Dispatcher, types
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.filters import Command
+from aiogram.client.default import DefaultBotProperties
+
+# Импорты из database.py
+from database import init_database, get_cache
+
+# Импорты нового парсера
+from parsers.async_parser import get_async_parser
+from parsers.details import DETAIL_FIELDS, get_detail_enricher
+
+from bot.broadcast import Broadcaster
+from bot.cluster import ClusterConfig, LeaderElection, BroadcastRelay
+from bot.pagination import DocsPage, RenderCache, render_docs_page
+from bot.scheduler import RefreshCoordinator, RefreshResult
+from bot.middlewares import HandlerMetricsMiddleware, ConcurrencyLimitMiddleware, LimitedDispatcher
+from bot.webhook import WebhookConfig, run_webhook
+from search.stemmer import normalize
+from metrics import metrics
+
+# Настройка логирования
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+# Сколько ключевых фраз может задать один подписчик
+MAX_KEYWORDS = 20
+# Документов на странице /docs
+DOCS_PER_PAGE = 5
+# Сколько результатов /search показывать
+SEARCH_RESULTS = 10
+# Ограничение времени обхода источников, с (0 - без ограничения)
+CRAWL_DEADLINE = float(os.getenv("CRAWL_DEADLINE", "300"))
+
+
+def create_refresher(db, parser, broadcaster: Broadcaster, enricher=None,
+                     cluster: Optional[ClusterConfig] = None) -> RefreshCoordinator:
+    """Обновление базы: обход источников, сохранение и рассылка новых документов"""
+    cluster = cluster or ClusterConfig()
+
+    async def publish_documents(added_docs):
+        """Дополняет реквизитами и рассылает пакет новых документов, не дожидаясь конца обхода"""
+        if enricher is not None:
+            enriched = await enricher.enrich(added_docs)
+            await db.update_document_details(enriched, DETAIL_FIELDS)
+        if cluster.enabled:
+            # Разошлют все процессы, каждый своей доле подписчиков
+            await db.enqueue_broadcast(added_docs)
+        else:
+            # Рассылка идет в фоне; пакеты, пришедшие во время нее, Broadcaster объединит
+            broadcaster.start(added_docs)
+
+    async def refresh_documents() -> RefreshResult:
+        """Обходит источники, сохраняет и рассылает новые документы по мере разбора
+
+        Каждый записанный пакет сразу дополняется реквизитами и уходит в рассылку,
+        так что новые документы не копятся в памяти до конца обхода.
+        """
+        fetched, added = await db.add_document_stream(
+            parser.iter_documents(known_urls=db.get_known_urls(), deadline=CRAWL_DEADLINE or None),
+            on_added=publish_documents,
+            batch_size=int(os.getenv("STREAM_BATCH_SIZE", "0")),
+        )
+        if cluster.enabled:
+            await asyncio.to_thread(db.storage.prune_broadcasts, cluster.outbox_retention)
+        return RefreshResult(fetched=fetched, added=added, partial=parser.deadline_hit)
+
+    return RefreshCoordinator(
+        refresh_documents,
+        result_ttl=float(os.getenv("UPDATE_RESULT_TTL", "60")),
+    )
+
+
+def create_dispatcher(db, parser, broadcaster: Broadcaster, refresher: RefreshCoordinator,
+                      admin_ids: Iterable[int] = (), election: Optional[LeaderElection] = None,
+                      limiter: Optional[ConcurrencyLimitMiddleware] = None) -> Dispatcher:
+    """Dispatcher со всеми командами бота (его же нагружает benchmarks/load_test.py)"""
+    admin_ids = set(admin_ids)
+    # С limiter апдейты принимаются, только пока есть свободный слот
+    dp = LimitedDispatcher(limiter) if limiter is not None else Dispatcher()
+    dp.message.middleware(HandlerMetricsMiddleware())
+    dp.callback_query.middleware(HandlerMetricsMiddleware())
+
+    @dp.message(Command("start"))
+    async def start_command(message: types.Message):
+        user_id = message.from_user.id
+        await db.add_user(user_id)
+        user_count = db.get_user_count()
+        doc_count = db.get_document_count()
+
+        await message.answer(
+            "👋 <b>Добро пожаловать в бот правовых актов!</b>\n\n"
+            "✅ Вы подписаны на обновления\n"
+            f"📊 Пользователей: {user_count}\n"
+            f"📄 Документов в базе: {doc_count}\n\n"
+            "⚡ <b>Команды:</b>\n"
+            "/docs - последние документы\n"
+            "/search - поиск по архиву\n"
+            "/subscribe - выбрать источники\n"
+            "/keywords - ключевые слова\n"
+            "/update - обновить базу\n"
+            "/help - справка\n"
+            "/stats - статистика\n"
+            "/unsubscribe - отписаться"
+        )
+
+    @dp.message(Command("help"))
+    async def help_command(message: types.Message):
+        await message.answer(
+            "ℹ️ <b>Справка по боту:</b>\n\n"
+            "📋 <b>Основные команды:</b>\n"
+            "/start - подписаться и начать работу\n"
+            "/docs [источник] - последние документы\n"
+            "/search &lt;слова&gt; - поиск по архиву документов\n"
+            "/update - обновить базу документов\n"
+            "/stats - статистика бота\n"
+            "/unsubscribe - отписаться от обновлений\n\n"
+            "🎯 <b>Фильтры рассылки:</b>\n"
+            "/subscribe federal regional - только выбранные источники\n"
+            "/keywords аттестация, ФГОС - только документы с этими словами\n"
+            "/subscribe all, /keywords off - снять фильтр\n\n"
+            "🔎 <b>Фильтры поиска:</b>\n"
+            "с:01.01.2024 по:31.12.2024 - период публикации\n"
+            "орг:federal | regional | rosobrnadzor - источник\n"
+            "образоват* - поиск по началу слова\n\n"
+            "🔔 <b>Источники:</b>\n"
+            "• Минпросвещения России\n"
+            "• Минобрнауки Якутии\n"
+            "• Рособрнадзор"
+        )
+
+    @dp.message(Command("stats"))
+    async def stats_command(message: types.Message):
+        user_count = db.get_user_count()
+        doc_count = db.get_document_count()
+        recent_docs = db.get_recent_documents(3)
+
+        stats_text = (
+            "📊 <b>Статистика бота:</b>\n\n"
+            f"• Пользователей: {user_count}\n"
+            f"• Документов: {doc_count}\n"
+            f"• Статус: 🟢 Активен\n"
+            f"• Парсер: WebParser\n"
+        )
+
+        if broadcaster.current:
+            progress = broadcaster.current
+            stats_text += f"• Рассылка: {progress.processed}/{progress.total} чатов\n"
+        stats_text += "\n"
+
+        if recent_docs:
+            stats_text += "📅 <b>Последние документы:</b>\n"
+            for doc in recent_docs:
+                org_short = doc['organization'].split()[-1]  # Берем последнее слово
+                stats_text += f"• {doc['publishDate']} - {org_short}\n"
+
+        await message.answer(stats_text)
+
+    @dp.message(Command("metrics"))
+    async def metrics_command(message: types.Message):
+        """Сводка метрик (только для администраторов)"""
+        if message.from_user.id not in admin_ids:
+            await message.answer("⛔ Команда доступна только администраторам")
+            return
+        await message.answer("📈 <b>Метрики бота:</b>\n\n" + metrics.summary_text())
+
+    @dp.message(Command("unsubscribe"))
+    async def unsubscribe_command(message: types.Message):
+        user_id = message.from_user.id
+        await db.remove_user(user_id)
+        await message.answer(
+            "🔔 Вы отписаны от обновлений.\n"
+            "Чтобы снова подписаться, отправьте /start"
+        )
+
+    render_cache = RenderCache()
+
+    async def docs_page(page: int, source: str = ""):
+        """Текст и кнопки страницы архива по дате публикации (None, если документов нет)"""
+        organization = parser.ORGANIZATION_NAMES.get(source) if source else None
+        total = db.get_document_count(organization)
+        if not total:
+            return None, None
+        page = max(0, min(page, (total - 1) // DOCS_PER_PAGE))
+        documents = await db.get_documents_page(page * DOCS_PER_PAGE, DOCS_PER_PAGE, organization)
+        return render_docs_page(documents, page, total, DOCS_PER_PAGE, render_cache, source)
+
+    @dp.message(Command("docs"))
+    async def docs_command(message: types.Message):
+        """Показывает последние документы одной страницей с навигацией (/docs federal - по источнику)"""
+        args = message.text.split()[1:]
+        source = args[0].lower() if args else ""
+        if source and source not in parser.ORGANIZATION_NAMES:
+            await message.answer(
+                f"❌ Неизвестный источник: {html.escape(source)}\n"
+                f"Доступные: {', '.join(parser.ORGANIZATION_NAMES)}"
+            )
+            return
+        text, keyboard = await docs_page(0, source)
+        if text is None:
+            await message.answer(
+                "📭 <b>В базе пока нет документов</b>\n\n"
+                "Используйте команду /update для загрузки документов."
+            )
+            return
+        await message.answer(text, reply_markup=keyboard, disable_web_page_preview=True)
+
+    @dp.callback_query(DocsPage.filter())
+    async def docs_page_callback(callback: types.CallbackQuery, callback_data: DocsPage):
+        """Листает архив, редактируя то же сообщение"""
+        text, keyboard = await docs_page(callback_data.page, callback_data.source)
+        if text is not None and callback.message is not None:
+            try:
+                await callback.message.edit_text(text, reply_markup=keyboard, disable_web_page_preview=True)
+            except TelegramBadRequest as e:
+                # Нажата кнопка текущей страницы - текст не изменился
+                if "message is not modified" not in e.message:
+                    raise
+        await callback.answer()
+
+    def describe_subscription(user_id: int) -> str:
+        subscription = db.get_subscription(user_id)
+        sources = ', '.join(sorted(subscription.sources)) or 'все'
+        keywords = ', '.join(html.escape(k) for k in subscription.keywords) or 'без ограничений'
+        return (
+            f"📡 <b>Источники:</b> {sources}\n"
+            f"🔤 <b>Ключевые слова:</b> {keywords}"
+        )
+
+    @dp.message(Command("subscribe"))
+    async def subscribe_command(message: types.Message):
+        """Ограничивает рассылку выбранными источниками"""
+        user_id = message.from_user.id
+        args = message.text.split()[1:]
+        if not args:
+            await message.answer(
+                "🎯 <b>Ваши фильтры</b>\n\n" + describe_subscription(user_id) + "\n\n"
+                f"Доступные источники: {', '.join(parser.ORGANIZATION_NAMES)}\n"
+                "Пример: /subscribe federal rosobrnadzor\n"
+                "Все источники: /subscribe all"
+            )
+            return
+
+        sources = [] if args[0].lower() == 'all' else [arg.lower() for arg in args]
+        unknown = [source for source in sources if source not in parser.ORGANIZATION_NAMES]
+        if unknown:
+            await message.answer(
+                f"❌ Неизвестные источники: {html.escape(', '.join(unknown))}\n"
+                f"Доступные: {', '.join(parser.ORGANIZATION_NAMES)}"
+            )
+            return
+
+        await db.add_user(user_id)
+        await db.set_subscription(user_id, sources=sources)
+        await message.answer("✅ <b>Фильтры обновлены</b>\n\n" + describe_subscription(user_id))
+
+    @dp.message(Command("keywords"))
+    async def keywords_command(message: types.Message):
+        """Ограничивает рассылку документами с ключевыми словами в названии"""
+        user_id = message.from_user.id
+        text = message.text.partition(' ')[2].strip()
+        if not text:
+            await message.answer(
+                "🎯 <b>Ваши фильтры</b>\n\n" + describe_subscription(user_id) + "\n\n"
+                "Укажите слова или фразы через запятую:\n"
+                "/keywords аттестация педагогов, ФГОС\n"
+                "Снять фильтр: /keywords off"
+            )
+            return
+
+        keywords = [] if text.lower() == 'off' else [k.strip() for k in text.split(',') if k.strip()]
+        if len(keywords) > MAX_KEYWORDS:
+            await message.answer(f"❌ Можно указать не больше {MAX_KEYWORDS} ключевых фраз")
+            return
+        meaningless = [keyword for keyword in keywords if not normalize(keyword)]
+        if meaningless:
+            await message.answer(
+                "❌ В фразах нет значимых слов: " + html.escape(', '.join(meaningless)) + "\n"
+                "Предлоги, союзы и знаки препинания при подборе не учитываются"
+            )
+            return
+
+        await db.add_user(user_id)
+        await db.set_subscription(user_id, keywords=keywords)
+        await message.answer("✅ <b>Фильтры обновлены</b>\n\n" + describe_subscription(user_id))
+
+    @dp.message(Command("search"))
+    async def search_command(message: types.Message):
+        """Ищет документы по словам из названия"""
+        query = message.text.partition(' ')[2].strip()
+        if not query:
+            await message.answer(
+                "🔎 <b>Поиск по архиву</b>\n\n"
+                "Пример: /search приказ аттестация с:2024 орг:federal"
+            )
+            return
+
+        try:
+            # Лишний документ показывает, что совпадений больше, чем помещается в ответ
+            documents = await db.search(query, limit=SEARCH_RESULTS + 1,
+                                        organizations=parser.ORGANIZATION_NAMES)
+        except ValueError as e:
+            await message.answer(
+                f"❌ {html.escape(str(e))}\n"
+                f"Доступные источники: {', '.join(parser.ORGANIZATION_NAMES)}"
+            )
+            return
+        if not documents:
+            await message.answer("📭 Ничего не найдено")
+            return
+
+        if len(documents) > SEARCH_RESULTS:
+            documents = documents[:SEARCH_RESULTS]
+            header = f"🔎 <b>Первые {SEARCH_RESULTS} найденных документов</b>\n"
+        else:
+            header = f"🔎 <b>Найдено документов: {len(documents)}</b>\n"
+        lines = [header]
+        for doc in documents:
+            lines.append(
+                f"• {doc['publishDate']} - <a href='{html.escape(doc['url'], quote=True)}'>"
+                f"{html.escape(doc['documentTitle'])}</a>"
+            )
+        await message.answer('\n'.join(lines), disable_web_page_preview=True)
+
+    @dp.message(Command("update"))
+    async def update_command(message: types.Message):
+        """Обновляет базу документов"""
+        if election is not None and not election.is_leader:
+            await message.answer(
+                "⏳ <b>Обновление выполняет другой процесс бота</b>\n\n"
+                "Новые документы придут автоматически."
+            )
+            return
+
+        wait_msg = await message.answer(
+            "🔄 <b>Загрузка новых документов...</b>\n\n"
+            "Это может занять 1-2 минуты.\n"
+            "Парсим официальные источники..."
+        )
+
+        try:
+            result = await refresher.refresh()
+            partial_note = (
+                "\n\n⏰ Обход прерван по времени, часть источников проверим при следующем обновлении."
+                if result.partial else ""
+            )
+            if result.fetched:
+                if result.added > 0:
+                    await wait_msg.edit_text(
+                        f"✅ <b>Обновление завершено!</b>\n\n"
+                        f"Добавлено <b>{result.added}</b> новых документов.\n"
+                        f"Всего в базе: <b>{db.get_document_count()}</b>\n"
+                        f"📣 Рассылка подписчикам: <b>{db.get_user_count()}</b>\n\n"
+                        f"Используйте /docs для просмотра{partial_note}"
+                    )
+                else:
+                    await wait_msg.edit_text(
+                        "✅ <b>Все документы актуальны</b>\n\n"
+                        "Новых документов не найдено.\n"
+                        f"Всего в базе: <b>{db.get_document_count()}</b>{partial_note}"
+                    )
+            else:
+                await wait_msg.edit_text(
+                    "❌ <b>Не удалось загрузить документы</b>\n\n"
+                    "Возможно, проблема с доступом к источникам.\n"
+                    "Попробуйте позже или проверьте логи."
+                )
+        except Exception as e:
+            logger.error(f"Ошибка обновления: {e}")
+            await wait_msg.edit_text(
+                "❌ <b>Ошибка при обновлении базы</b>\n\n"
+                "Технические проблемы. Попробуйте позже."
+            )
+
+    @dp.message()
+    async def echo(message: types.Message):
+        await message.answer(
+            "ℹ️ <b>Используйте команды:</b>\n"
+            "/start - начать работу\n"
+            "/docs - последние документы\n" 
+            "/search - поиск по архиву\n"
+            "/update - обновить базу\n"
+            "/help - справка\n"
+            "/stats - статистика"
+        )
+
+    return dp
+
+
+async def main():
+    try:
+        BOT_TOKEN = os.getenv("BOT_TOKEN")
+        if not BOT_TOKEN:
+            logger.error("❌ BOT_TOKEN не найден")
+            return
+        
+        logger.info("✅ Токен найден, запускаем бота...")
+        
+        # WORKER_COUNT > 1: несколько процессов над общей SQLite-базой
+        cluster = ClusterConfig.from_env()
+        bot_mode = os.getenv("BOT_MODE", "polling").lower()
+        if cluster.enabled and bot_mode != "webhook":
+            logger.error("❌ Несколько процессов (WORKER_COUNT > 1) работают только с BOT_MODE=webhook")
+            return
+        if bot_mode == "webhook" and not WebhookConfig.from_env().secret_token:
+            # Без секрета aiogram принимает любой POST, в том числе поддельные команды администратора
+            logger.error("❌ Для BOT_MODE=webhook нужен WEBHOOK_SECRET")
+            return
+
+        init_database()
+        db = get_cache()
+        if cluster.enabled and not db.storage.shared:
+            logger.error("❌ Для нескольких процессов нужен STORAGE_BACKEND=sqlite")
+            return
+        
+        bot = Bot(token=BOT_TOKEN, default=DefaultBotProperties(parse_mode="HTML"))
+        # Апдейты обрабатываются параллельно, но не больше MAX_CONCURRENT_UPDATES сразу
+        limiter = ConcurrencyLimitMiddleware(int(os.getenv("MAX_CONCURRENT_UPDATES", "100")))
+        parser = get_async_parser()
+        db.subscriptions.set_organizations(parser.ORGANIZATION_NAMES)
+        enricher = get_detail_enricher(parser)
+        admin_ids = {
+            int(admin_id) for admin_id in os.getenv("ADMIN_IDS", "").split(",") if admin_id.strip()
+        }
+        if cluster.enabled:
+            # Каждый процесс рассылает своей доле чатов
+            def get_recipients():
+                return [user_id for user_id in db.get_users() if cluster.owns(user_id)]
+        else:
+            get_recipients = db.get_users
+        broadcaster = Broadcaster(
+            bot,
+            get_recipients=get_recipients,
+            on_blocked=db.remove_user,
+            route=db.subscriptions.route,
+            workers=int(os.getenv("BROADCAST_WORKERS", "50")),
+            global_rate=float(os.getenv("BROADCAST_RATE", "25")),
+        )
+
+        refresher = create_refresher(db, parser, broadcaster, enricher, cluster)
+        election = LeaderElection(db.storage, ttl=cluster.lease_ttl) if cluster.enabled else None
+
+        dp = create_dispatcher(db, parser, broadcaster, refresher, admin_ids, election, limiter)
+
+        refresh_interval = float(os.getenv("REFRESH_INTERVAL", "1800"))
+        refresh_jitter = float(os.getenv("REFRESH_JITTER", "60"))
+        relay = None
+        if election is not None:
+            async def on_elected():
+                # Обход идет только у ведущего; известные URL перечитываются из общей базы
+                await db.reload()
+                if refresh_interval > 0:
+                    refresher.start(refresh_interval, refresh_jitter)
+
+            election.start(on_elected=on_elected, on_lost=refresher.stop)
+            relay = BroadcastRelay(
+                db.storage, cluster.worker, deliver=broadcaster.broadcast,
+                poll_interval=cluster.poll_interval, on_poll=db.sync,
+            )
+            relay.start()
+            logger.info(f"🤝 Процесс {cluster.worker_index + 1} из {cluster.worker_count}")
+        elif refresh_interval > 0:
+            refresher.start(refresh_interval, refresh_jitter)
+
+        background_tasks = []
+        default_metrics = f"data/metrics.{cluster.worker}" if cluster.enabled else "data/metrics"
+        metrics_file = os.getenv("METRICS_FILE", f"{default_metrics}.prom")
+        if metrics_file:
+            background_tasks.append(asyncio.create_task(
+                metrics.export_files(metrics_file, os.getenv("METRICS_JSON_FILE", f"{default_metrics}.json"))
+            ))
+        metrics_port = int(os.getenv("METRICS_PORT", "0"))
+        metrics_runner = None
+        if metrics_port:
+            metrics_runner = await metrics.start_http_server(os.getenv("METRICS_HOST", "127.0.0.1"), metrics_port)
+
+        # BOT_MODE=webhook принимает апдейты по HTTP вместо long polling
+        logger.info(f"🚀 Бот запускается с WebParser ({bot_mode})...")
+        try:
+            if bot_mode == "webhook":
+                webhook_config = WebhookConfig.from_env()
+                if cluster.enabled:
+                    # Процессы слушают один порт, webhook регистрирует только первый
+                    webhook_config = replace(
+                        webhook_config, reuse_port=True,
+                        url=webhook_config.url if cluster.worker_index == 0 else "",
+                    )
+                await run_webhook(dp, bot, webhook_config, limiter=limiter)
+            else:
+                await dp.start_polling(bot)
+        finally:
+            if relay is not None:
+                await relay.stop()
+            await refresher.stop()
+            if election is not None:
+                await election.stop()
+            for task in background_tasks:
+                task.cancel()
+            if metrics_runner is not None:
+                await metrics_runner.cleanup()
+            await parser.close()
+            if enricher is not None:
+                enricher.close()
+
+    except Exception as e:
+        logger.error(f"❌ Критическая ошибка: {e}")
+        import traceback
+        traceback.print_exc()
+
+if __name__ == "__main__":
     asyncio.run(main())
\ No newline at end of file
@@ -0,0 +1,250 @@
+# metrics.py - метрики обхода, хранилища и обработчиков (Prometheus text / JSON)
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, Any, Tuple, Optional
+
+logger = logging.getLogger(__name__)
+
+# Границы гистограмм времени (секунды)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _escape_label(value: Any) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class _Histogram:
+    __slots__ = ('buckets', 'counts', 'count', 'sum', 'recent')
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+        self.recent = deque(maxlen=500)
+
+    def observe(self, value: float):
+        self.count += 1
+        self.sum += value
+        self.recent.append(value)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+
+    def quantile(self, q: float) -> float:
+        if not self.recent:
+            return 0.0
+        ordered = sorted(self.recent)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class Metrics:
+    """Реестр счетчиков, гауджей и гистограмм (потокобезопасный)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[LabelKey, float]] = {}
+        self._gauges: Dict[str, Dict[LabelKey, float]] = {}
+        self._histograms: Dict[str, Dict[LabelKey, _Histogram]] = {}
+        self.started_at = time.time()
+
+    @staticmethod
+    def _key(labels: Dict[str, Any]) -> LabelKey:
+        return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+    def inc(self, name: str, value: float = 1, **labels):
+        """Увеличивает счетчик"""
+        key = self._key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def set(self, name: str, value: float, **labels):
+        """Устанавливает значение гауджа"""
+        with self._lock:
+            self._gauges.setdefault(name, {})[self._key(labels)] = value
+
+    def observe(self, name: str, value: float, buckets: Tuple[float, ...] = LATENCY_BUCKETS, **labels):
+        """Добавляет наблюдение в гистограмму"""
+        key = self._key(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = _Histogram(buckets)
+            histogram.observe(value)
+
+    @contextmanager
+    def timer(self, name: str, **labels):
+        """Замеряет время блока и пишет его в гистограмму name"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, **labels)
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+            self._histograms.clear()
+
+    # ==============================
+    # 📤 ЭКСПОРТ
+    # ==============================
+
+    @staticmethod
+    def _format_labels(key: LabelKey, extra: Optional[Dict[str, str]] = None) -> str:
+        pairs = list(key) + list((extra or {}).items())
+        if not pairs:
+            return ''
+        escaped = (f'{k}="{_escape_label(v)}"' for k, v in pairs)
+        return '{' + ','.join(escaped) + '}'
+
+    def render_prometheus(self) -> str:
+        """Метрики в текстовом формате Prometheus"""
+        lines = []
+        with self._lock:
+            for name, series in sorted(self._counters.items()):
+                lines.append(f"# TYPE {name} counter")
+                for key, value in series.items():
+                    lines.append(f"{name}{self._format_labels(key)} {value}")
+            for name, series in sorted(self._gauges.items()):
+                lines.append(f"# TYPE {name} gauge")
+                for key, value in series.items():
+                    lines.append(f"{name}{self._format_labels(key)} {value}")
+            for name, series in sorted(self._histograms.items()):
+                lines.append(f"# TYPE {name} histogram")
+                for key, histogram in series.items():
+                    for bound, count in zip(histogram.buckets, histogram.counts):
+                        lines.append(f"{name}_bucket{self._format_labels(key, {'le': str(bound)})} {count}")
+                    lines.append(f"{name}_bucket{self._format_labels(key, {'le': '+Inf'})} {histogram.count}")
+                    lines.append(f"{name}_sum{self._format_labels(key)} {histogram.sum}")
+                    lines.append(f"{name}_count{self._format_labels(key)} {histogram.count}")
+        return '\n'.join(lines) + '\n'
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Метрики в виде словаря для JSON"""
+        def label_str(key: LabelKey) -> str:
+            return ','.join(f"{k}={v}" for k, v in key) or '_'
+
+        with self._lock:
+            return {
+                'uptime_s': round(time.time() - self.started_at, 1),
+                'counters': {
+                    name: {label_str(k): v for k, v in series.items()}
+                    for name, series in self._counters.items()
+                },
+                'gauges': {
+                    name: {label_str(k): v for k, v in series.items()}
+                    for name, series in self._gauges.items()
+                },
+                'histograms': {
+                    name: {
+                        label_str(k): {
+                            'count': h.count,
+                            'sum': round(h.sum, 6),
+                            'p50': round(h.quantile(0.5), 6),
+                            'p95': round(h.quantile(0.95), 6),
+                            'p99': round(h.quantile(0.99), 6),
+                        }
+                        for k, h in series.items()
+                    }
+                    for name, series in self._histograms.items()
+                },
+            }
+
+    def summary_text(self) -> str:
+        """Краткая сводка для команды /metrics"""
+        data = self.to_dict()
+        lines = [f"⏱ Аптайм: {data['uptime_s'] / 3600:.1f} ч"]
+
+        handlers = data['histograms'].get('handler_latency_seconds', {})
+        if handlers:
+            lines.append("\n<b>Обработчики (p50 / p95, мс):</b>")
+            for label, h in sorted(handlers.items()):
+                lines.append(f"• {label}: {h['p50'] * 1000:.0f} / {h['p95'] * 1000:.0f} (n={h['count']})")
+
+        for title, name in (
+            ("Загрузка страниц", 'crawl_fetch_seconds'),
+            ("Разбор страниц", 'crawl_parse_seconds'),
+            ("Запись в хранилище", 'storage_write_seconds'),
+            ("Чтение из хранилища", 'storage_read_seconds'),
+            ("Полный обход", 'crawl_duration_seconds'),
+        ):
+            series = data['histograms'].get(name, {})
+            if series:
+                lines.append(f"\n<b>{title} (p50 / p95, мс):</b>")
+                for label, h in sorted(series.items()):
+                    lines.append(f"• {label}: {h['p50'] * 1000:.0f} / {h['p95'] * 1000:.0f} (n={h['count']})")
+
+        counters = data['counters']
+        for title, name in (
+            ("Повторы запросов", 'crawl_retries_total'),
+            ("Документов извлечено", 'crawl_documents_total'),
+            ("Запросов отклонено выключателем", 'crawl_circuit_rejected_total'),
+        ):
+            series = counters.get(name, {})
+            if series:
+                lines.append(f"\n<b>{title}:</b> " + ', '.join(f"{k}: {v:.0f}" for k, v in sorted(series.items())))
+
+        dedup = data['gauges'].get('dedup_ratio', {}).get('_')
+        if dedup is not None:
+            lines.append(f"\n<b>Доля дубликатов в последнем обновлении:</b> {dedup:.0%}")
+        return '\n'.join(lines)
+
+    # ==============================
+    # 🌐 ПУБЛИКАЦИЯ
+    # ==============================
+
+    def write_files(self, prom_path: str, json_path: Optional[str] = None):
+        """Атомарно записывает метрики в файлы"""
+        os.makedirs(os.path.dirname(prom_path) or '.', exist_ok=True)
+        for path, content in ((prom_path, self.render_prometheus()),
+                              (json_path, json.dumps(self.to_dict(), ensure_ascii=False, indent=2))):
+            if not path:
+                continue
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(content)
+            os.replace(tmp_path, path)
+
+    async def export_files(self, prom_path: str, json_path: Optional[str] = None, interval: float = 30):
+        """Периодически сбрасывает метрики в файлы"""
+        while True:
+            try:
+                await asyncio.to_thread(self.write_files, prom_path, json_path)
+            except Exception as e:
+                logger.error(f"Ошибка записи метрик: {e}")
+            await asyncio.sleep(interval)
+
+    async def start_http_server(self, host: str = '127.0.0.1', port: int = 9100):
+        """Поднимает локальный эндпоинт /metrics и /metrics.json"""
+        from aiohttp import web
+
+        async def prometheus(request):
+            return web.Response(text=self.render_prometheus(), content_type='text/plain')
+
+        async def as_json(request):
+            return web.json_response(self.to_dict())
+
+        app = web.Application()
+        app.router.add_get('/metrics', prometheus)
+        app.router.add_get('/metrics.json', as_json)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        await web.TCPSite(runner, host, port).start()
+        logger.info(f"📈 Метрики доступны на http://{host}:{port}/metrics")
+        return runner
+
+
+# Общий реестр процесса
+metrics = Metrics()
@@ -0,0 +1,438 @@
+# parsers/async_parser.py - асинхронный режим WebParser на aiohttp
+import asyncio
+import logging
+import os
+import time
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+from typing import List, Dict, Any, Optional, Set, Tuple, Mapping, AsyncIterator
+
+import aiohttp
+
+from metrics import metrics
+from parsers.extractors import create_extractor
+from parsers.http_cache import HttpCache
+from parsers.resilience import SourceGuard, CircuitOpenError, CrawlDeadlineExceeded, create_source_guard
+from parsers.sources import SourceConfig, default_sources
+from parsers.web_parser import WebParser, create_http_cache, load_source_registry
+
+logger = logging.getLogger(__name__)
+
+
+class RetryableStatusError(Exception):
+    """Ответ сервера, после которого запрос нужно повторить"""
+
+    def __init__(self, status: int, retry_after: Optional[float] = None):
+        super().__init__(f"HTTP {status}")
+        self.status = status
+        self.retry_after = retry_after
+
+
+class SourceThrottle:
+    """Ограничение запросов к одному источнику: не больше concurrency
+    одновременно и не чаще одного запроса в delay секунд"""
+
+    def __init__(self, concurrency: int, delay: float = 0.0):
+        self.delay = delay
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._lock = asyncio.Lock()
+        self._next_at = 0.0
+
+    async def __aenter__(self):
+        await self._semaphore.acquire()
+        if self.delay:
+            async with self._lock:
+                now = time.monotonic()
+                if self._next_at > now:
+                    await asyncio.sleep(self._next_at - now)
+                self._next_at = max(now, self._next_at) + self.delay
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self._semaphore.release()
+        return False
+
+
+class AsyncWebParser(WebParser):
+    """Асинхронный парсер: все ведомства обходятся одновременно"""
+
+    # Статусы, для которых учитывается заголовок Retry-After (как в urllib3)
+    RETRY_AFTER_STATUSES = {413, 429, 503}
+
+    def __init__(self, limit: int = 50, total_connections: int = 10,
+                 connections_per_host: int = 4, timeout: float = 30,
+                 http_cache: Optional[HttpCache] = None, extractor: Optional[str] = None,
+                 sources: Optional[List[SourceConfig]] = None, guard: Optional[SourceGuard] = None):
+        self.limit = limit
+        self.http_cache = http_cache
+        self.guard = guard
+        self.extractor = create_extractor(self, extractor or os.getenv("PARSER_BACKEND", "lxml"))
+        self.set_sources(sources or default_sources(self.SOURCE_URLS, self.ORGANIZATION_NAMES))
+        self._throttles: Dict[str, SourceThrottle] = {}
+        self.total_connections = total_connections
+        self.connections_per_host = connections_per_host
+        self.timeout = timeout
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._deadline: Optional[float] = None
+        self.deadline_hit = False
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        """Создает общую сессию с пулом соединений (лениво, внутри event loop)"""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.total_connections,
+                limit_per_host=self.connections_per_host,
+                ttl_dns_cache=300,
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                headers=self.HEADERS,
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+            )
+        return self._session
+
+    async def close(self):
+        """Закрывает сессию и пул соединений"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    def _backoff_time(self, retry_number: int) -> float:
+        """Пауза перед повтором по формуле urllib3: factor * 2 ** (n - 1), первый повтор сразу"""
+        if retry_number <= 1:
+            return 0
+        return self.RETRY_BACKOFF_FACTOR * (2 ** (retry_number - 1))
+
+    @staticmethod
+    def _parse_retry_after(value: Optional[str]) -> Optional[float]:
+        """Разбирает заголовок Retry-After (секунды или HTTP-дата)"""
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            retry_at = parsedate_to_datetime(value)
+            return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+        except (TypeError, ValueError):
+            return None
+
+    async def fetch(self, url: str) -> str:
+        """Загружает страницу с повторными попытками"""
+        _, text, _ = await self.request(url)
+        return text
+
+    async def request(self, url: str, headers: Optional[Dict[str, str]] = None,
+                      source_key: str = '', probe: bool = False) -> Tuple[int, str, Mapping[str, str]]:
+        """GET с повторными попытками, возвращает (статус, тело, заголовки)
+
+        Для запросов к источнику (source_key) таймаут каждой попытки берется
+        из SourceGuard и не выходит за дедлайн обхода; итог запроса
+        учитывается выключателем источника (probe - запрос пробный).
+        """
+        session = self._get_session()
+        retry_number = 0
+
+        while True:
+            timeout, clipped = self._request_timeout(source_key)
+            started = time.perf_counter()
+            try:
+                async with session.get(url, headers=headers,
+                                       timeout=aiohttp.ClientTimeout(total=timeout)) as response:
+                    if response.status in self.RETRY_STATUSES:
+                        retry_after = None
+                        if response.status in self.RETRY_AFTER_STATUSES:
+                            retry_after = self._parse_retry_after(response.headers.get('Retry-After'))
+                        raise RetryableStatusError(response.status, retry_after)
+                    # Ответ 4xx - источник жив, выключатель его не учитывает
+                    self._record_success(source_key, time.perf_counter() - started)
+                    response.raise_for_status()
+                    text = await response.text() if response.status != 304 else ''
+                    return response.status, text, response.headers.copy()
+            except (RetryableStatusError, aiohttp.ClientConnectionError,
+                    aiohttp.ClientPayloadError, asyncio.TimeoutError) as e:
+                retry_number += 1
+                metrics.inc('crawl_retries_total', reason=getattr(e, 'status', None) or type(e).__name__)
+                if clipped and isinstance(e, asyncio.TimeoutError):
+                    # Таймаут сокращен дедлайном обхода - источник не виноват
+                    raise self._deadline_exceeded() from e
+                if retry_number > self.RETRY_TOTAL:
+                    self._record_failure(source_key, probe)
+                    raise
+
+                delay = getattr(e, 'retry_after', None)
+                if delay is None:
+                    delay = self._backoff_time(retry_number)
+                if self._deadline is not None and source_key and time.monotonic() + delay >= self._deadline:
+                    # Повтор уже не успеет до конца обхода
+                    raise self._deadline_exceeded() from e
+                logger.warning(f"🔁 Повтор {retry_number}/{self.RETRY_TOTAL} для {url} через {delay:.1f} с: {e!r}")
+                await asyncio.sleep(delay)
+
+    async def fetch_page(self, url: str, org_name: str,
+                         source_key: str = '') -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """Загружает страницу (условным запросом, если есть кэш) и разбирает ее"""
+        probe = self._before_request(source_key)
+        try:
+            headers = self.http_cache.conditional_headers(url) if self.http_cache else None
+            throttle = self._throttles.get(source_key)
+            with metrics.timer('crawl_fetch_seconds', source=source_key):
+                if throttle is not None:
+                    async with throttle:
+                        status, html, response_headers = await self.request(url, headers, source_key, probe)
+                else:
+                    status, html, response_headers = await self.request(url, headers, source_key, probe)
+
+            if status == 304 and self.http_cache:
+                cached = self.http_cache.not_modified(url)
+                if cached is not None:
+                    logger.info(f"💾 Страница не изменилась (304): {url}")
+                    return cached
+                # Кэш потерял запись - запрашиваем страницу целиком
+                status, html, response_headers = await self.request(url, source_key=source_key, probe=probe)
+        finally:
+            # Проба, прерванная дедлайном или отменой, не должна блокировать источник
+            if probe:
+                self.guard.release_probe(source_key)
+
+        etag = response_headers.get('ETag')
+        last_modified = response_headers.get('Last-Modified')
+        if self.http_cache:
+            body_hash = self.http_cache.body_hash(html)
+            cached = self.http_cache.lookup(url, body_hash)
+            if cached is not None:
+                logger.info(f"💾 Тело страницы не изменилось: {url}")
+                return cached
+
+        # Разбор HTML выполняется в потоке, чтобы не блокировать event loop бота
+        page_docs, next_url = await asyncio.to_thread(self.process_page, html, url, org_name)
+        if self.http_cache:
+            self.http_cache.store(url, body_hash, page_docs, next_url, etag, last_modified)
+        return page_docs, next_url
+
+    async def get_documents(self, known_urls: Optional[Set[str]] = None,
+                            deadline: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Получает документы со всех источников одновременно
+
+        known_urls включает инкрементальный режим, deadline ограничивает
+        время обхода (см. WebParser.get_documents).
+        """
+        started = time.perf_counter()
+        self._reset_throttles()
+        self._start_deadline(deadline)
+        try:
+            results = await asyncio.gather(*(
+                self._parse_source(source_key, url, known_urls)
+                for source_key, url in self.SOURCE_URLS.items()
+            ))
+        finally:
+            self._deadline = None
+
+        all_documents = []
+        for docs in results:
+            all_documents.extend(docs)
+
+        await asyncio.to_thread(self.save_crawl_state)
+        metrics.observe('crawl_duration_seconds', time.perf_counter() - started, mode='async')
+        return all_documents
+
+    async def iter_documents(self, known_urls: Optional[Set[str]] = None,
+                             buffer_pages: int = 0,
+                             deadline: Optional[float] = None) -> AsyncIterator[List[Dict[str, Any]]]:
+        """Обходит источники одновременно и отдает страницы документов по мере разбора
+
+        Источники складывают страницы в общую очередь на buffer_pages мест
+        (по умолчанию две на источник), поэтому в памяти одновременно
+        не больше нескольких страниц, а медленный потребитель
+        притормаживает обход. Через deadline секунд источники перестают
+        запрашивать страницы и обход завершается с тем, что успел собрать.
+        """
+        started = time.perf_counter()
+        self._reset_throttles()
+        self._start_deadline(deadline)
+        queue: asyncio.Queue = asyncio.Queue(maxsize=buffer_pages or 2 * len(self.sources))
+        done = object()
+
+        async def produce(source_key: str, url: str):
+            count = 0
+            try:
+                logger.info(f"🔄 Парсим источник: {source_key}")
+                async for page_docs in self.iter_department(url, source_key, known_urls):
+                    count += len(page_docs)
+                    await queue.put(page_docs)
+                logger.info(f"✅ Получено {count} документов из {source_key}")
+            except Exception as e:
+                logger.error(f"❌ Ошибка парсинга {source_key}: {e}")
+            await queue.put(done)
+
+        producers = [
+            asyncio.create_task(produce(source_key, url))
+            for source_key, url in self.SOURCE_URLS.items()
+        ]
+        try:
+            remaining = len(producers)
+            while remaining:
+                item = await queue.get()
+                if item is done:
+                    remaining -= 1
+                else:
+                    yield item
+        finally:
+            for task in producers:
+                task.cancel()
+            await asyncio.gather(*producers, return_exceptions=True)
+            self._deadline = None
+            await asyncio.to_thread(self.save_crawl_state)
+            metrics.observe('crawl_duration_seconds', time.perf_counter() - started, mode='async')
+
+    def _reset_throttles(self):
+        self._throttles = {
+            key: SourceThrottle(source.concurrency, source.delay) for key, source in self.sources.items()
+        }
+
+    async def _parse_source(self, source_key: str, url: str,
+                            known_urls: Optional[Set[str]] = None) -> List[Dict[str, Any]]:
+        """Парсит один источник, ошибки не прерывают остальные"""
+        try:
+            logger.info(f"🔄 Парсим источник: {source_key}")
+            docs = await self.parse_department(url, source_key, known_urls)
+            logger.info(f"✅ Получено {len(docs)} документов из {source_key}")
+            return docs
+        except Exception as e:
+            logger.error(f"❌ Ошибка парсинга {source_key}: {e}")
+            return []
+
+    async def parse_department(self, start_url: str, source_key: str,
+                               known_urls: Optional[Set[str]] = None) -> List[Dict[str, Any]]:
+        """Парсит документы ведомства с пагинацией"""
+        all_docs = []
+        async for page_docs in self.iter_department(start_url, source_key, known_urls):
+            all_docs.extend(page_docs)
+        return all_docs
+
+    async def iter_department(self, start_url: str, source_key: str,
+                              known_urls: Optional[Set[str]] = None) -> AsyncIterator[List[Dict[str, Any]]]:
+        """Отдает документы ведомства постранично"""
+        source = self.sources[source_key]
+        if source.pagination == "page_number":
+            pages = self._iter_numbered_pages(start_url, source)
+        else:
+            pages = self._iter_linked_pages(start_url, source)
+
+        limit = source.limit or self.limit
+        total = 0
+        page_count = 0
+        logger.info(f"🌐 Начинаем парсинг для {source.organization}")
+        try:
+            async for page_docs in pages:
+                page_count += 1
+                metrics.inc('crawl_pages_total', source=source_key)
+                metrics.inc('crawl_documents_total', len(page_docs), source=source_key)
+                logger.info(f"📑 На странице {page_count} найдено {len(page_docs)} документов")
+
+                limit_reached = total + len(page_docs) >= limit
+                page_docs = page_docs[:limit - total]
+                total += len(page_docs)
+                known_page = self.is_known_page(page_docs, known_urls)
+                if page_docs:
+                    yield page_docs
+
+                if limit_reached:
+                    logger.info(f"⚡ Достигнут лимит в {limit} документов")
+                    break
+                if known_page:
+                    logger.info(f"⏹ На странице {page_count} нет новых документов, останавливаемся")
+                    break
+        finally:
+            await pages.aclose()
+        logger.info(f"✅ Всего для {source.organization}: {total} документов")
+
+    async def _iter_linked_pages(self, start_url: str,
+                                 source: SourceConfig) -> AsyncIterator[List[Dict[str, Any]]]:
+        """Страницы по ссылкам "следующая" (find_next_page)"""
+        current_url = start_url
+        page_count = 0
+        while current_url and page_count < source.max_pages:
+            if self.deadline_passed():
+                return
+            page_count += 1
+            logger.info(f"📄 Страница {page_count}: {current_url}")
+            try:
+                page_docs, next_url = await self.fetch_page(current_url, source.organization, source.key)
+            except (CircuitOpenError, CrawlDeadlineExceeded) as e:
+                logger.warning(f"⛔ {source.key} пропущен: {e}")
+                return
+            except Exception as e:
+                logger.error(f"❌ Ошибка при парсинге страницы {current_url}: {e}")
+                return
+
+            yield page_docs
+            if not next_url:
+                logger.info(f"🛑 Пагинация завершена на странице {page_count}")
+                return
+            current_url = next_url
+
+    async def _iter_numbered_pages(self, start_url: str,
+                                   source: SourceConfig) -> AsyncIterator[List[Dict[str, Any]]]:
+        """Страницы по номерам: следующие страницы запрашиваются заранее
+
+        Одновременно в работе до source.concurrency страниц; результаты
+        отдаются строго по порядку, и при остановке (лимит, известная
+        или пустая страница) новые запросы не отправляются.
+        """
+        first_page = source.start_page
+        last_page = first_page + source.max_pages - 1
+        pending: Dict[int, asyncio.Task] = {}
+        next_to_schedule = first_page
+
+        def schedule():
+            nonlocal next_to_schedule
+            while (len(pending) < source.concurrency and next_to_schedule <= last_page
+                   and not self.deadline_passed()):
+                url = start_url if next_to_schedule == first_page else source.page_url(next_to_schedule)
+                pending[next_to_schedule] = asyncio.create_task(
+                    self.fetch_page(url, source.organization, source.key)
+                )
+                next_to_schedule += 1
+
+        try:
+            for page in range(first_page, last_page + 1):
+                schedule()
+                if page not in pending:
+                    return  # время обхода вышло
+                try:
+                    page_docs, _ = await pending.pop(page)
+                except (CircuitOpenError, CrawlDeadlineExceeded) as e:
+                    logger.warning(f"⛔ {source.key} пропущен: {e}")
+                    return
+                except aiohttp.ClientResponseError as e:
+                    if e.status == 404 and page > first_page:
+                        logger.info(f"🛑 Страницы {page} нет, пагинация завершена")
+                    else:
+                        logger.error(f"❌ Ошибка при парсинге страницы {page} ({source.key}): {e}")
+                    return
+                except Exception as e:
+                    logger.error(f"❌ Ошибка при парсинге страницы {page} ({source.key}): {e}")
+                    return
+
+                yield page_docs
+                if not page_docs:
+                    logger.info(f"🛑 Пагинация завершена на странице {page}")
+                    return
+        finally:
+            # Запросы не отменяются на полпути: прерванный ответ может остаться
+            # в соединении пула. Лишних страниц не больше concurrency - 1.
+            await asyncio.gather(*pending.values(), return_exceptions=True)
+
+
+def get_async_parser() -> AsyncWebParser:
+    """Возвращает экземпляр асинхронного парсера для использования в main.py"""
+    return AsyncWebParser(limit=30, http_cache=create_http_cache(), sources=load_source_registry(),
+                          guard=create_source_guard())
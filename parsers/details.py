@@ -0,0 +1,142 @@
+# parsers/details.py - загрузка карточек /Document/View/ и разбор реквизитов в пуле процессов
+import asyncio
+import logging
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Any, Optional
+from urllib.parse import urljoin
+
+from bs4 import BeautifulSoup
+
+from metrics import metrics
+from parsers.extractors import DATE_RE
+
+logger = logging.getLogger(__name__)
+
+# Поля карточки документа и подписи, под которыми они встречаются на странице
+DETAIL_LABELS = {
+    "documentType": ("вид документа", "вид акта"),
+    "documentNumber": ("номер документа", "номер акта", "номер"),
+    "signingDate": ("дата подписания", "дата принятия"),
+}
+DETAIL_FIELDS = tuple(DETAIL_LABELS) + ("pdfUrl",)
+
+LABEL_RE = re.compile(
+    r'^\s*(' + '|'.join(sorted({re.escape(l) for labels in DETAIL_LABELS.values() for l in labels},
+                               key=len, reverse=True)) + r')\s*(?::\s*(.*))?$',
+    re.IGNORECASE | re.DOTALL
+)
+PDF_LINK_RE = re.compile(r'/file/pdf|\.pdf(\?|$)', re.IGNORECASE)
+
+
+def parse_document_details(html: str, url: str) -> Dict[str, str]:
+    """Реквизиты документа со страницы карточки
+
+    Функция верхнего уровня, чтобы ее можно было выполнять в ProcessPoolExecutor.
+    """
+    soup = BeautifulSoup(html, 'html.parser')
+    details: Dict[str, str] = {}
+
+    for element in soup.find_all(['dt', 'th', 'td', 'span', 'div', 'b', 'strong', 'label']):
+        if element.find(['dt', 'th', 'td', 'div']):
+            continue  # берем только самые вложенные элементы с подписью
+        match = LABEL_RE.match(element.get_text(' ', strip=True))
+        if not match:
+            continue
+        field = _field_for_label(match.group(1))
+        if field is None or field in details:
+            continue
+
+        value = (match.group(2) or '').strip()
+        if not value:
+            sibling = element.find_next_sibling()
+            value = sibling.get_text(' ', strip=True) if sibling else ''
+        if field == "signingDate":
+            date_match = DATE_RE.search(value)
+            value = date_match.group() if date_match else ''
+        if value:
+            details[field] = value
+
+    pdf_link = soup.find('a', href=PDF_LINK_RE)
+    if pdf_link:
+        details["pdfUrl"] = urljoin(url, pdf_link['href'])
+    return details
+
+
+def _field_for_label(label: str) -> Optional[str]:
+    label = label.lower()
+    for field, labels in DETAIL_LABELS.items():
+        if label in labels:
+            return field
+    return None
+
+
+class DetailEnricher:
+    """Дополняет новые документы реквизитами из их карточек
+
+    Карточки загружаются через сессию AsyncWebParser не более concurrency
+    одновременно, разбор HTML идет в пуле процессов и не держит GIL
+    и цикл событий бота.
+    """
+
+    def __init__(self, parser, concurrency: int = 4, processes: Optional[int] = None):
+        self.parser = parser
+        self.concurrency = concurrency
+        self.processes = processes or min(4, os.cpu_count() or 1)
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.processes)
+        return self._pool
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    async def enrich(self, documents: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Добавляет реквизиты в документы (на месте), возвращает дополненные"""
+        semaphore = asyncio.Semaphore(self.concurrency)
+        results = await asyncio.gather(
+            *(self._enrich_one(doc, semaphore) for doc in documents), return_exceptions=True
+        )
+
+        enriched = []
+        for doc, result in zip(documents, results):
+            if isinstance(result, Exception):
+                metrics.inc('details_fetched_total', status='error')
+                logger.warning(f"⚠️ Не удалось получить реквизиты {doc.get('url')}: {result!r}")
+            elif result:
+                doc.update(result)
+                enriched.append(doc)
+                metrics.inc('details_fetched_total', status='ok')
+            else:
+                metrics.inc('details_fetched_total', status='empty')
+
+        if documents:
+            logger.info(f"🧾 Реквизиты получены для {len(enriched)} из {len(documents)} документов")
+        return enriched
+
+    async def _enrich_one(self, doc: Dict[str, Any], semaphore: asyncio.Semaphore) -> Dict[str, str]:
+        url = doc.get('url', '')
+        if '/Document/View/' not in url:
+            return {}
+        async with semaphore:
+            with metrics.timer('details_fetch_seconds'):
+                html = await self.parser.fetch(url)
+        loop = asyncio.get_running_loop()
+        with metrics.timer('details_parse_seconds'):
+            return await loop.run_in_executor(self._get_pool(), parse_document_details, html, url)
+
+
+def get_detail_enricher(parser) -> Optional[DetailEnricher]:
+    """Создает DetailEnricher, если он включен через ENRICH_DETAILS=1"""
+    if os.getenv("ENRICH_DETAILS", "0") != "1":
+        return None
+    return DetailEnricher(
+        parser,
+        concurrency=int(os.getenv("ENRICH_CONCURRENCY", "4")),
+        processes=int(os.getenv("ENRICH_PROCESSES", "0")) or None,
+    )
@@ -0,0 +1,325 @@
+# parsers/extractors.py - движки извлечения документов из HTML листинга
+import logging
+import re
+from typing import List, Dict, Any, Optional, Tuple
+from urllib.parse import urljoin
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+from parsers.urls import canonical_url
+
+logger = logging.getLogger(__name__)
+
+DATE_RE = re.compile(r'\d{2}\.\d{2}\.\d{4}')
+
+DOCUMENT_LINK_MARKER = '/Document/View/'
+CONTAINER_CLASSES = ('document-item', 'doc-item')
+PAGINATION_CLASSES = ('pagination', 'pager')
+NEXT_LINK_CLASSES = ('next', 'page-next')
+# Порядок важен: он повторяет список селекторов WebParser.find_date_in_container
+DATE_CLASSES = ('document-date', 'doc-date', 'date', 'publication-date', 'publish-date')
+NO_DATE = "Дата не указана"
+NO_TITLE = "Без названия"
+
+PageResult = Tuple[List[Dict[str, Any]], Optional[str]]
+
+
+class SoupExtractor:
+    """Исходный движок: полное дерево BeautifulSoup (html.parser)"""
+
+    name = "soup"
+
+    def __init__(self, parser):
+        self.parser = parser
+
+    def extract(self, html: str, current_url: str, org_name: str) -> PageResult:
+        soup = BeautifulSoup(html, 'html.parser')
+        return self.parser.parse_page(soup, org_name), self.parser.find_next_page(soup, current_url)
+
+
+def _class_list(attrs) -> List[str]:
+    """Классы тега из сырых атрибутов парсера"""
+    value = dict(attrs).get('class') if attrs else None
+    if not value:
+        return []
+    if isinstance(value, str):
+        return value.split()
+    return list(value)
+
+
+def _listing_region(name, attrs=None) -> bool:
+    """Фильтр SoupStrainer: только контейнеры документов и пагинация"""
+    if name == 'div':
+        return any(cls in CONTAINER_CLASSES for cls in _class_list(attrs))
+    if name == 'ul':
+        return any(cls in PAGINATION_CLASSES for cls in _class_list(attrs))
+    if name == 'a':
+        return any(cls in NEXT_LINK_CLASSES for cls in _class_list(attrs))
+    return False
+
+
+class StrainerExtractor(SoupExtractor):
+    """html.parser + SoupStrainer: в дерево попадают только контейнеры и пагинация
+
+    Дата и ссылка контейнера ищутся за один проход по его потомкам.
+    Если контейнеров нет, страница разбирается целиком, как в SoupExtractor.
+    """
+
+    name = "strainer"
+
+    def extract(self, html: str, current_url: str, org_name: str) -> PageResult:
+        soup = BeautifulSoup(html, 'html.parser', parse_only=SoupStrainer(_listing_region))
+        containers = soup.find_all('div', class_=list(CONTAINER_CLASSES))
+        if not containers:
+            # Поиск по ссылкам смотрит на соседей и родителей - нужно полное дерево
+            return super().extract(html, current_url, org_name)
+
+        documents = []
+        for container in containers:
+            doc = self._extract_container(container, org_name)
+            if doc:
+                documents.append(doc)
+        return documents, self.parser.find_next_page(soup, current_url)
+
+    def _extract_container(self, container, org_name: str) -> Optional[Dict[str, Any]]:
+        link = None
+        date_elements = {}
+        for element in container.descendants:
+            if not hasattr(element, 'attrs'):
+                continue
+            if link is None and element.name == 'a':
+                href = element.get('href')
+                if href and DOCUMENT_LINK_MARKER in href:
+                    link = element
+            for cls in element.get('class') or ():
+                if cls in DATE_CLASSES and cls not in date_elements:
+                    date_elements[cls] = element
+
+        if link is None:
+            return None
+
+        date = None
+        for cls in DATE_CLASSES:
+            element = date_elements.get(cls)
+            if element is not None:
+                match = DATE_RE.search(_clean_text(element.get_text()))
+                if match:
+                    date = match.group()
+                    break
+        if date is None:
+            match = DATE_RE.search(container.get_text())
+            date = match.group() if match else NO_DATE
+
+        return _make_document(self.parser.BASE_URL, org_name, link.get('href'),
+                              link.get_text(), link.get('title', NO_TITLE), date)
+
+
+class LxmlExtractor:
+    """Разбор через lxml и XPath (требует пакет lxml)
+
+    Повторяет семантику BeautifulSoup: текст без script/style и комментариев,
+    соседние узлы с учетом текстовых, строка ссылки для пагинации.
+    """
+
+    name = "lxml"
+
+    CONTAINERS_XPATH = '//div[{}]'.format(' or '.join(
+        f"contains(concat(' ', normalize-space(@class), ' '), ' {cls} ')" for cls in CONTAINER_CLASSES
+    ))
+    PAGINATION_XPATH = '//ul[{}]'.format(' or '.join(
+        f"contains(concat(' ', normalize-space(@class), ' '), ' {cls} ')" for cls in PAGINATION_CLASSES
+    ))
+    NEXT_LINK_XPATH = '//a[{}]'.format(' or '.join(
+        f"contains(concat(' ', normalize-space(@class), ' '), ' {cls} ')" for cls in NEXT_LINK_CLASSES
+    ))
+    DOCUMENT_LINKS_XPATH = f".//a[contains(@href, '{DOCUMENT_LINK_MARKER}')]"
+    SKIP_TEXT_TAGS = {'script', 'style', 'template'}
+
+    def __init__(self, parser):
+        import lxml.html  # noqa: F401 - проверяем наличие зависимости заранее
+        from lxml import etree
+        self.parser = parser
+        self._lxml_html = lxml.html
+        self._parser_error = etree.ParserError
+        self._html_parser = lxml.html.HTMLParser(encoding='utf-8')
+        self._containers = etree.XPath(self.CONTAINERS_XPATH)
+        self._pagination = etree.XPath(self.PAGINATION_XPATH)
+        self._next_link = etree.XPath(self.NEXT_LINK_XPATH)
+        self._document_links = etree.XPath(self.DOCUMENT_LINKS_XPATH)
+        self._date_elements = [
+            etree.XPath(f".//*[contains(concat(' ', normalize-space(@class), ' '), ' {cls} ')]")
+            for cls in DATE_CLASSES
+        ]
+
+    def extract(self, html: str, current_url: str, org_name: str) -> PageResult:
+        if not html or not html.strip():
+            return [], None
+        try:
+            root = self._lxml_html.fromstring(html.encode('utf-8'), parser=self._html_parser)
+        except self._parser_error:
+            # Страница без элементов (только комментарий) - как у остальных движков
+            return [], None
+
+        documents = []
+        containers = self._containers(root)
+        if containers:
+            for container in containers:
+                doc = self._extract_container(container, org_name)
+                if doc:
+                    documents.append(doc)
+        else:
+            for link in self._document_links(root):
+                documents.append(_make_document(
+                    self.parser.BASE_URL, org_name, link.get('href'),
+                    self._text(link, with_tail=False), link.get('title', NO_TITLE),
+                    self._nearby_date(link)
+                ))
+        return documents, self._next_page(root)
+
+    def _extract_container(self, container, org_name: str) -> Optional[Dict[str, Any]]:
+        links = self._document_links(container)
+        if not links:
+            return None
+        link = links[0]
+
+        date = None
+        for date_elements in self._date_elements:
+            found = date_elements(container)
+            if found:
+                match = DATE_RE.search(_clean_text(self._text(found[0], with_tail=False)))
+                if match:
+                    date = match.group()
+                    break
+        if date is None:
+            match = DATE_RE.search(self._text(container, with_tail=False))
+            date = match.group() if match else NO_DATE
+
+        return _make_document(self.parser.BASE_URL, org_name, link.get('href'),
+                              self._text(link, with_tail=False), link.get('title', NO_TITLE), date)
+
+    def _nearby_date(self, link) -> str:
+        for node in (self._previous_node(link), self._next_node(link)):
+            if node is None:
+                continue
+            text = node if isinstance(node, str) else self._text(node, with_tail=False)
+            match = DATE_RE.search(text)
+            if match:
+                return match.group()
+
+        parent = link.getparent()
+        for _ in range(3):
+            if parent is None:
+                break
+            match = DATE_RE.search(self._text(parent, with_tail=False))
+            if match:
+                return match.group()
+            parent = parent.getparent()
+        return NO_DATE
+
+    @staticmethod
+    def _previous_node(element):
+        """Предыдущий узел в терминах BeautifulSoup (текст или элемент)"""
+        previous = element.getprevious()
+        if previous is not None:
+            return previous.tail if previous.tail else previous
+        parent = element.getparent()
+        return parent.text if parent is not None and parent.text else None
+
+    @staticmethod
+    def _next_node(element):
+        """Следующий узел в терминах BeautifulSoup (текст или элемент)"""
+        if element.tail:
+            return element.tail
+        return element.getnext()
+
+    def _next_page(self, root) -> Optional[str]:
+        pagination = self._pagination(root)
+        if pagination:
+            anchors = [(a, self._string(a)) for a in pagination[0].iter('a')]
+            next_links = [a for a, string in anchors if string and '>' in string]
+            if not next_links:
+                next_links = [a for a, string in anchors if string and 'след' in string.lower()]
+            for link in next_links:
+                href = link.get('href')
+                if href:
+                    return urljoin(self.parser.BASE_URL, href)
+
+        next_buttons = self._next_link(root)
+        if next_buttons and next_buttons[0].get('href'):
+            return urljoin(self.parser.BASE_URL, next_buttons[0].get('href'))
+        return None
+
+    def _string(self, element) -> Optional[str]:
+        """Аналог Tag.string: текст единственного дочернего узла"""
+        nodes = []
+        if element.text:
+            nodes.append(element.text)
+        for child in element:
+            nodes.append(child)
+            if child.tail:
+                nodes.append(child.tail)
+        if len(nodes) != 1:
+            return None
+        node = nodes[0]
+        if isinstance(node, str):
+            return node
+        if not isinstance(node.tag, str):
+            return node.text
+        return self._string(node)
+
+    def _text(self, element, with_tail: bool = True) -> str:
+        """Аналог get_text(): без script/style и комментариев"""
+        parts = []
+        self._collect_text(element, parts)
+        if with_tail and element.tail:
+            parts.append(element.tail)
+        return ''.join(parts)
+
+    def _collect_text(self, element, parts: List[str]):
+        if isinstance(element.tag, str) and element.tag not in self.SKIP_TEXT_TAGS:
+            if element.text:
+                parts.append(element.text)
+            for child in element:
+                self._collect_text(child, parts)
+                if child.tail:
+                    parts.append(child.tail)
+
+
+def _clean_text(text: str) -> str:
+    if not text:
+        return ""
+    return ' '.join(text.split()).strip()
+
+
+def _make_document(base_url: str, org_name: str, href: str, text: str,
+                   title_attr: str, date: str) -> Dict[str, Any]:
+    """Собирает запись документа так же, как WebParser.extract_document_from_*"""
+    title = _clean_text(text)
+    if not title or title == NO_TITLE:
+        title = title_attr
+    return {
+        "organization": org_name,
+        "documentTitle": title[:500],
+        "url": canonical_url(urljoin(base_url, href), base_url),
+        "publishDate": date,
+    }
+
+
+EXTRACTORS = {
+    SoupExtractor.name: SoupExtractor,
+    StrainerExtractor.name: StrainerExtractor,
+    LxmlExtractor.name: LxmlExtractor,
+}
+
+
+def create_extractor(parser, backend: str = "lxml"):
+    """Создает движок извлечения; при отсутствии lxml откатывается на strainer"""
+    extractor_class = EXTRACTORS.get(backend)
+    if extractor_class is None:
+        logger.warning(f"⚠️ Неизвестный движок разбора {backend}, используем strainer")
+        extractor_class = StrainerExtractor
+    try:
+        return extractor_class(parser)
+    except ImportError:
+        logger.warning(f"⚠️ Движок {backend} недоступен (нет lxml), используем strainer")
+        return StrainerExtractor(parser)
@@ -0,0 +1,118 @@
+# parsers/http_cache.py - HTTP-кэш страниц листинга на диске
+import hashlib
+import json
+import os
+import logging
+import time
+from typing import List, Dict, Any, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class HttpCache:
+    """Кэш страниц листинга: ETag/Last-Modified, хэш тела и результат разбора
+
+    Для каждого URL хранятся валидаторы для условного GET и уже разобранные
+    документы со ссылкой на следующую страницу, поэтому на 304 или при
+    неизменном теле страница повторно не парсится.
+    """
+
+    def __init__(self, path: str = 'data/http_cache.json', max_entries: int = 1000):
+        self.path = path
+        self.max_entries = max_entries
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self.hits_not_modified = 0
+        self.hits_unchanged = 0
+        self.misses = 0
+        self._dirty = False
+        self.load()
+
+    def load(self):
+        """Загружает кэш с диска"""
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self.entries = json.load(f)
+        except Exception as e:
+            logger.error(f"Ошибка загрузки HTTP-кэша: {e}")
+            self.entries = {}
+
+    def save(self):
+        """Атомарно сохраняет кэш на диск (только если он менялся)"""
+        if not self._dirty:
+            return
+        if len(self.entries) > self.max_entries:
+            # Вытесняем записи, которые дольше всего не использовались
+            by_age = sorted(self.entries.items(), key=lambda item: item[1].get('used', 0))
+            self.entries = dict(by_age[-self.max_entries:])
+        try:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.entries, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+            self._dirty = False
+        except Exception as e:
+            logger.error(f"Ошибка сохранения HTTP-кэша: {e}")
+
+    @staticmethod
+    def body_hash(body: str) -> str:
+        return hashlib.sha256(body.encode('utf-8')).hexdigest()
+
+    def conditional_headers(self, url: str) -> Dict[str, str]:
+        """Заголовки условного запроса для URL"""
+        entry = self.entries.get(url)
+        if not entry:
+            return {}
+        headers = {}
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def not_modified(self, url: str) -> Optional[Tuple[List[Dict[str, Any]], Optional[str]]]:
+        """Результат разбора для ответа 304"""
+        entry = self.entries.get(url)
+        if entry is None:
+            return None
+        self.hits_not_modified += 1
+        return self._result(entry)
+
+    def lookup(self, url: str, body_hash: str) -> Optional[Tuple[List[Dict[str, Any]], Optional[str]]]:
+        """Результат разбора, если тело страницы не изменилось"""
+        entry = self.entries.get(url)
+        if entry is None or entry.get('body_hash') != body_hash:
+            self.misses += 1
+            return None
+        self.hits_unchanged += 1
+        return self._result(entry)
+
+    def store(self, url: str, body_hash: str, documents: List[Dict[str, Any]],
+              next_url: Optional[str], etag: Optional[str] = None,
+              last_modified: Optional[str] = None):
+        """Запоминает валидаторы и результат разбора страницы"""
+        self.entries[url] = {
+            'etag': etag,
+            'last_modified': last_modified,
+            'body_hash': body_hash,
+            'documents': documents,
+            'next_url': next_url,
+            'used': time.time(),
+        }
+        self._dirty = True
+
+    def _result(self, entry: Dict[str, Any]) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        entry['used'] = time.time()
+        self._dirty = True
+        return [dict(doc) for doc in entry.get('documents', [])], entry.get('next_url')
+
+    def stats(self) -> Dict[str, int]:
+        """Счетчики попаданий и промахов"""
+        return {
+            'hits_not_modified': self.hits_not_modified,
+            'hits_unchanged': self.hits_unchanged,
+            'misses': self.misses,
+            'entries': len(self.entries),
+        }
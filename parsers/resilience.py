@@ -0,0 +1,220 @@
+# parsers/resilience.py - адаптивные таймауты и автоматический выключатель по источникам
+import json
+import logging
+import os
+import time
+from collections import deque
+from typing import Dict, Any, Optional
+
+from metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Источник временно отключен выключателем"""
+
+    def __init__(self, source: str, retry_in: float):
+        super().__init__(f"источник {source} отключен еще на {retry_in:.0f} с")
+        self.source = source
+        self.retry_in = retry_in
+
+
+class CrawlDeadlineExceeded(Exception):
+    """Время обхода вышло, запрос не отправлялся"""
+
+
+class SourceState:
+    """История задержек и состояние выключателя одного источника"""
+
+    def __init__(self, history: int):
+        self.latencies: deque = deque(maxlen=history)
+        self.state = CLOSED
+        self.failures = 0
+        self.trips = 0                  # сколько раз подряд выключатель срабатывал
+        self.opened_until = 0.0         # time.time(), чтобы переживать перезапуск
+        self.probing = False
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "failures": self.failures,
+            "trips": self.trips,
+            "opened_until": self.opened_until,
+            "latencies": [round(value, 3) for value in self.latencies],
+        }
+
+    def update(self, data: Dict[str, Any]):
+        self.state = data.get("state", CLOSED)
+        if self.state == HALF_OPEN:
+            self.state = OPEN  # проба не завершилась до перезапуска
+        self.failures = data.get("failures", 0)
+        self.trips = data.get("trips", 0)
+        self.opened_until = data.get("opened_until", 0.0)
+        self.latencies.extend(data.get("latencies", ()))
+
+
+class SourceGuard:
+    """Таймауты по истории задержек и выключатель для каждого источника
+
+    Таймаут запроса - p95 последних history успешных ответов, умноженный
+    на timeout_factor и ограниченный [min_timeout, max_timeout]; пока
+    истории мало, действует max_timeout. После failure_threshold неудачных
+    запросов подряд источник отключается на open_seconds (при повторных
+    срабатываниях - вдвое дольше, до max_open_seconds), затем пропускается
+    один пробный запрос: успех включает источник, ошибка снова отключает.
+    Пробой владеет вызов, которому before_request вернул True: только его
+    ошибка (record_failure с probe=True) снова отключает источник, и только
+    он снимает пробу release_probe, если она завершилась без итога (дедлайн
+    обхода, отмена, прочие исключения). Ошибки запросов, начатых до
+    отключения, срок отключения не продлевают.
+    Состояние сохраняется в path и переживает перезапуск.
+    """
+
+    def __init__(self, path: Optional[str] = 'data/breakers.json',
+                 failure_threshold: int = 3,
+                 open_seconds: float = 60.0,
+                 max_open_seconds: float = 1800.0,
+                 min_timeout: float = 5.0,
+                 max_timeout: float = 30.0,
+                 timeout_factor: float = 3.0,
+                 history: int = 50):
+        self.path = path
+        self.failure_threshold = failure_threshold
+        self.open_seconds = open_seconds
+        self.max_open_seconds = max_open_seconds
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.timeout_factor = timeout_factor
+        self.history = history
+        self.sources: Dict[str, SourceState] = {}
+        self._dirty = False
+        self.load()
+
+    def _state(self, source: str) -> SourceState:
+        state = self.sources.get(source)
+        if state is None:
+            state = self.sources[source] = SourceState(self.history)
+        return state
+
+    # ==============================
+    # ⏱ ТАЙМАУТЫ
+    # ==============================
+
+    def timeout_for(self, source: str) -> float:
+        """Таймаут запроса к источнику по истории его задержек"""
+        latencies = sorted(self._state(source).latencies)
+        if len(latencies) < 5:
+            return self.max_timeout
+        p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+        return min(self.max_timeout, max(self.min_timeout, p95 * self.timeout_factor))
+
+    # ==============================
+    # 🔌 ВЫКЛЮЧАТЕЛЬ
+    # ==============================
+
+    def before_request(self, source: str) -> bool:
+        """Проверяет, можно ли обращаться к источнику; иначе CircuitOpenError
+
+        Возвращает True, если этот запрос - проба после отключения.
+        """
+        state = self._state(source)
+        if state.state == CLOSED:
+            return False
+        now = time.time()
+        if state.state == OPEN and now >= state.opened_until:
+            state.state = HALF_OPEN
+            state.probing = False
+            logger.info(f"🔌 {source}: пробный запрос после отключения")
+        if state.state == HALF_OPEN and not state.probing:
+            state.probing = True
+            return True
+        metrics.inc('crawl_circuit_rejected_total', source=source)
+        raise CircuitOpenError(source, max(0.0, state.opened_until - now))
+
+    def release_probe(self, source: str):
+        """Снимает пробу, если она завершилась без record_success/record_failure
+
+        Вызывает только владелец пробы (before_request вернул True).
+        """
+        state = self.sources.get(source)
+        if state is not None and state.state == HALF_OPEN and state.probing:
+            state.probing = False
+            logger.info(f"🔌 {source}: пробный запрос завершился без результата")
+
+    def record_success(self, source: str, latency: float):
+        state = self._state(source)
+        state.latencies.append(latency)
+        if state.state != CLOSED:
+            logger.info(f"✅ {source}: источник снова доступен")
+        state.state = CLOSED
+        state.failures = 0
+        state.trips = 0
+        state.probing = False
+        self._dirty = True
+        metrics.set('crawl_circuit_open', 0, source=source)
+
+    def record_failure(self, source: str, probe: bool = False):
+        """Учитывает неудачный запрос; probe - результат before_request этого запроса"""
+        state = self._state(source)
+        state.failures += 1
+        self._dirty = True
+        if state.state == OPEN or (state.state == HALF_OPEN and not probe):
+            return  # запрос начат до отключения - срок отключения не продлеваем
+        if state.state == HALF_OPEN or state.failures >= self.failure_threshold:
+            state.trips += 1
+            duration = min(self.max_open_seconds, self.open_seconds * 2 ** (state.trips - 1))
+            state.state = OPEN
+            state.probing = False
+            state.opened_until = time.time() + duration
+            metrics.set('crawl_circuit_open', 1, source=source)
+            logger.warning(f"⛔ {source}: {state.failures} ошибок подряд, источник отключен на {duration:.0f} с")
+
+    def is_open(self, source: str) -> bool:
+        state = self.sources.get(source)
+        return state is not None and state.state == OPEN and time.time() < state.opened_until
+
+    # ==============================
+    # 💾 СОХРАНЕНИЕ
+    # ==============================
+
+    def load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            for source, values in data.items():
+                self._state(source).update(values)
+        except Exception as e:
+            logger.error(f"Ошибка загрузки состояния выключателей: {e}")
+
+    def save(self):
+        """Атомарно сохраняет состояние (только если оно менялось)"""
+        if not self.path or not self._dirty:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({source: state.to_dict() for source, state in self.sources.items()},
+                          f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.path)
+            self._dirty = False
+        except Exception as e:
+            logger.error(f"Ошибка сохранения состояния выключателей: {e}")
+
+
+def create_source_guard() -> Optional[SourceGuard]:
+    """Создает SourceGuard из переменных окружения (SOURCE_GUARD=0 отключает)"""
+    if os.getenv("SOURCE_GUARD", "1") == "0":
+        return None
+    return SourceGuard(
+        os.getenv("BREAKERS_FILE", "data/breakers.json"),
+        failure_threshold=int(os.getenv("BREAKER_THRESHOLD", "3")),
+        open_seconds=float(os.getenv("BREAKER_OPEN_SECONDS", "60")),
+        min_timeout=float(os.getenv("FETCH_MIN_TIMEOUT", "5")),
+        max_timeout=float(os.getenv("FETCH_MAX_TIMEOUT", "30")),
+    )
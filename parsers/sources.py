@@ -0,0 +1,92 @@
+# parsers/sources.py - реестр источников: адрес, бюджет страниц, вежливость, пагинация
+import json
+import logging
+import os
+from dataclasses import dataclass, fields, replace
+from typing import List, Dict, Optional
+from urllib.parse import urlparse, parse_qs, urlencode, urlunparse
+
+logger = logging.getLogger(__name__)
+
+# next_link - следующая страница ищется в разметке (find_next_page),
+# page_number - адрес страницы N строится из параметра page, что позволяет
+# запрашивать следующую страницу, пока разбирается текущая
+PAGINATION_STRATEGIES = ("next_link", "page_number")
+
+
+@dataclass(frozen=True)
+class SourceConfig:
+    """Описание одного ведомства"""
+    key: str
+    url: str
+    organization: str
+    max_pages: int = 10
+    limit: Optional[int] = None   # бюджет документов (None - лимит парсера)
+    delay: float = 0.0            # минимальный интервал между запросами, с
+    concurrency: int = 2          # одновременных запросов к источнику
+    pagination: str = "next_link"
+    page_param: str = "page"
+    enabled: bool = True
+
+    def __post_init__(self):
+        if self.pagination not in PAGINATION_STRATEGIES:
+            raise ValueError(f"{self.key}: неизвестная стратегия пагинации {self.pagination!r}")
+        if self.max_pages < 1 or self.concurrency < 1:
+            raise ValueError(f"{self.key}: max_pages и concurrency должны быть положительными")
+
+    def page_url(self, page: int) -> str:
+        """Адрес страницы с номером page (для стратегии page_number)"""
+        parts = urlparse(self.url)
+        query = parse_qs(parts.query, keep_blank_values=True)
+        query[self.page_param] = [str(page)]
+        return urlunparse(parts._replace(query=urlencode(query, doseq=True)))
+
+    @property
+    def start_page(self) -> int:
+        value = parse_qs(urlparse(self.url).query).get(self.page_param, ['1'])[0]
+        return int(value) if value.isdigit() else 1
+
+
+def default_sources(source_urls: Dict[str, str], organization_names: Dict[str, str]) -> List[SourceConfig]:
+    """Реестр из встроенных SOURCE_URLS / ORGANIZATION_NAMES"""
+    return [
+        SourceConfig(key=key, url=url, organization=organization_names[key])
+        for key, url in source_urls.items()
+    ]
+
+
+def load_sources(path: Optional[str], defaults: List[SourceConfig]) -> List[SourceConfig]:
+    """Загружает реестр из JSON-файла поверх встроенных источников
+
+    Файл - список объектов с полями SourceConfig. Запись с ключом
+    встроенного источника меняет только указанные поля, новая запись
+    добавляет источник (url и organization обязательны).
+    """
+    if not path or not os.path.exists(path):
+        return list(defaults)
+
+    with open(path, 'r', encoding='utf-8') as f:
+        entries = json.load(f)
+    if isinstance(entries, dict):
+        entries = entries.get('sources', [])
+
+    allowed = {field.name for field in fields(SourceConfig)}
+    registry: Dict[str, SourceConfig] = {source.key: source for source in defaults}
+    for entry in entries:
+        unknown = set(entry) - allowed
+        if unknown:
+            raise ValueError(f"{path}: неизвестные поля источника {sorted(unknown)}")
+        key = entry.get('key')
+        if not key:
+            raise ValueError(f"{path}: у источника не указан key")
+        if key in registry:
+            registry[key] = replace(registry[key], **entry)
+        else:
+            try:
+                registry[key] = SourceConfig(**entry)
+            except TypeError as e:
+                raise ValueError(f"{path}: неполное описание источника {key}: {e}") from None
+
+    sources = [source for source in registry.values() if source.enabled]
+    logger.info(f"📚 Реестр источников из {path}: {', '.join(source.key for source in sources)}")
+    return sources
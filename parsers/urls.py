@@ -0,0 +1,39 @@
+# parsers/urls.py - канонические адреса документов
+import re
+from typing import Optional
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+# Все ссылки на документ приводятся к этому адресу
+CANONICAL_BASE = "http://publication.pravo.gov.ru"
+
+DOCUMENT_VIEW_RE = re.compile(r'/Document/View/([0-9A-Za-z]+)', re.IGNORECASE)
+
+
+def document_id(url: str) -> Optional[str]:
+    """Номер документа из адреса /Document/View/<id> (None для прочих адресов)"""
+    match = DOCUMENT_VIEW_RE.search(url or '')
+    return match.group(1).lower() if match else None
+
+
+def canonical_url(url: str, base: str = CANONICAL_BASE) -> str:
+    """Единый адрес документа
+
+    /Document/View/<id> с любым протоколом, хостом и параметрами дает
+    base/Document/View/<id> (base - BASE_URL парсера); у прочих адресов
+    убираются фрагмент, порт по умолчанию и порядок параметров.
+    """
+    doc_id = document_id(url)
+    if doc_id is not None:
+        return f"{base}/Document/View/{doc_id}"
+
+    parts = urlsplit(url)
+    netloc = parts.netloc.lower()
+    if (parts.scheme == 'http' and netloc.endswith(':80')) or (parts.scheme == 'https' and netloc.endswith(':443')):
+        netloc = netloc.rsplit(':', 1)[0]
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((parts.scheme.lower(), netloc, parts.path or '/', query, ''))
+
+
+def document_key(url: str) -> str:
+    """Ключ дедупликации: номер документа или канонический адрес"""
+    return document_id(url) or canonical_url(url)
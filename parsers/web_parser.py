@@ -1,276 +1,520 @@
-# parsers/web_parser.py
-import logging
-import requests
-from bs4 import BeautifulSoup
-from urllib.parse import urljoin, urlparse, parse_qs, urlencode
-from pathlib import Path
-from typing import List, Dict, Any
-from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
-import re
-from datetime import datetime
-
-logger = logging.getLogger(__name__)
-
-class WebParser:
-    """Парсер для сбора документов через веб-интерфейс"""
-    
-    BASE_URL = "http://publication.pravo.gov.ru"
-    
-    # Прямые ссылки на страницы ведомств (избегаем API)
-    SOURCE_URLS = {
-        "federal": "http://publication.pravo.gov.ru/Department/View/262?sort=PublicationDate_desc&page=1",
-        "regional": "http://publication.pravo.gov.ru/Department/View/39ec279e-970f-43c0-85b7-4aba57163bb7?sort=PublicationDate_desc&page=1",
-        "rosobrnadzor": "http://publication.pravo.gov.ru/Department/View/320?sort=PublicationDate_desc&page=1"
-    }
-    
-    ORGANIZATION_NAMES = {
-        "federal": "Министерство просвещения Российской Федерации",
-        "regional": "Министерство образования и науки Республики Саха (Якутия)",
-        "rosobrnadzor": "Федеральная служба по надзору в сфере образования и науки"
-    }
-
-    def __init__(self, limit: int = 50):
-        self.limit = limit
-        self.session = self._create_session()
-
-    def _create_session(self):
-        """Создает сессию с повторными попытками"""
-        session = requests.Session()
-        retry = Retry(
-            total=3,
-            backoff_factor=0.5,
-            status_forcelist=[500, 502, 503, 504],
-        )
-        adapter = HTTPAdapter(max_retries=retry)
-        session.mount("http://", adapter)
-        session.mount("https://", adapter)
-        
-        session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-            'Accept-Language': 'ru-RU,ru;q=0.8,en-US;q=0.5,en;q=0.3',
-            'Accept-Encoding': 'gzip, deflate',
-            'Connection': 'keep-alive',
-            'Upgrade-Insecure-Requests': '1',
-        })
-        
-        return session
-
-    def get_documents(self) -> List[Dict[str, Any]]:
-        """Получает документы со всех источников"""
-        all_documents = []
-        
-        for source_key, url in self.SOURCE_URLS.items():
-            try:
-                logger.info(f"🔄 Парсим источник: {source_key}")
-                docs = self.parse_department(url, source_key)
-                all_documents.extend(docs)
-                logger.info(f"✅ Получено {len(docs)} документов из {source_key}")
-            except Exception as e:
-                logger.error(f"❌ Ошибка парсинга {source_key}: {e}")
-        
-        return all_documents
-
-    def parse_department(self, start_url: str, source_key: str) -> List[Dict[str, Any]]:
-        """Парсит документы ведомства с пагинацией"""
-        org_name = self.ORGANIZATION_NAMES[source_key]
-        all_docs = []
-        current_url = start_url
-        page_count = 0
-        max_pages = 10  # Ограничиваем количество страниц
-        
-        logger.info(f"🌐 Начинаем парсинг для {org_name}")
-        
-        while current_url and page_count < max_pages:
-            page_count += 1
-            logger.info(f"📄 Страница {page_count}: {current_url}")
-            
-            try:
-                response = self.session.get(current_url, timeout=30)
-                response.raise_for_status()
-                
-                soup = BeautifulSoup(response.text, 'html.parser')
-                
-                # Парсим документы с текущей страницы
-                page_docs = self.parse_page(soup, org_name)
-                all_docs.extend(page_docs)
-                
-                logger.info(f"📑 На странице {page_count} найдено {len(page_docs)} документов")
-                
-                # Проверяем лимит
-                if len(all_docs) >= self.limit:
-                    all_docs = all_docs[:self.limit]
-                    logger.info(f"⚡ Достигнут лимит в {self.limit} документов")
-                    break
-                
-                # Ищем следующую страницу
-                next_url = self.find_next_page(soup, current_url)
-                if not next_url:
-                    logger.info(f"🛑 Пагинация завершена на странице {page_count}")
-                    break
-                    
-                current_url = next_url
-                
-            except Exception as e:
-                logger.error(f"❌ Ошибка при парсинге страницы {current_url}: {e}")
-                break
-        
-        logger.info(f"✅ Всего для {org_name}: {len(all_docs)} документов")
-        return all_docs
-
-    def parse_page(self, soup: BeautifulSoup, org_name: str) -> List[Dict[str, Any]]:
-        """Парсит документы с одной страницы"""
-        documents = []
-        
-        # Ищем контейнер с документами
-        doc_containers = soup.find_all('div', class_=['document-item', 'doc-item'])
-        
-        if not doc_containers:
-            # Альтернативный поиск - все ссылки на документы
-            doc_links = soup.find_all('a', href=lambda x: x and '/Document/View/' in x)
-            for link in doc_links:
-                doc = self.extract_document_from_link(link, org_name)
-                if doc:
-                    documents.append(doc)
-            return documents
-        
-        # Парсим из контейнеров документов
-        for container in doc_containers:
-            doc = self.extract_document_from_container(container, org_name)
-            if doc:
-                documents.append(doc)
-        
-        return documents
-
-    def extract_document_from_container(self, container, org_name: str) -> Dict[str, Any]:
-        """Извлекает информацию о документе из контейнера"""
-        try:
-            # Ищем ссылку на документ
-            link = container.find('a', href=lambda x: x and '/Document/View/' in x)
-            if not link:
-                return None
-            
-            href = link.get('href')
-            full_url = urljoin(self.BASE_URL, href)
-            
-            # Извлекаем название
-            title = self.clean_text(link.get_text())
-            if not title or title == "Без названия":
-                title = link.get('title', 'Без названия')
-            
-            # Ищем дату в контейнере
-            date = self.find_date_in_container(container)
-            
-            return {
-                "organization": org_name,
-                "documentTitle": title[:500],  # Ограничиваем длину
-                "url": full_url,
-                "publishDate": date
-            }
-            
-        except Exception as e:
-            logger.error(f"Ошибка извлечения документа: {e}")
-            return None
-
-    def extract_document_from_link(self, link, org_name: str) -> Dict[str, Any]:
-        """Извлекает документ из одиночной ссылки"""
-        try:
-            href = link.get('href')
-            full_url = urljoin(self.BASE_URL, href)
-            
-            title = self.clean_text(link.get_text())
-            if not title or title == "Без названия":
-                title = link.get('title', 'Без названия')
-            
-            # Пытаемся найти дату в соседних элементах
-            date = self.find_nearby_date(link)
-            
-            return {
-                "organization": org_name,
-                "documentTitle": title[:500],
-                "url": full_url,
-                "publishDate": date
-            }
-            
-        except Exception as e:
-            logger.error(f"Ошибка извлечения из ссылки: {e}")
-            return None
-
-    def find_date_in_container(self, container) -> str:
-        """Ищет дату в контейнере документа"""
-        # Ищем по классам, которые могут содержать дату
-        date_selectors = [
-            '.document-date', '.doc-date', '.date', 
-            '.publication-date', '.publish-date'
-        ]
-        
-        for selector in date_selectors:
-            date_elem = container.select_one(selector)
-            if date_elem:
-                date_text = self.clean_text(date_elem.get_text())
-                date_match = re.search(r'\d{2}\.\d{2}\.\d{4}', date_text)
-                if date_match:
-                    return date_match.group()
-        
-        # Ищем по тексту в контейнере
-        container_text = container.get_text()
-        date_match = re.search(r'\d{2}\.\d{2}\.\d{4}', container_text)
-        if date_match:
-            return date_match.group()
-        
-        return "Дата не указана"
-
-    def find_nearby_date(self, element) -> str:
-        """Ищет дату в соседних элементах"""
-        # Проверяем предыдущие и следующие элементы
-        for sibling in [element.previous_sibling, element.next_sibling]:
-            if sibling and hasattr(sibling, 'get_text'):
-                text = sibling.get_text()
-                date_match = re.search(r'\d{2}\.\d{2}\.\d{4}', text)
-                if date_match:
-                    return date_match.group()
-        
-        # Проверяем родительский элемент
-        parent = element.parent
-        for _ in range(3):  # Проверяем до 3 уровней вверх
-            if parent:
-                text = parent.get_text()
-                date_match = re.search(r'\d{2}\.\d{2}\.\d{4}', text)
-                if date_match:
-                    return date_match.group()
-                parent = parent.parent
-        
-        return "Дата не указана"
-
-    def find_next_page(self, soup: BeautifulSoup, current_url: str) -> str:
-        """Находит ссылку на следующую страницу"""
-        # Ищем пагинацию
-        pagination = soup.find('ul', class_=['pagination', 'pager'])
-        if pagination:
-            next_links = pagination.find_all('a', text=lambda x: x and '>' in x)
-            if not next_links:
-                next_links = pagination.find_all('a', text=lambda x: x and 'след' in x.lower())
-            
-            for link in next_links:
-                href = link.get('href')
-                if href:
-                    return urljoin(self.BASE_URL, href)
-        
-        # Альтернативный поиск по классам
-        next_btn = soup.find('a', class_=['next', 'page-next'])
-        if next_btn and next_btn.get('href'):
-            return urljoin(self.BASE_URL, next_btn.get('href'))
-        
-        return None
-
-    def clean_text(self, text: str) -> str:
-        """Очищает текст от лишних пробелов"""
-        if not text:
-            return ""
-        return ' '.join(text.split()).strip()
-
-# Функция для обратной совместимости
-def get_parser():
-    """Возвращает экземпляр парсера для использования в main.py"""
-    return WebParser(limit=30)
\ No newline at end of file
+# parsers/web_parser.py
+import logging
+import os
+import requests
+from bs4 import BeautifulSoup
+from urllib.parse import urljoin, urlparse, parse_qs, urlencode
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Tuple, Set, Iterator
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import time
+from datetime import datetime
+
+from metrics import metrics
+from parsers.extractors import DATE_RE, create_extractor
+from parsers.http_cache import HttpCache
+from parsers.resilience import (
+    SourceGuard, CircuitOpenError, CrawlDeadlineExceeded, create_source_guard
+)
+from parsers.sources import SourceConfig, default_sources, load_sources
+from parsers.urls import canonical_url
+
+logger = logging.getLogger(__name__)
+
+class WebParser:
+    """Парсер для сбора документов через веб-интерфейс"""
+    
+    BASE_URL = "http://publication.pravo.gov.ru"
+    
+    # Прямые ссылки на страницы ведомств (избегаем API)
+    SOURCE_URLS = {
+        "federal": "http://publication.pravo.gov.ru/Department/View/262?sort=PublicationDate_desc&page=1",
+        "regional": "http://publication.pravo.gov.ru/Department/View/39ec279e-970f-43c0-85b7-4aba57163bb7?sort=PublicationDate_desc&page=1",
+        "rosobrnadzor": "http://publication.pravo.gov.ru/Department/View/320?sort=PublicationDate_desc&page=1"
+    }
+    
+    ORGANIZATION_NAMES = {
+        "federal": "Министерство просвещения Российской Федерации",
+        "regional": "Министерство образования и науки Республики Саха (Якутия)",
+        "rosobrnadzor": "Федеральная служба по надзору в сфере образования и науки"
+    }
+
+    HEADERS = {
+        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+        'Accept-Language': 'ru-RU,ru;q=0.8,en-US;q=0.5,en;q=0.3',
+        'Accept-Encoding': 'gzip, deflate',
+        'Connection': 'keep-alive',
+        'Upgrade-Insecure-Requests': '1',
+    }
+
+    # Политика повторных попыток (общая для синхронного и асинхронного режимов)
+    RETRY_TOTAL = 3
+    RETRY_BACKOFF_FACTOR = 0.5
+    RETRY_STATUSES = [500, 502, 503, 504]
+    # Таймаут запроса, если для источника нет SourceGuard
+    timeout: float = 30
+
+    def __init__(self, limit: int = 50, http_cache: Optional[HttpCache] = None,
+                 extractor: Optional[str] = None, sources: Optional[List[SourceConfig]] = None,
+                 guard: Optional[SourceGuard] = None):
+        self.limit = limit
+        self.http_cache = http_cache
+        self.guard = guard
+        self.extractor = create_extractor(self, extractor or os.getenv("PARSER_BACKEND", "lxml"))
+        self.set_sources(sources or default_sources(self.SOURCE_URLS, self.ORGANIZATION_NAMES))
+        self.session = self._create_session()
+        # Запросы, таймаут которых сокращен дедлайном: повторять их уже некогда
+        self._deadline_session = self._create_session(retries=0)
+        self._deadline: Optional[float] = None
+        self.deadline_hit = False
+
+    def set_sources(self, sources: List[SourceConfig]):
+        """Задает реестр источников экземпляра
+
+        SOURCE_URLS и ORGANIZATION_NAMES экземпляра пересобираются из реестра,
+        чтобы ими можно было пользоваться как раньше.
+        """
+        self.sources: Dict[str, SourceConfig] = {source.key: source for source in sources}
+        self.SOURCE_URLS = {key: source.url for key, source in self.sources.items()}
+        self.ORGANIZATION_NAMES = {key: source.organization for key, source in self.sources.items()}
+
+    def _create_session(self, retries: Optional[int] = None):
+        """Создает сессию с повторными попытками"""
+        session = requests.Session()
+        retry = Retry(
+            total=self.RETRY_TOTAL if retries is None else retries,
+            backoff_factor=self.RETRY_BACKOFF_FACTOR,
+            status_forcelist=self.RETRY_STATUSES,
+        )
+        adapter = HTTPAdapter(max_retries=retry)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        
+        session.headers.update(self.HEADERS)
+        
+        return session
+
+    def get_documents(self, known_urls: Optional[Set[str]] = None,
+                      deadline: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Получает документы со всех источников
+
+        Если передан known_urls, включается инкрементальный режим:
+        обход ведомства прекращается на первой странице без новых документов.
+        deadline - ограничение времени обхода в секундах (см. iter_documents).
+        """
+        all_documents = []
+        for page_docs in self.iter_documents(known_urls, deadline):
+            all_documents.extend(page_docs)
+        return all_documents
+
+    def iter_documents(self, known_urls: Optional[Set[str]] = None,
+                       deadline: Optional[float] = None) -> Iterator[List[Dict[str, Any]]]:
+        """Обходит все источники и отдает документы постранично, по мере разбора
+
+        Через deadline секунд новые запросы не отправляются, а таймауты
+        текущих сокращаются до оставшегося времени: обход возвращает то,
+        что успел собрать (deadline_hit показывает, что он был прерван).
+        """
+        started = time.perf_counter()
+        self._start_deadline(deadline)
+        try:
+            for source_key, url in self.SOURCE_URLS.items():
+                logger.info(f"🔄 Парсим источник: {source_key}")
+                count = 0
+                try:
+                    for page_docs in self.iter_department(url, source_key, known_urls):
+                        count += len(page_docs)
+                        yield page_docs
+                    logger.info(f"✅ Получено {count} документов из {source_key}")
+                except Exception as e:
+                    logger.error(f"❌ Ошибка парсинга {source_key}: {e}")
+        finally:
+            self._deadline = None
+            self.save_crawl_state()
+            metrics.observe('crawl_duration_seconds', time.perf_counter() - started, mode='sync')
+
+    def parse_department(self, start_url: str, source_key: str,
+                         known_urls: Optional[Set[str]] = None) -> List[Dict[str, Any]]:
+        """Парсит документы ведомства с пагинацией"""
+        all_docs = []
+        for page_docs in self.iter_department(start_url, source_key, known_urls):
+            all_docs.extend(page_docs)
+        return all_docs
+
+    def iter_department(self, start_url: str, source_key: str,
+                        known_urls: Optional[Set[str]] = None) -> Iterator[List[Dict[str, Any]]]:
+        """Отдает документы ведомства постранично"""
+        source = self.sources[source_key]
+        org_name = source.organization
+        limit = source.limit or self.limit
+        total = 0
+        current_url = start_url
+        page_count = 0
+        
+        logger.info(f"🌐 Начинаем парсинг для {org_name}")
+        
+        while current_url and page_count < source.max_pages:
+            if self.deadline_passed():
+                break
+            page_count += 1
+            logger.info(f"📄 Страница {page_count}: {current_url}")
+            if page_count > 1 and source.delay:
+                time.sleep(source.delay)
+            
+            try:
+                # Загружаем и парсим документы с текущей страницы
+                page_docs, next_url = self.fetch_page(current_url, org_name, source_key)
+            except (CircuitOpenError, CrawlDeadlineExceeded) as e:
+                logger.warning(f"⛔ {source_key} пропущен: {e}")
+                break
+            except requests.HTTPError as e:
+                if source.pagination == "page_number" and page_count > 1 and e.response.status_code == 404:
+                    logger.info(f"🛑 Страницы {page_count} нет, пагинация завершена")
+                else:
+                    logger.error(f"❌ Ошибка при парсинге страницы {current_url}: {e}")
+                break
+            except Exception as e:
+                logger.error(f"❌ Ошибка при парсинге страницы {current_url}: {e}")
+                break
+
+            metrics.inc('crawl_pages_total', source=source_key)
+            metrics.inc('crawl_documents_total', len(page_docs), source=source_key)
+            logger.info(f"📑 На странице {page_count} найдено {len(page_docs)} документов")
+
+            # Проверяем лимит
+            limit_reached = total + len(page_docs) >= limit
+            page_docs = page_docs[:limit - total]
+            total += len(page_docs)
+            # Листинг отсортирован по дате: дальше только уже известные документы
+            # (проверяем до yield - потребитель может сразу сохранить страницу)
+            known_page = self.is_known_page(page_docs, known_urls)
+            if page_docs:
+                yield page_docs
+
+            if limit_reached:
+                logger.info(f"⚡ Достигнут лимит в {limit} документов")
+                break
+            if known_page:
+                logger.info(f"⏹ На странице {page_count} нет новых документов, останавливаемся")
+                break
+            
+            # Переходим на следующую страницу
+            if source.pagination == "page_number":
+                next_url = source.page_url(source.start_page + page_count) if page_docs else None
+            if not next_url:
+                logger.info(f"🛑 Пагинация завершена на странице {page_count}")
+                break
+                
+            current_url = next_url
+        
+        logger.info(f"✅ Всего для {org_name}: {total} документов")
+
+    def fetch_page(self, url: str, org_name: str,
+                   source_key: str = '') -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """Загружает страницу (условным запросом, если есть кэш) и разбирает ее"""
+        headers = self.http_cache.conditional_headers(url) if self.http_cache else {}
+        response = self._guarded_get(url, source_key, headers)
+        
+        if response.status_code == 304 and self.http_cache:
+            cached = self.http_cache.not_modified(url)
+            if cached is not None:
+                logger.info(f"💾 Страница не изменилась (304): {url}")
+                return cached
+            # Кэш потерял запись - запрашиваем страницу целиком
+            response = self._guarded_get(url, source_key)
+        
+        response.raise_for_status()
+        return self.handle_page_body(
+            url, response.text, org_name,
+            response.headers.get('ETag'), response.headers.get('Last-Modified')
+        )
+
+    def _guarded_get(self, url: str, source_key: str, headers: Optional[Dict[str, str]] = None):
+        """GET с выключателем и адаптивным таймаутом источника"""
+        probe = self._before_request(source_key)
+        try:
+            timeout, clipped = self._request_timeout(source_key)
+            started = time.perf_counter()
+            try:
+                with metrics.timer('crawl_fetch_seconds', source=source_key):
+                    session = self._deadline_session if clipped else self.session
+                    response = session.get(url, timeout=timeout, headers=headers or {})
+            except requests.RequestException as e:
+                if clipped and time.monotonic() >= self._deadline:
+                    # Таймаут сокращен дедлайном обхода - источник не виноват
+                    raise self._deadline_exceeded() from e
+                self._record_failure(source_key, probe)
+                raise
+            self._count_retries(response)
+            self._record_success(source_key, time.perf_counter() - started)
+            return response
+        finally:
+            if probe:
+                self.guard.release_probe(source_key)
+
+    # ==============================
+    # ⏱ ТАЙМАУТЫ И ДЕДЛАЙН ОБХОДА
+    # ==============================
+
+    def _start_deadline(self, deadline: Optional[float]):
+        self._deadline = time.monotonic() + deadline if deadline else None
+        self.deadline_hit = False
+
+    def deadline_passed(self) -> bool:
+        """Время обхода вышло (отмечает deadline_hit)"""
+        if self._deadline is None or time.monotonic() < self._deadline:
+            return False
+        self._deadline_exceeded()
+        return True
+
+    def _deadline_exceeded(self) -> CrawlDeadlineExceeded:
+        """Отмечает, что обход прерван по времени, и возвращает исключение для raise"""
+        if not self.deadline_hit:
+            self.deadline_hit = True
+            metrics.inc('crawl_deadline_hits_total')
+            logger.warning("⏰ Время обхода вышло, возвращаем собранные документы")
+        return CrawlDeadlineExceeded("время обхода вышло")
+
+    def _request_timeout(self, source_key: str) -> Tuple[float, bool]:
+        """Таймаут запроса к источнику и признак, что его сократил дедлайн обхода"""
+        timeout = self.guard.timeout_for(source_key) if self.guard is not None and source_key else self.timeout
+        if self._deadline is None or not source_key:
+            return timeout, False
+        remaining = self._deadline - time.monotonic()
+        if remaining <= 0:
+            raise self._deadline_exceeded()
+        return min(timeout, remaining), remaining < timeout
+
+    def _before_request(self, source_key: str) -> bool:
+        """Проверка выключателя; True, если запрос - проба после отключения"""
+        if self.guard is not None and source_key:
+            return self.guard.before_request(source_key)
+        return False
+
+    def _record_success(self, source_key: str, latency: float):
+        if self.guard is not None and source_key:
+            self.guard.record_success(source_key, latency)
+
+    def _record_failure(self, source_key: str, probe: bool = False):
+        if self.guard is not None and source_key:
+            self.guard.record_failure(source_key, probe)
+
+    @staticmethod
+    def _count_retries(response):
+        """Переносит число повторов urllib3 в метрики"""
+        retries = getattr(response.raw, 'retries', None)
+        history = getattr(retries, 'history', None) or ()
+        for attempt in history:
+            reason = attempt.status or type(attempt.error).__name__
+            metrics.inc('crawl_retries_total', reason=reason)
+
+    def handle_page_body(self, url: str, html: str, org_name: str,
+                         etag: Optional[str] = None,
+                         last_modified: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """Разбирает тело страницы, пропуская разбор при неизменном хэше"""
+        if not self.http_cache:
+            return self.process_page(html, url, org_name)
+        
+        body_hash = self.http_cache.body_hash(html)
+        cached = self.http_cache.lookup(url, body_hash)
+        if cached is not None:
+            logger.info(f"💾 Тело страницы не изменилось: {url}")
+            return cached
+        
+        page_docs, next_url = self.process_page(html, url, org_name)
+        self.http_cache.store(url, body_hash, page_docs, next_url, etag, last_modified)
+        return page_docs, next_url
+
+    def save_http_cache(self):
+        """Сохраняет HTTP-кэш и пишет счетчики в лог"""
+        if self.http_cache:
+            self.http_cache.save()
+            logger.info(f"💾 HTTP-кэш: {self.http_cache.stats()}")
+
+    def save_crawl_state(self):
+        """Сохраняет после обхода HTTP-кэш и состояние выключателей"""
+        self.save_http_cache()
+        if self.guard is not None:
+            self.guard.save()
+
+    @staticmethod
+    def is_known_page(page_docs: List[Dict[str, Any]], known_urls: Optional[Set[str]]) -> bool:
+        """Проверяет, что все документы страницы уже есть в базе"""
+        if not known_urls or not page_docs:
+            return False
+        return all(doc['url'] in known_urls for doc in page_docs)
+
+    def process_page(self, html: str, current_url: str, org_name: str) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """Разбирает HTML страницы: документы и ссылка на следующую страницу"""
+        with metrics.timer('crawl_parse_seconds', backend=self.extractor.name):
+            return self.extractor.extract(html, current_url, org_name)
+
+    def parse_page(self, soup: BeautifulSoup, org_name: str) -> List[Dict[str, Any]]:
+        """Парсит документы с одной страницы"""
+        documents = []
+        
+        # Ищем контейнер с документами
+        doc_containers = soup.find_all('div', class_=['document-item', 'doc-item'])
+        
+        if not doc_containers:
+            # Альтернативный поиск - все ссылки на документы
+            doc_links = soup.find_all('a', href=lambda x: x and '/Document/View/' in x)
+            for link in doc_links:
+                doc = self.extract_document_from_link(link, org_name)
+                if doc:
+                    documents.append(doc)
+            return documents
+        
+        # Парсим из контейнеров документов
+        for container in doc_containers:
+            doc = self.extract_document_from_container(container, org_name)
+            if doc:
+                documents.append(doc)
+        
+        return documents
+
+    def extract_document_from_container(self, container, org_name: str) -> Dict[str, Any]:
+        """Извлекает информацию о документе из контейнера"""
+        try:
+            # Ищем ссылку на документ
+            link = container.find('a', href=lambda x: x and '/Document/View/' in x)
+            if not link:
+                return None
+            
+            href = link.get('href')
+            full_url = canonical_url(urljoin(self.BASE_URL, href), self.BASE_URL)
+            
+            # Извлекаем название
+            title = self.clean_text(link.get_text())
+            if not title or title == "Без названия":
+                title = link.get('title', 'Без названия')
+            
+            # Ищем дату в контейнере
+            date = self.find_date_in_container(container)
+            
+            return {
+                "organization": org_name,
+                "documentTitle": title[:500],  # Ограничиваем длину
+                "url": full_url,
+                "publishDate": date
+            }
+            
+        except Exception as e:
+            logger.error(f"Ошибка извлечения документа: {e}")
+            return None
+
+    def extract_document_from_link(self, link, org_name: str) -> Dict[str, Any]:
+        """Извлекает документ из одиночной ссылки"""
+        try:
+            href = link.get('href')
+            full_url = canonical_url(urljoin(self.BASE_URL, href), self.BASE_URL)
+            
+            title = self.clean_text(link.get_text())
+            if not title or title == "Без названия":
+                title = link.get('title', 'Без названия')
+            
+            # Пытаемся найти дату в соседних элементах
+            date = self.find_nearby_date(link)
+            
+            return {
+                "organization": org_name,
+                "documentTitle": title[:500],
+                "url": full_url,
+                "publishDate": date
+            }
+            
+        except Exception as e:
+            logger.error(f"Ошибка извлечения из ссылки: {e}")
+            return None
+
+    def find_date_in_container(self, container) -> str:
+        """Ищет дату в контейнере документа"""
+        # Ищем по классам, которые могут содержать дату
+        date_selectors = [
+            '.document-date', '.doc-date', '.date', 
+            '.publication-date', '.publish-date'
+        ]
+        
+        for selector in date_selectors:
+            date_elem = container.select_one(selector)
+            if date_elem:
+                date_text = self.clean_text(date_elem.get_text())
+                date_match = DATE_RE.search(date_text)
+                if date_match:
+                    return date_match.group()
+        
+        # Ищем по тексту в контейнере
+        container_text = container.get_text()
+        date_match = DATE_RE.search(container_text)
+        if date_match:
+            return date_match.group()
+        
+        return "Дата не указана"
+
+    def find_nearby_date(self, element) -> str:
+        """Ищет дату в соседних элементах"""
+        # Проверяем предыдущие и следующие элементы
+        for sibling in [element.previous_sibling, element.next_sibling]:
+            if sibling and hasattr(sibling, 'get_text'):
+                text = sibling.get_text()
+                date_match = DATE_RE.search(text)
+                if date_match:
+                    return date_match.group()
+        
+        # Проверяем родительский элемент
+        parent = element.parent
+        for _ in range(3):  # Проверяем до 3 уровней вверх
+            if parent:
+                text = parent.get_text()
+                date_match = DATE_RE.search(text)
+                if date_match:
+                    return date_match.group()
+                parent = parent.parent
+        
+        return "Дата не указана"
+
+    def find_next_page(self, soup: BeautifulSoup, current_url: str) -> str:
+        """Находит ссылку на следующую страницу"""
+        # Ищем пагинацию
+        pagination = soup.find('ul', class_=['pagination', 'pager'])
+        if pagination:
+            next_links = pagination.find_all('a', text=lambda x: x and '>' in x)
+            if not next_links:
+                next_links = pagination.find_all('a', text=lambda x: x and 'след' in x.lower())
+            
+            for link in next_links:
+                href = link.get('href')
+                if href:
+                    return urljoin(self.BASE_URL, href)
+        
+        # Альтернативный поиск по классам
+        next_btn = soup.find('a', class_=['next', 'page-next'])
+        if next_btn and next_btn.get('href'):
+            return urljoin(self.BASE_URL, next_btn.get('href'))
+        
+        return None
+
+    def clean_text(self, text: str) -> str:
+        """Очищает текст от лишних пробелов"""
+        if not text:
+            return ""
+        return ' '.join(text.split()).strip()
+
+# Функция для обратной совместимости
+def get_parser():
+    """Возвращает экземпляр парсера для использования в main.py"""
+    return WebParser(limit=30, http_cache=create_http_cache(), sources=load_source_registry(),
+                     guard=create_source_guard())
+
+def create_http_cache() -> Optional[HttpCache]:
+    """Создает HTTP-кэш листингов (отключается HTTP_CACHE=0)"""
+    if os.getenv("HTTP_CACHE", "1") == "0":
+        return None
+    return HttpCache(os.getenv("HTTP_CACHE_FILE", "data/http_cache.json"))
+
+def load_source_registry() -> List[SourceConfig]:
+    """Реестр источников: встроенные ведомства, дополненные файлом SOURCES_FILE"""
+    defaults = default_sources(WebParser.SOURCE_URLS, WebParser.ORGANIZATION_NAMES)
+    return load_sources(os.getenv("SOURCES_FILE", "data/sources.json"), defaults)
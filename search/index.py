@@ -0,0 +1,304 @@
+# search/index.py - инвертированный индекс по названиям документов (SQLite)
+import os
+import re
+import sqlite3
+import logging
+import threading
+from dataclasses import dataclass
+from typing import List, Dict, Any, Optional, Iterable
+
+from search.stemmer import normalize, stem, tokenize
+from storage.base import publish_date_key
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS search_documents (
+    doc_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    url TEXT NOT NULL UNIQUE,
+    documentTitle TEXT NOT NULL,
+    organization TEXT NOT NULL,
+    publishDate TEXT NOT NULL,
+    date_key INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_search_documents_date ON search_documents(date_key, doc_id);
+CREATE INDEX IF NOT EXISTS idx_search_documents_org ON search_documents(organization, date_key);
+
+CREATE TABLE IF NOT EXISTS postings (
+    term TEXT NOT NULL,
+    doc_id INTEGER NOT NULL,
+    PRIMARY KEY (term, doc_id)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS term_stats (
+    term TEXT PRIMARY KEY,
+    df INTEGER NOT NULL
+) WITHOUT ROWID;
+"""
+
+DATE_FILTER_RE = re.compile(r'^\d{2}\.\d{2}\.\d{4}$|^\d{4}$')
+
+
+@dataclass
+class SearchQuery:
+    """Разобранный запрос: основы слов и фильтры"""
+    terms: List[str]
+    prefix: Optional[str] = None
+    date_from: int = 0
+    date_to: int = 0
+    organization: Optional[str] = None
+
+    @property
+    def empty(self) -> bool:
+        return not self.terms and not self.prefix
+
+
+def parse_query(text: str, organizations: Optional[Dict[str, str]] = None) -> SearchQuery:
+    """Разбирает строку запроса
+
+    Поддерживаются фильтры с:ДД.ММ.ГГГГ (или год), по:ДД.ММ.ГГГГ, орг:federal
+    и префиксный поиск по последнему слову со звездочкой (образоват*).
+    Ключ орг: переводится в полное название организации по organizations;
+    неизвестный ключ - ValueError.
+    """
+    words = []
+    query = SearchQuery(terms=[])
+    for part in text.split():
+        key, _, value = part.partition(':')
+        key = key.lower()
+        if value and key in ('с', 'from') and DATE_FILTER_RE.match(value):
+            query.date_from = _date_bound(value, start=True)
+        elif value and key in ('по', 'to') and DATE_FILTER_RE.match(value):
+            query.date_to = _date_bound(value, start=False)
+        elif value and key in ('орг', 'org'):
+            if organizations is None:
+                query.organization = value
+            elif value.lower() in organizations:
+                query.organization = organizations[value.lower()]
+            else:
+                raise ValueError(f"Неизвестный источник: {value}")
+        else:
+            words.append(part)
+
+    if words and words[-1].endswith('*'):
+        prefix_tokens = tokenize(words.pop()[:-1])
+        if prefix_tokens:
+            query.prefix = prefix_tokens[-1].replace('ё', 'е')
+            words.extend(prefix_tokens[:-1])
+    query.terms = normalize(' '.join(words))
+    return query
+
+
+def _date_bound(value: str, start: bool) -> int:
+    if len(value) == 4:
+        return int(value) * 10000 + (101 if start else 1231)
+    return publish_date_key(value)
+
+
+class SearchIndex:
+    """Инвертированный индекс основ слов → документы, хранится на диске
+
+    Пересечение списков идет от самого редкого термина, остальные
+    проверяются точечными запросами по первичному ключу (term, doc_id).
+    """
+
+    # До скольких документов термин считается достаточно редким,
+    # чтобы начинать пересечение с его списка
+    SELECTIVE_DF = 2000
+    # Сколько самых частых терминов подставляется вместо "слово*"
+    MAX_PREFIX_TERMS = 50
+
+    def __init__(self, db_file: str = 'data/search.db'):
+        self.db_file = db_file
+        self._conn = None
+        self._lock = threading.RLock()
+
+    def init(self):
+        with self._lock:
+            if self._conn is not None:
+                return
+            os.makedirs(os.path.dirname(self.db_file) or '.', exist_ok=True)
+            conn = sqlite3.connect(self.db_file, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=5000")
+            conn.executescript(SCHEMA)
+            self._conn = conn
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.init()
+        return self._conn
+
+    def document_count(self) -> int:
+        with self._lock:
+            return self._connection().execute("SELECT COUNT(*) FROM search_documents").fetchone()[0]
+
+    def add_documents(self, documents: Iterable[Dict[str, Any]]) -> int:
+        """Индексирует документы (уже проиндексированные URL пропускаются)"""
+        added = 0
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                for doc in documents:
+                    title = doc.get('documentTitle', '')
+                    cursor = conn.execute(
+                        "INSERT OR IGNORE INTO search_documents"
+                        "(url, documentTitle, organization, publishDate, date_key) VALUES (?, ?, ?, ?, ?)",
+                        (doc['url'], title, doc.get('organization', ''), doc.get('publishDate', ''),
+                         publish_date_key(doc.get('publishDate', '')))
+                    )
+                    if cursor.rowcount <= 0:
+                        continue
+                    doc_id = cursor.lastrowid
+                    terms = normalize(title)
+                    conn.executemany(
+                        "INSERT OR IGNORE INTO postings(term, doc_id) VALUES (?, ?)",
+                        ((term, doc_id) for term in terms)
+                    )
+                    conn.executemany(
+                        "INSERT INTO term_stats(term, df) VALUES (?, 1) "
+                        "ON CONFLICT(term) DO UPDATE SET df = df + 1",
+                        ((term,) for term in terms)
+                    )
+                    added += 1
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return added
+
+    def search(self, query: SearchQuery, limit: int = 10) -> List[Dict[str, Any]]:
+        """Документы, содержащие все термины запроса, от новых к старым
+
+        Работа ограничена самым коротким списком: либо самого редкого
+        термина, либо объединением терминов префикса. Если этот список
+        длинный, сначала проверяются SELECTIVE_DF самых новых документов
+        (с учетом фильтров дат и источника): при частых терминах limit
+        совпадений находится среди них без сортировки тысяч строк. Иначе
+        запрос идет по списку, поэтому редкие префиксы и пустые пересечения
+        не обходят весь архив.
+        """
+        if query.empty:
+            return []
+
+        with self._lock:
+            conn = self._connection()
+            terms = list(query.terms)
+            frequencies = {term: self._df(conn, term) for term in terms}
+            if any(df == 0 for df in frequencies.values()):
+                return []
+            terms.sort(key=frequencies.get)
+
+            prefix_terms: List[str] = []
+            prefix_df = 0
+            if query.prefix:
+                rows = conn.execute(
+                    "SELECT term, df FROM term_stats WHERE term >= ? AND term < ? ORDER BY df DESC LIMIT ?",
+                    (*_prefix_range(query.prefix), self.MAX_PREFIX_TERMS)
+                ).fetchall()
+                if not rows:
+                    return []
+                prefix_terms = [term for term, _ in rows]
+                prefix_df = sum(df for _, df in rows)
+
+            # Ведущий список - самый короткий из кандидатов
+            drive_by_prefix = bool(prefix_terms) and (not terms or prefix_df < frequencies[terms[0]])
+            driving_df = prefix_df if drive_by_prefix else frequencies[terms[0]]
+
+            if driving_df > self.SELECTIVE_DF:
+                rows = self._run(conn, query, terms, prefix_terms, limit, newest=self.SELECTIVE_DF)
+                if len(rows) >= limit:
+                    return self._documents(rows)
+
+            if drive_by_prefix:
+                placeholders = ', '.join('?' * len(prefix_terms))
+                source = (
+                    f"(SELECT DISTINCT doc_id FROM postings WHERE term IN ({placeholders})) p0 "
+                    "JOIN search_documents d ON d.doc_id = p0.doc_id"
+                )
+                rows = self._run(conn, query, terms, [], limit, source=source, source_params=prefix_terms)
+            else:
+                source = "postings p0 JOIN search_documents d ON d.doc_id = p0.doc_id AND p0.term = ?"
+                rows = self._run(conn, query, terms[1:], prefix_terms, limit,
+                                 source=source, source_params=terms[:1])
+        return self._documents(rows)
+
+    @staticmethod
+    def _df(conn: sqlite3.Connection, term: str) -> int:
+        row = conn.execute("SELECT df FROM term_stats WHERE term = ?", (term,)).fetchone()
+        return row[0] if row else 0
+
+    @staticmethod
+    def _run(conn: sqlite3.Connection, query: SearchQuery, terms: List[str], prefix_terms: List[str],
+             limit: int, source: Optional[str] = None, source_params: Iterable[Any] = (),
+             newest: Optional[int] = None) -> List[tuple]:
+        """Выполняет выборку: по ведущему списку (source) или по newest самым новым документам"""
+        filters = []
+        filter_params: List[Any] = []
+        if query.date_from:
+            filters.append("date_key >= ?")
+            filter_params.append(query.date_from)
+        if query.date_to:
+            filters.append("date_key <= ?")
+            filter_params.append(query.date_to)
+        if query.organization:
+            filters.append("organization = ?")
+            filter_params.append(query.organization)
+
+        params: List[Any] = []
+        if newest is not None:
+            # Самые новые документы по индексу (organization, date_key) или (date_key, doc_id)
+            where = " WHERE " + " AND ".join(filters) if filters else ""
+            source = (
+                f"(SELECT * FROM search_documents{where} "
+                "ORDER BY date_key DESC, doc_id DESC LIMIT ?) d"
+            )
+            params.extend(filter_params)
+            params.append(newest)
+            conditions = []
+        else:
+            params.extend(source_params)
+            conditions = ["d." + condition for condition in filters]
+            params.extend(filter_params)
+
+        sql = (
+            "SELECT d.documentTitle, d.organization, d.url, d.publishDate "
+            f"FROM {source} WHERE 1"
+        )
+        for term in terms:
+            conditions.append("EXISTS (SELECT 1 FROM postings p WHERE p.term = ? AND p.doc_id = d.doc_id)")
+        if prefix_terms:
+            placeholders = ', '.join('?' * len(prefix_terms))
+            conditions.append(
+                f"EXISTS (SELECT 1 FROM postings p WHERE p.term IN ({placeholders}) AND p.doc_id = d.doc_id)"
+            )
+        for condition in conditions:
+            sql += " AND " + condition
+        sql += " ORDER BY d.date_key DESC, d.doc_id DESC LIMIT ?"
+
+        # Параметры условий идут после параметров источника и фильтров
+        params.extend(terms)
+        params.extend(prefix_terms)
+        params.append(limit)
+        return conn.execute(sql, params).fetchall()
+
+    @staticmethod
+    def _documents(rows: List[tuple]) -> List[Dict[str, Any]]:
+        return [
+            {"organization": org, "documentTitle": title, "url": url, "publishDate": date}
+            for title, org, url, date in rows
+        ]
+
+
+def _prefix_range(prefix: str):
+    """Диапазон терминов, начинающихся с prefix (по основе и по исходной форме)"""
+    base = min(prefix, stem(prefix), key=len)
+    return base, base + '\uffff'
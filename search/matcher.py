@@ -0,0 +1,133 @@
+# search/matcher.py - подбор подписчиков для новых документов по их фильтрам
+import logging
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import List, Dict, Any, Set, FrozenSet, Tuple, Iterable, Optional
+
+from search.stemmer import normalize
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class Subscription:
+    """Фильтры подписчика: источники и ключевые фразы (пустые - без ограничений)"""
+    sources: FrozenSet[str] = frozenset()
+    keywords: Tuple[str, ...] = ()
+
+    @property
+    def phrases(self) -> List[FrozenSet[str]]:
+        """Основы слов каждой фразы; фраза совпадает, если все основы есть в названии"""
+        return [frozenset(stems) for stems in map(normalize, self.keywords) if stems]
+
+    @property
+    def empty(self) -> bool:
+        # Фразы только из стоп-слов ничего не ограничивают: такой подписчик получает все
+        return not self.sources and not self.phrases
+
+
+class SubscriptionMatcher:
+    """Инвертированный индекс фильтров: источник → подписчики, основа слова → фразы
+
+    Для документа просматриваются только правила, привязанные к его источнику
+    и к основам слов его названия, поэтому время подбора зависит от числа
+    совпадений, а не от числа подписчиков и их правил.
+    Подписчики без фильтров сюда не попадают и получают все документы.
+    """
+
+    def __init__(self, organizations: Optional[Dict[str, str]] = None):
+        self._source_of: Dict[str, str] = {}
+        self._subscriptions: Dict[str, Subscription] = {}
+        # Подписчики, у которых есть только фильтр по источникам
+        self._by_source: Dict[str, Set[str]] = defaultdict(set)
+        # Опорная основа фразы → (подписчик, все основы фразы)
+        self._by_term: Dict[str, List[Tuple[str, FrozenSet[str]]]] = defaultdict(list)
+        if organizations:
+            self.set_organizations(organizations)
+
+    def set_organizations(self, organizations: Dict[str, str]):
+        """Задает соответствие ключей источников (federal, ...) названиям организаций"""
+        self._source_of = {name: key for key, name in organizations.items()}
+
+    def source_of(self, document: Dict[str, Any]) -> str:
+        return self._source_of.get(document.get('organization', ''), '')
+
+    # ==============================
+    # 📝 ПРАВИЛА
+    # ==============================
+
+    def load(self, subscriptions: Dict[str, Dict[str, List[str]]]):
+        """Перестраивает индекс по фильтрам из хранилища"""
+        self._subscriptions.clear()
+        self._by_source.clear()
+        self._by_term.clear()
+        for user_id, rule in subscriptions.items():
+            self.set(user_id, rule.get('sources', ()), rule.get('keywords', ()))
+        logger.info(f"🎯 Загружены фильтры {len(self._subscriptions)} подписчиков")
+
+    def get(self, user_id: str) -> Subscription:
+        return self._subscriptions.get(user_id, Subscription())
+
+    def set(self, user_id: str, sources: Iterable[str] = (), keywords: Iterable[str] = ()):
+        """Заменяет фильтры подписчика"""
+        self.remove(user_id)
+        subscription = Subscription(frozenset(sources), tuple(keywords))
+        if subscription.empty:
+            return
+        self._subscriptions[user_id] = subscription
+
+        phrases = subscription.phrases
+        if not phrases:
+            for source in subscription.sources:
+                self._by_source[source].add(user_id)
+        for phrase in phrases:
+            # Самая длинная основа обычно самая редкая
+            anchor = max(phrase, key=len)
+            self._by_term[anchor].append((user_id, phrase))
+
+    def remove(self, user_id: str):
+        subscription = self._subscriptions.pop(user_id, None)
+        if subscription is None:
+            return
+        for source in subscription.sources:
+            self._by_source[source].discard(user_id)
+        for phrase in subscription.phrases:
+            anchor = max(phrase, key=len)
+            self._by_term[anchor] = [entry for entry in self._by_term[anchor] if entry[0] != user_id]
+            if not self._by_term[anchor]:
+                del self._by_term[anchor]
+
+    # ==============================
+    # 🎯 ПОДБОР
+    # ==============================
+
+    def match(self, document: Dict[str, Any]) -> Set[str]:
+        """Подписчики с фильтрами, которым подходит документ"""
+        source = self.source_of(document)
+        matched = set(self._by_source.get(source, ()))
+
+        stems = set(normalize(document.get('documentTitle', '')))
+        for stem in stems:
+            for user_id, phrase in self._by_term.get(stem, ()):
+                if user_id in matched or not phrase <= stems:
+                    continue
+                sources = self._subscriptions[user_id].sources
+                if not sources or source in sources:
+                    matched.add(user_id)
+        return matched
+
+    def route(self, documents: List[Dict[str, Any]],
+              recipients: Iterable[str]) -> Dict[str, List[Dict[str, Any]]]:
+        """Документы для каждого получателя (получатели без совпадений пропускаются)"""
+        matched: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        for document in documents:
+            for user_id in self.match(document):
+                matched[user_id].append(document)
+
+        deliveries = {}
+        for user_id in recipients:
+            if user_id not in self._subscriptions:
+                deliveries[user_id] = documents
+            elif user_id in matched:
+                deliveries[user_id] = matched[user_id]
+        return deliveries
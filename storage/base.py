@@ -0,0 +1,154 @@
+# storage/base.py - общий интерфейс хранилищ пользователей и документов
+import heapq
+from abc import ABC, abstractmethod
+from typing import List, Dict, Any, Set, Optional, Tuple
+
+
+class Storage(ABC):
+    """Интерфейс хранилища, на котором построены функции database.py"""
+
+    def init(self):
+        """Подготавливает хранилище к работе"""
+
+    def close(self):
+        """Освобождает ресурсы хранилища"""
+
+    # ==============================
+    # 📊 ПОЛЬЗОВАТЕЛИ
+    # ==============================
+
+    @abstractmethod
+    def load_users(self) -> Set[str]:
+        """Возвращает множество подписчиков"""
+
+    @abstractmethod
+    def save_users(self, users: Set[str]):
+        """Полностью заменяет список подписчиков"""
+
+    @abstractmethod
+    def add_user(self, user_id: str) -> bool:
+        """Добавляет подписчика, возвращает True если его еще не было"""
+
+    @abstractmethod
+    def remove_user(self, user_id: str) -> bool:
+        """Удаляет подписчика, возвращает True если он был"""
+
+    @abstractmethod
+    def user_count(self) -> int:
+        """Количество подписчиков"""
+
+    # ==============================
+    # 🎯 ФИЛЬТРЫ ПОДПИСЧИКОВ
+    # ==============================
+
+    @abstractmethod
+    def load_subscriptions(self) -> Dict[str, Dict[str, List[str]]]:
+        """Фильтры подписчиков: {user_id: {"sources": [...], "keywords": [...]}}"""
+
+    @abstractmethod
+    def save_subscription(self, user_id: str, sources: List[str], keywords: List[str]):
+        """Заменяет фильтры подписчика (пустые списки снимают ограничения)"""
+
+    # ==============================
+    # 📄 ДОКУМЕНТЫ
+    # ==============================
+
+    @abstractmethod
+    def load_documents(self) -> List[Dict[str, Any]]:
+        """Возвращает все документы в порядке добавления"""
+
+    @abstractmethod
+    def save_documents(self, documents: List[Dict[str, Any]]):
+        """Полностью заменяет архив документов"""
+
+    @abstractmethod
+    def add_documents(self, documents: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Добавляет документы с новыми URL, возвращает действительно новые"""
+
+    @abstractmethod
+    def update_document_details(self, details: Dict[str, Dict[str, Any]]):
+        """Дописывает доп. поля к сохраненным документам: {url: {поле: значение}}"""
+
+    @abstractmethod
+    def known_urls(self) -> Set[str]:
+        """URL всех сохраненных документов"""
+
+    @abstractmethod
+    def recent_documents(self, limit: int) -> List[Dict[str, Any]]:
+        """Последние добавленные документы (от старых к новым)"""
+
+    def documents_page(self, offset: int, limit: int,
+                       organization: Optional[str] = None) -> List[Dict[str, Any]]:
+        """До limit документов по дате публикации от новых к старым, пропустив offset
+
+        При одной дате новее добавленный позже, документы без даты - самые
+        старые (как в storage.records.DocumentIndex). organization оставляет
+        документы одной организации. Общая реализация читает весь архив.
+        """
+        documents = (
+            (publish_date_key(doc.get('publishDate', '')), position, doc)
+            for position, doc in enumerate(self.load_documents())
+            if organization is None or doc.get('organization') == organization
+        )
+        newest = heapq.nlargest(offset + limit, documents, key=lambda item: item[:2])
+        return [doc for _, _, doc in newest[offset:]]
+
+    @abstractmethod
+    def document_count(self, organization: Optional[str] = None) -> int:
+        """Количество документов в архиве (organization - только этой организации)"""
+
+    # ==============================
+    # 🤝 НЕСКОЛЬКО ПРОЦЕССОВ
+    # ==============================
+    # Общее хранилище для нескольких процессов бота (WORKER_COUNT > 1);
+    # поддерживается только SQLite.
+
+    shared = False
+
+    def data_version(self) -> Optional[int]:
+        """Меняется, когда данные изменил другой процесс (None - не отслеживается)"""
+        return None
+
+    def acquire_lease(self, name: str, holder: str, ttl: float) -> bool:
+        """Берет или продлевает аренду name на ttl секунд, False - она у другого процесса"""
+        raise NotImplementedError(f"{type(self).__name__} не поддерживает несколько процессов")
+
+    def release_lease(self, name: str, holder: str):
+        """Досрочно освобождает аренду, если она у holder"""
+        raise NotImplementedError(f"{type(self).__name__} не поддерживает несколько процессов")
+
+    def enqueue_broadcast(self, documents: List[Dict[str, Any]]) -> int:
+        """Ставит пакет новых документов в очередь рассылки, возвращает его номер"""
+        raise NotImplementedError(f"{type(self).__name__} не поддерживает несколько процессов")
+
+    def pending_broadcasts(self, after_id: int, limit: int = 100) -> List[Tuple[int, List[Dict[str, Any]]]]:
+        """Пакеты очереди рассылки с номером больше after_id"""
+        raise NotImplementedError(f"{type(self).__name__} не поддерживает несколько процессов")
+
+    def last_broadcast_id(self) -> int:
+        """Номер последнего пакета очереди (0 - очередь пуста)"""
+        raise NotImplementedError(f"{type(self).__name__} не поддерживает несколько процессов")
+
+    def broadcast_cursor(self, worker: str) -> Optional[int]:
+        """Последний разосланный воркером пакет (None - воркер еще не запускался)"""
+        raise NotImplementedError(f"{type(self).__name__} не поддерживает несколько процессов")
+
+    def save_broadcast_cursor(self, worker: str, outbox_id: int):
+        raise NotImplementedError(f"{type(self).__name__} не поддерживает несколько процессов")
+
+    def prune_broadcasts(self, older_than: float) -> int:
+        """Удаляет пакеты очереди старше older_than секунд"""
+        raise NotImplementedError(f"{type(self).__name__} не поддерживает несколько процессов")
+
+
+# Основные поля документа; остальные хранятся в доп. полях backend-а
+DOCUMENT_FIELDS = ("organization", "documentTitle", "url", "publishDate")
+
+
+def publish_date_key(publish_date: str) -> int:
+    """Переводит дату вида ДД.ММ.ГГГГ в число ГГГГММДД (0, если даты нет)"""
+    try:
+        day, month, year = publish_date.split('.')
+        return int(year) * 10000 + int(month) * 100 + int(day)
+    except (AttributeError, ValueError):
+        return 0
@@ -0,0 +1,137 @@
+# storage/dedup.py - компактный индекс "документ уже есть?" по хешам ключей
+import hashlib
+import logging
+import os
+import tempfile
+from array import array
+from typing import Iterable, Optional
+
+from parsers.urls import document_key
+
+logger = logging.getLogger(__name__)
+
+HASH_SIZE = 8
+
+
+def key_hash(url: str) -> int:
+    """64-битный хеш ключа документа (0 зарезервирован под пустую ячейку)"""
+    digest = hashlib.blake2b(document_key(url).encode('utf-8'), digest_size=HASH_SIZE).digest()
+    return int.from_bytes(digest, 'little') or 1
+
+
+class DedupIndex:
+    """Множество хешей ключей документов в таблице с открытой адресацией
+
+    В памяти 8-байтовые хеши в array('Q') с заполнением не больше половины
+    (~16 байт на документ против сотни с лишним у множества URL),
+    проверка - одна-две ячейки таблицы. Адреса сравниваются по document_key,
+    поэтому варианты одной ссылки (http/https, параметры) считаются одним
+    документом. Если задан path, хеши дописываются в файл и читаются при
+    старте без загрузки документов; при расхождении с числом документов
+    хранилища индекс пересобирается по storage.known_urls().
+    """
+
+    def __init__(self, path: Optional[str] = None, capacity: int = 1024):
+        self.path = path
+        self._table = array('Q', bytes(HASH_SIZE * self._table_size(capacity)))
+        self._count = 0
+        self._file = None
+
+    @staticmethod
+    def _table_size(count: int) -> int:
+        size = 1024
+        while size < count * 2:
+            size *= 2
+        return size
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __contains__(self, url: str) -> bool:
+        value = key_hash(url)
+        return self._table[self._slot(value)] == value
+
+    def _slot(self, value: int) -> int:
+        table = self._table
+        mask = len(table) - 1
+        slot = value & mask
+        while table[slot] and table[slot] != value:
+            slot = (slot + 1) & mask
+        return slot
+
+    def _insert(self, value: int) -> bool:
+        if (self._count + 1) * 2 > len(self._table):
+            self._resize(len(self._table) * 2)
+        slot = self._slot(value)
+        if self._table[slot] == value:
+            return False
+        self._table[slot] = value
+        self._count += 1
+        return True
+
+    def _resize(self, size: int):
+        old = self._table
+        self._table = array('Q', bytes(HASH_SIZE * size))
+        self._count = 0
+        for value in old:
+            if value:
+                self._table[self._slot(value)] = value
+                self._count += 1
+
+    def add(self, urls: Iterable[str]) -> int:
+        """Добавляет документы, возвращает число новых ключей"""
+        values = array('Q', (key_hash(url) for url in urls))
+        added = sum(self._insert(value) for value in values)
+        if self._file is not None and values:
+            self._file.write(values.tobytes())
+            self._file.flush()
+        return added
+
+    # ==============================
+    # 💾 ФАЙЛ ИНДЕКСА
+    # ==============================
+
+    def load(self, storage) -> 'DedupIndex':
+        """Читает хеши из файла или пересобирает их по хранилищу"""
+        expected = storage.document_count()
+        values = array('Q')
+        if self.path and os.path.exists(self.path):
+            size = os.path.getsize(self.path)
+            if size == expected * HASH_SIZE:
+                with open(self.path, 'rb') as f:
+                    values.fromfile(f, expected)
+            else:
+                logger.info(f"♻️ Индекс дедупликации устарел ({size // HASH_SIZE} из {expected}), пересборка")
+
+        if len(values) != expected:
+            values = array('Q', (key_hash(url) for url in storage.known_urls()))
+            if self.path:
+                self._write(values)
+
+        self._table = array('Q', bytes(HASH_SIZE * self._table_size(len(values))))
+        self._count = 0
+        for value in values:
+            self._insert(value)
+        if self.path:
+            self._file = open(self.path, 'ab')
+        if self._count < len(values):
+            logger.info(f"🧹 Дубликатов в архиве по каноническому адресу: {len(values) - self._count}")
+        return self
+
+    def _write(self, values: array):
+        """Атомарно записывает хеши; у каждого процесса свой временный файл"""
+        directory = os.path.dirname(self.path) or '.'
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=os.path.basename(self.path), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                values.tofile(f)
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
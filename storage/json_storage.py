@@ -0,0 +1,162 @@
+# storage/json_storage.py - хранение в JSON-файлах (исходный формат data/*.json)
+import json
+import os
+import logging
+from typing import List, Dict, Any, Set, Optional
+
+from parsers.urls import document_key
+from storage.base import Storage
+
+logger = logging.getLogger(__name__)
+
+
+class JsonStorage(Storage):
+    """Хранилище на JSON-файлах: каждый вызов читает и переписывает файл целиком"""
+
+    def __init__(self, users_file: str = 'data/users.json',
+                 documents_file: str = 'data/documents.json',
+                 subscriptions_file: str = 'data/subscriptions.json'):
+        self.users_file = users_file
+        self.documents_file = documents_file
+        self.subscriptions_file = subscriptions_file
+
+    def init(self):
+        """Создает каталог и пустой файл документов"""
+        os.makedirs(os.path.dirname(self.users_file) or '.', exist_ok=True)
+        os.makedirs(os.path.dirname(self.documents_file) or '.', exist_ok=True)
+        if not os.path.exists(self.documents_file):
+            with open(self.documents_file, 'w', encoding='utf-8') as f:
+                json.dump([], f, ensure_ascii=False, indent=2)
+
+    # ==============================
+    # 📊 ПОЛЬЗОВАТЕЛИ
+    # ==============================
+
+    def load_users(self) -> Set[str]:
+        """Загружает список пользователей из файла"""
+        if not os.path.exists(self.users_file):
+            return set()
+        try:
+            with open(self.users_file, 'r', encoding='utf-8') as f:
+                return set(json.load(f))
+        except Exception as e:
+            logger.error(f"Ошибка загрузки users: {e}")
+            return set()
+
+    def save_users(self, users: Set[str]):
+        """Сохраняет список пользователей в файл"""
+        self.init()
+        try:
+            with open(self.users_file, 'w', encoding='utf-8') as f:
+                json.dump(list(users), f, ensure_ascii=False, indent=2)
+        except Exception as e:
+            logger.error(f"Ошибка сохранения users: {e}")
+
+    def add_user(self, user_id: str) -> bool:
+        users = self.load_users()
+        if user_id in users:
+            return False
+        users.add(user_id)
+        self.save_users(users)
+        return True
+
+    def remove_user(self, user_id: str) -> bool:
+        users = self.load_users()
+        if user_id not in users:
+            return False
+        users.discard(user_id)
+        self.save_users(users)
+        self.save_subscription(user_id, [], [])
+        return True
+
+    def user_count(self) -> int:
+        return len(self.load_users())
+
+    # ==============================
+    # 🎯 ФИЛЬТРЫ ПОДПИСЧИКОВ
+    # ==============================
+
+    def load_subscriptions(self) -> Dict[str, Dict[str, List[str]]]:
+        """Загружает фильтры подписчиков из файла"""
+        if not os.path.exists(self.subscriptions_file):
+            return {}
+        try:
+            with open(self.subscriptions_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            logger.error(f"Ошибка загрузки subscriptions: {e}")
+            return {}
+
+    def save_subscription(self, user_id: str, sources: List[str], keywords: List[str]):
+        subscriptions = self.load_subscriptions()
+        if sources or keywords:
+            subscriptions[user_id] = {"sources": list(sources), "keywords": list(keywords)}
+        elif subscriptions.pop(user_id, None) is None:
+            return
+        self.init()
+        try:
+            with open(self.subscriptions_file, 'w', encoding='utf-8') as f:
+                json.dump(subscriptions, f, ensure_ascii=False, indent=2)
+        except Exception as e:
+            logger.error(f"Ошибка сохранения subscriptions: {e}")
+
+    # ==============================
+    # 📄 ДОКУМЕНТЫ
+    # ==============================
+
+    def load_documents(self) -> List[Dict[str, Any]]:
+        """Загружает документы из файла"""
+        self.init()
+        try:
+            with open(self.documents_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception:
+            return []
+
+    def save_documents(self, documents: List[Dict[str, Any]]):
+        """Сохраняет документы в файл"""
+        self.init()
+        try:
+            with open(self.documents_file, 'w', encoding='utf-8') as f:
+                json.dump(documents, f, ensure_ascii=False, indent=2)
+        except Exception as e:
+            logger.error(f"Ошибка сохранения документов: {e}")
+
+    def add_documents(self, documents: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        existing_docs = self.load_documents()
+        # Варианты одной ссылки сравниваются по ключу документа, как в DedupIndex
+        known_keys = {document_key(doc['url']) for doc in existing_docs}
+
+        truly_new = []
+        for doc in documents:
+            key = document_key(doc['url'])
+            if key not in known_keys:
+                known_keys.add(key)
+                truly_new.append(doc)
+        if truly_new:
+            self.save_documents(existing_docs + truly_new)
+        return truly_new
+
+    def update_document_details(self, details: Dict[str, Dict[str, Any]]):
+        documents = self.load_documents()
+        updated = False
+        for doc in documents:
+            fields = details.get(doc['url'])
+            if fields:
+                doc.update(fields)
+                updated = True
+        if updated:
+            self.save_documents(documents)
+
+    def known_urls(self) -> Set[str]:
+        return {doc['url'] for doc in self.load_documents()}
+
+    def recent_documents(self, limit: int) -> List[Dict[str, Any]]:
+        documents = self.load_documents()
+        return documents[-limit:] if documents else []
+
+    def document_count(self, organization: Optional[str] = None) -> int:
+        documents = self.load_documents()
+        if organization is not None:
+            return sum(doc.get('organization') == organization for doc in documents)
+        return len(documents)
@@ -0,0 +1,570 @@
+# storage/log_storage.py - документы в журнале JSON Lines (только дозапись) с индексом и сжатием
+import json
+import logging
+import mmap
+import os
+import threading
+from itertools import islice
+from typing import List, Dict, Any, Iterator, Tuple, Set, Optional
+
+from parsers.urls import document_key
+from storage.json_storage import JsonStorage
+
+logger = logging.getLogger(__name__)
+
+INDEX_VERSION = 2
+# Ключ строки журнала с дополнительными полями уже записанного документа
+UPDATE_KEY = "_update"
+
+
+class LogStorage(JsonStorage):
+    """Документы дописываются строками в documents.jsonl с fsync после каждого пакета
+
+    Рядом лежит индекс (documents.jsonl.idx), который тоже только дописывается:
+    строка "D<tab>смещение<tab>URL" на документ и "U<tab>смещение<tab>URL" на
+    строку дополнений. Контрольная точка (documents.jsonl.ckpt) - несколько
+    чисел: размер журнала и индекса, до которых они согласованы, и число
+    документов; она перезаписывается раз в index_interval строк, так что
+    стоимость записи не зависит от размера архива. При старте индекс читается
+    до контрольной точки, а журнал дочитывается через mmap только после нее.
+    Последние N документов читаются с конца файла по смещениям; страницы по
+    дате публикации (documents_page) и счет по организации читают журнал
+    целиком - кэш обращается к ним только за страницами старше своего окна.
+    Строки дополнений (update_document_details) периодически сворачиваются
+    фоновым сжатием: журнал переписывается во временный файл и атомарно
+    подменяется через os.replace.
+
+    Подписчики и их фильтры тоже хранятся журналом (users.jsonl, строка на
+    изменение), поэтому /start и /subscribe не переписывают файл целиком;
+    журнал подписчиков сворачивается при старте, если в нем много устаревших строк.
+    """
+
+    def __init__(self, log_file: str = 'data/documents.jsonl',
+                 users_file: str = 'data/users.json',
+                 documents_json: str = 'data/documents.json',
+                 subscriptions_file: str = 'data/subscriptions.json',
+                 index_interval: int = 500,
+                 compact_ratio: float = 0.25,
+                 compact_min_lines: int = 1000,
+                 users_log: str = 'data/users.jsonl'):
+        super().__init__(users_file, documents_json, subscriptions_file)
+        self.log_file = log_file
+        self.index_file = f"{log_file}.idx"
+        self.checkpoint_file = f"{log_file}.ckpt"
+        self.users_log = users_log
+        self.index_interval = index_interval
+        self.compact_ratio = compact_ratio
+        self.compact_min_lines = compact_min_lines
+        self._offsets: Dict[str, int] = {}
+        # Ключи документов (document_key) для проверки новых адресов
+        self._keys: Set[str] = set()
+        self._updates: Dict[str, Dict[str, Any]] = {}
+        self._update_lines = 0
+        self._size = 0
+        self._unindexed = 0
+        self._append = None
+        self._read = None
+        self._index = None
+        self._users: Set[str] = set()
+        self._subscriptions: Dict[str, Dict[str, List[str]]] = {}
+        self._users_append = None
+        self._lock = threading.RLock()
+        self._compacting = threading.Lock()
+        self._compaction = None
+
+    # ==============================
+    # 🚀 ЗАПУСК И ОСТАНОВКА
+    # ==============================
+
+    def init(self):
+        """Открывает журналы, читает индекс до контрольной точки и дочитывает хвост журнала"""
+        with self._lock:
+            if self._append is not None:
+                return
+            os.makedirs(os.path.dirname(self.log_file) or '.', exist_ok=True)
+            os.makedirs(os.path.dirname(self.users_file) or '.', exist_ok=True)
+            os.makedirs(os.path.dirname(self.users_log) or '.', exist_ok=True)
+            self._open_users()
+            if not os.path.exists(self.log_file):
+                self._open(0)
+                self._migrate_from_json()
+                return
+
+            indexed_size, index_size = self._load_checkpoint()
+            self._open(index_size)
+            if indexed_size < os.path.getsize(self.log_file):
+                self._scan(indexed_size)
+            logger.info(f"📜 Журнал документов: {len(self._offsets)} записей, {self._size} байт")
+
+    def close(self):
+        compaction = self._compaction
+        if compaction is not None:
+            compaction.join()
+        with self._lock:
+            if self._append is None:
+                return
+            self._checkpoint()
+            for handle in (self._append, self._read, self._index, self._users_append):
+                handle.close()
+            self._append = self._read = self._index = self._users_append = None
+
+    def _open(self, index_size: int):
+        """Открывает журнал и индекс; индекс обрезается до согласованного размера"""
+        self._append = open(self.log_file, 'ab')
+        self._read = open(self.log_file, 'rb')
+        self._size = self._append.tell()
+        self._index = open(self.index_file, 'ab')
+        self._index.truncate(index_size)
+
+    def _ensure_open(self):
+        if self._append is None:
+            self.init()
+
+    def _migrate_from_json(self):
+        """Однократно переносит data/documents.json в журнал"""
+        documents = super().load_documents() if os.path.exists(self.documents_file) else []
+        if documents:
+            self._append_lines(documents)
+            logger.info(f"📦 Перенесено в журнал из JSON: {len(documents)} документов")
+        self._checkpoint()
+
+    # ==============================
+    # 📊 ПОДПИСЧИКИ
+    # ==============================
+
+    def _open_users(self):
+        """Читает журнал подписчиков (при первом запуске переносит users.json и subscriptions.json)"""
+        if not os.path.exists(self.users_log):
+            self._users = super().load_users()
+            self._subscriptions = {
+                user_id: rule for user_id, rule in super().load_subscriptions().items()
+                if user_id in self._users
+            }
+            self._rewrite_users()
+            if self._users:
+                logger.info(f"📦 Перенесено в журнал подписчиков из JSON: {len(self._users)}")
+            return
+
+        with open(self.users_log, 'rb') as f:
+            data = f.read()
+        valid_end = data.rfind(b'\n') + 1
+        lines = data[:valid_end].decode('utf-8').splitlines()
+        for line in lines:
+            try:
+                self._apply_user(json.loads(line))
+            except (ValueError, TypeError, KeyError) as e:
+                logger.warning(f"⚠️ Пропущена поврежденная строка журнала подписчиков: {e}")
+        live = len(self._users) + len(self._subscriptions)
+        if valid_end < len(data) or len(lines) > 2 * live + self.compact_min_lines:
+            # Оборванная последняя строка или много устаревших строк - журнал переписывается
+            self._rewrite_users()
+        else:
+            self._users_append = open(self.users_log, 'ab')
+
+    def _apply_user(self, record: Dict[str, Any]):
+        if 'add' in record:
+            self._users.add(record['add'])
+        elif 'remove' in record:
+            self._users.discard(record['remove'])
+            self._subscriptions.pop(record['remove'], None)
+        elif record['sources'] or record['keywords']:
+            self._subscriptions[record['user']] = {
+                'sources': record['sources'], 'keywords': record['keywords']
+            }
+        else:
+            self._subscriptions.pop(record['user'], None)
+
+    def _rewrite_users(self):
+        """Переписывает журнал подписчиков по состоянию в памяти"""
+        if self._users_append is not None:
+            self._users_append.close()
+        records = [{'add': user_id} for user_id in self._users]
+        records += [{'user': user_id, **rule} for user_id, rule in self._subscriptions.items()]
+        tmp_path = f"{self.users_log}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.writelines(
+                (json.dumps(record, ensure_ascii=False) + '\n').encode('utf-8') for record in records
+            )
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.users_log)
+        self._users_append = open(self.users_log, 'ab')
+
+    def _append_user(self, record: Dict[str, Any]):
+        self._users_append.write((json.dumps(record, ensure_ascii=False) + '\n').encode('utf-8'))
+        self._users_append.flush()
+        os.fsync(self._users_append.fileno())
+        self._apply_user(record)
+
+    def load_users(self) -> Set[str]:
+        with self._lock:
+            self._ensure_open()
+            return set(self._users)
+
+    def save_users(self, users: Set[str]):
+        with self._lock:
+            self._ensure_open()
+            self._users = set(users)
+            self._rewrite_users()
+
+    def add_user(self, user_id: str) -> bool:
+        with self._lock:
+            self._ensure_open()
+            if user_id in self._users:
+                return False
+            self._append_user({'add': user_id})
+            return True
+
+    def remove_user(self, user_id: str) -> bool:
+        with self._lock:
+            self._ensure_open()
+            if user_id not in self._users:
+                return False
+            self._append_user({'remove': user_id})
+            return True
+
+    def user_count(self) -> int:
+        with self._lock:
+            self._ensure_open()
+            return len(self._users)
+
+    def load_subscriptions(self) -> Dict[str, Dict[str, List[str]]]:
+        with self._lock:
+            self._ensure_open()
+            return {user_id: dict(rule) for user_id, rule in self._subscriptions.items()}
+
+    def save_subscription(self, user_id: str, sources: List[str], keywords: List[str]):
+        with self._lock:
+            self._ensure_open()
+            if not (sources or keywords) and user_id not in self._subscriptions:
+                return
+            self._append_user({'user': user_id, 'sources': list(sources), 'keywords': list(keywords)})
+
+    # ==============================
+    # 🗂 ИНДЕКС
+    # ==============================
+
+    def _load_checkpoint(self) -> Tuple[int, int]:
+        """Читает индекс до контрольной точки, возвращает согласованные размеры журнала и индекса"""
+        try:
+            with open(self.checkpoint_file, 'r', encoding='utf-8') as f:
+                checkpoint = json.load(f)
+            if (checkpoint.get('version') != INDEX_VERSION
+                    or checkpoint['size'] > os.path.getsize(self.log_file)
+                    or checkpoint['index_size'] > os.path.getsize(self.index_file)):
+                raise ValueError("контрольная точка не соответствует журналу")
+            self._read_index(checkpoint['index_size'])
+            if len(self._offsets) != checkpoint['count']:
+                raise ValueError("число документов в индексе не совпадает")
+        except FileNotFoundError:
+            return 0, 0
+        except Exception as e:
+            logger.warning(f"⚠️ Индекс журнала пересобирается: {e}")
+            self._offsets, self._keys, self._updates, self._update_lines = {}, set(), {}, 0
+            return 0, 0
+        return checkpoint['size'], checkpoint['index_size']
+
+    def _read_index(self, index_size: int):
+        """Загружает смещения документов; дополнения читаются из журнала по своим смещениям"""
+        with open(self.index_file, 'rb') as f:
+            entries = f.read(index_size).decode('utf-8').splitlines()
+        with open(self.log_file, 'rb') as log:
+            for entry in entries:
+                kind, offset, url = entry.split('\t', 2)
+                if kind == 'D':
+                    self._offsets.setdefault(url, int(offset))
+                    self._keys.add(document_key(url))
+                else:
+                    log.seek(int(offset))
+                    self._apply(json.loads(log.readline()), int(offset), indexed=True)
+
+    def _checkpoint(self):
+        """Атомарно записывает контрольную точку на текущие размеры журнала и индекса"""
+        self._index.flush()
+        checkpoint = {
+            'version': INDEX_VERSION,
+            'size': self._size,
+            'index_size': self._index.tell(),
+            'count': len(self._offsets),
+        }
+        tmp_path = f"{self.checkpoint_file}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(checkpoint, f)
+        os.replace(tmp_path, self.checkpoint_file)
+        self._unindexed = 0
+
+    def _scan(self, start: int):
+        """Дочитывает журнал с позиции start; оборванная последняя строка отрезается"""
+        valid_end = start
+        for offset, end, record in self._iter_records(start):
+            if record is None:
+                break
+            self._apply(record, offset)
+            valid_end = end
+
+        file_size = os.path.getsize(self.log_file)
+        if valid_end < file_size:
+            logger.warning(f"⚠️ Журнал обрезан с {file_size} до {valid_end} байт (оборванная запись)")
+            self._append.truncate(valid_end)
+            self._append.seek(valid_end)
+        self._size = valid_end
+        self._checkpoint()
+
+    def _iter_records(self, start: int = 0) -> Iterator[Tuple[int, int, Any]]:
+        """(смещение, конец, запись) строк журнала через mmap
+
+        Строка без перевода строки в конце файла (запись оборвалась) отдается
+        с записью None. Поврежденные строки в середине пропускаются с
+        предупреждением: записи после них остаются в журнале.
+        """
+        if os.path.getsize(self.log_file) <= start:
+            return
+        with open(self.log_file, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            position = start
+            while position < len(mm):
+                end = mm.find(b'\n', position)
+                if end == -1:
+                    yield position, len(mm), None
+                    return
+                record = self._parse_line(mm[position:end], position)
+                if record is not None:
+                    yield position, end + 1, record
+                position = end + 1
+
+    @staticmethod
+    def _parse_line(line: bytes, position: int) -> Optional[Dict[str, Any]]:
+        """Запись строки журнала или None (с предупреждением), если строка повреждена"""
+        try:
+            record = json.loads(line)
+            if UPDATE_KEY not in record and 'url' not in record:
+                raise ValueError("нет URL")
+        except (ValueError, TypeError) as e:
+            logger.warning(f"⚠️ Пропущена поврежденная строка журнала (смещение {position}): {e}")
+            return None
+        return record
+
+    def _apply(self, record: Dict[str, Any], offset: int, indexed: bool = False):
+        """Учитывает строку журнала в памяти и (если ее там еще нет) в индексе"""
+        url = record.get(UPDATE_KEY)
+        if url is not None:
+            fields = {k: v for k, v in record.items() if k != UPDATE_KEY}
+            self._updates.setdefault(url, {}).update(fields)
+            self._update_lines += 1
+            kind = 'U'
+        elif record['url'] not in self._offsets:
+            url = record['url']
+            self._offsets[url] = offset
+            self._keys.add(document_key(url))
+            kind = 'D'
+        else:
+            return
+        if not indexed:
+            self._index.write(f"{kind}\t{offset}\t{url}\n".encode('utf-8'))
+
+    # ==============================
+    # ✍️ ЗАПИСЬ
+    # ==============================
+
+    def _append_lines(self, records: List[Dict[str, Any]]):
+        """Дописывает записи одним вызовом write + fsync и добавляет их в индекс"""
+        offsets = []
+        chunks = []
+        position = self._size
+        for record in records:
+            line = (json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n').encode('utf-8')
+            offsets.append(position)
+            chunks.append(line)
+            position += len(line)
+
+        self._append.write(b''.join(chunks))
+        self._append.flush()
+        os.fsync(self._append.fileno())
+        self._size = position
+        for record, offset in zip(records, offsets):
+            self._apply(record, offset)
+        self._unindexed += len(records)
+        if self._unindexed >= self.index_interval:
+            self._checkpoint()
+
+    def _read_document(self, url: str) -> Dict[str, Any]:
+        self._read.seek(self._offsets[url])
+        doc = json.loads(self._read.readline())
+        doc.update(self._updates.get(url, {}))
+        return doc
+
+    # ==============================
+    # 📄 ДОКУМЕНТЫ
+    # ==============================
+
+    def load_documents(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            self._ensure_open()
+            size = self._size
+            updates = {url: dict(fields) for url, fields in self._updates.items()}
+
+        documents = []
+        seen = set()
+        for offset, end, record in self._iter_records():
+            if end > size or record is None:
+                break
+            if UPDATE_KEY in record or record['url'] in seen:
+                continue
+            seen.add(record['url'])
+            record.update(updates.get(record['url'], {}))
+            documents.append(record)
+        return documents
+
+    def save_documents(self, documents: List[Dict[str, Any]]):
+        """Атомарно заменяет журнал новым архивом"""
+        with self._compacting, self._lock:
+            self._ensure_open()
+            unique = list({doc['url']: doc for doc in reversed(documents)}.values())[::-1]
+            self._rewrite(unique)
+
+    def add_documents(self, documents: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        with self._lock:
+            self._ensure_open()
+            truly_new = []
+            batch_keys = set()
+            for doc in documents:
+                key = document_key(doc['url'])
+                if key not in self._keys and key not in batch_keys:
+                    batch_keys.add(key)
+                    truly_new.append(doc)
+            if truly_new:
+                self._append_lines(truly_new)
+            return truly_new
+
+    def update_document_details(self, details: Dict[str, Dict[str, Any]]):
+        with self._lock:
+            self._ensure_open()
+            records = [
+                {UPDATE_KEY: url, **fields}
+                for url, fields in details.items() if url in self._offsets and fields
+            ]
+            if not records:
+                return
+            self._append_lines(records)
+        self._maybe_compact()
+
+    def known_urls(self) -> set:
+        with self._lock:
+            self._ensure_open()
+            return set(self._offsets)
+
+    def recent_documents(self, limit: int) -> List[Dict[str, Any]]:
+        with self._lock:
+            self._ensure_open()
+            urls = list(islice(reversed(self._offsets), limit))
+            return [self._read_document(url) for url in reversed(urls)]
+
+    def document_count(self, organization: Optional[str] = None) -> int:
+        if organization is not None:
+            # Организации в индексе нет: счет по всему журналу
+            return sum(doc.get('organization') == organization for doc in self.load_documents())
+        with self._lock:
+            self._ensure_open()
+            return len(self._offsets)
+
+    # ==============================
+    # 🗜 СЖАТИЕ
+    # ==============================
+
+    def _maybe_compact(self):
+        """Запускает фоновое сжатие, если строк дополнений стало слишком много"""
+        with self._lock:
+            if self._compacting.locked():
+                return
+            if self._update_lines < max(self.compact_min_lines, self.compact_ratio * len(self._offsets)):
+                return
+            self._compaction = threading.Thread(target=self.compact, name='log-compaction', daemon=True)
+            self._compaction.start()
+
+    def compact(self):
+        """Переписывает журнал без строк дополнений
+
+        Основная часть копируется без блокировки; записи, дописанные за это
+        время, переносятся под блокировкой перед атомарной подменой файла.
+        """
+        with self._compacting:
+            self._compact()
+
+    def _compact(self):
+        with self._lock:
+            self._ensure_open()
+            snapshot_size = self._size
+            updates = {url: dict(fields) for url, fields in self._updates.items()}
+
+        tmp_path = f"{self.log_file}.compact"
+        offsets: Dict[str, int] = {}
+        try:
+            with open(tmp_path, 'wb') as out:
+                for offset, end, record in self._iter_records():
+                    if end > snapshot_size or record is None:
+                        break
+                    if UPDATE_KEY in record or record['url'] in offsets:
+                        continue
+                    record.update(updates.get(record['url'], {}))
+                    offsets[record['url']] = out.tell()
+                    out.write((json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n').encode('utf-8'))
+
+                with self._lock:
+                    # Хвост, дописанный во время сжатия, переносится как есть
+                    self._read.seek(snapshot_size)
+                    tail = self._read.read(self._size - snapshot_size)
+                    base = out.tell()
+                    out.write(tail)
+                    out.flush()
+                    os.fsync(out.fileno())
+
+                    # Поврежденные строки хвоста пропускаются так же, как в _iter_records
+                    tail_records = []
+                    position = base
+                    for line in tail.splitlines(keepends=True):
+                        record = self._parse_line(line, position) if line.endswith(b'\n') else None
+                        if record is not None:
+                            tail_records.append((record, position))
+                        position += len(line)
+
+                    self._swap(tmp_path, offsets, tail_records)
+        except BaseException:
+            # Недописанный сжатый журнал не должен мешать следующим попыткам
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        logger.info(f"🗜 Журнал сжат: {len(offsets)} документов, {self._size} байт")
+
+    def _rewrite(self, documents: List[Dict[str, Any]]):
+        """Записывает журнал заново (под блокировкой)"""
+        tmp_path = f"{self.log_file}.compact"
+        offsets = {}
+        with open(tmp_path, 'wb') as out:
+            for doc in documents:
+                offsets[doc['url']] = out.tell()
+                out.write((json.dumps(doc, ensure_ascii=False, separators=(',', ':')) + '\n').encode('utf-8'))
+            out.flush()
+            os.fsync(out.fileno())
+        self._swap(tmp_path, offsets, [])
+
+    def _swap(self, tmp_path: str, offsets: Dict[str, int],
+              tail_records: List[Tuple[Dict[str, Any], int]]):
+        """Подменяет журнал сжатым и пишет индекс заново
+
+        Контрольная точка удаляется заранее: если процесс упадет посреди
+        подмены, индекс пересоберется по журналу при старте.
+        """
+        if os.path.exists(self.checkpoint_file):
+            os.remove(self.checkpoint_file)
+        for handle in (self._append, self._read, self._index):
+            handle.close()
+        os.replace(tmp_path, self.log_file)
+        with open(self.index_file, 'wb') as f:
+            f.writelines(f"D\t{offset}\t{url}\n".encode('utf-8') for url, offset in offsets.items())
+        self._open(os.path.getsize(self.index_file))
+        self._offsets = offsets
+        self._keys = {document_key(url) for url in offsets}
+        self._updates = {}
+        self._update_lines = 0
+        for record, offset in tail_records:
+            self._apply(record, offset)
+        self._checkpoint()
@@ -0,0 +1,181 @@
+# storage/records.py - компактные записи документов и индекс по дате публикации
+from array import array
+from bisect import bisect_left, bisect_right, insort
+from typing import List, Dict, Any, Optional, Iterable
+
+from storage.base import publish_date_key
+
+# Ключ индекса: дата ГГГГММДД в старших битах, порядковый номер записи в младших
+SEQ_BITS = 32
+SEQ_MASK = (1 << SEQ_BITS) - 1
+
+
+class OrganizationTable:
+    """Названия организаций хранятся один раз, в записях - их номера"""
+
+    def __init__(self):
+        self._names: List[str] = []
+        self._ids: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def intern(self, name: str) -> int:
+        org_id = self._ids.get(name)
+        if org_id is None:
+            org_id = self._ids[name] = len(self._names)
+            self._names.append(name)
+        return org_id
+
+    def id_of(self, name: str) -> Optional[int]:
+        return self._ids.get(name)
+
+    def names(self) -> List[str]:
+        return list(self._names)
+
+    def name(self, org_id: int) -> str:
+        return self._names[org_id]
+
+
+class DocumentRecord:
+    """Документ без словаря: основные поля в слотах, остальные в extra"""
+    __slots__ = ('org_id', 'title', 'url', 'publish_date', 'extra')
+
+    def __init__(self, org_id: int, title: str, url: str, publish_date: str,
+                 extra: Optional[Dict[str, Any]] = None):
+        self.org_id = org_id
+        self.title = title
+        self.url = url
+        self.publish_date = publish_date
+        self.extra = extra or None
+
+    @property
+    def publish_key(self) -> int:
+        """Дата публикации числом ГГГГММДД (0 - даты нет)"""
+        return publish_date_key(self.publish_date)
+
+    @classmethod
+    def from_dict(cls, doc: Dict[str, Any], organizations: OrganizationTable) -> "DocumentRecord":
+        extra = {
+            key: value for key, value in doc.items()
+            if key not in ('organization', 'documentTitle', 'url', 'publishDate')
+        }
+        return cls(
+            organizations.intern(doc.get('organization', '')),
+            doc.get('documentTitle', ''),
+            doc['url'],
+            doc.get('publishDate', ''),
+            extra,
+        )
+
+    def to_dict(self, organizations: OrganizationTable) -> Dict[str, Any]:
+        """Документ в формате JSON-архива"""
+        doc = {
+            "organization": organizations.name(self.org_id),
+            "documentTitle": self.title,
+            "url": self.url,
+            "publishDate": self.publish_date,
+        }
+        if self.extra:
+            doc.update(self.extra)
+        return doc
+
+
+class DocumentIndex:
+    """Документы в памяти, упорядоченные по дате публикации
+
+    Ключи (дата, номер записи) лежат в отсортированных array('q'): общем и по
+    каждой организации. Последние N, диапазон дат и выборка по организации -
+    бинарный поиск и срез, O(log n + k). Документы без даты ("Дата не указана")
+    считаются самыми старыми; при одной дате новее тот, что добавлен позже.
+    trim() оставляет только самые новые записи (окно кэша DatabaseCache).
+    """
+
+    def __init__(self, documents: Iterable[Dict[str, Any]] = ()):
+        self.organizations = OrganizationTable()
+        self._records: List[DocumentRecord] = []
+        self._keys = array('q')
+        self._by_org: Dict[int, array] = {}
+        self.extend(documents)
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def add(self, doc: Dict[str, Any]):
+        self._add_record(DocumentRecord.from_dict(doc, self.organizations))
+
+    def _add_record(self, record: DocumentRecord):
+        key = (record.publish_key << SEQ_BITS) | len(self._records)
+        self._records.append(record)
+        # Новые документы обычно самые свежие, вставка идет в конец массива
+        if not self._keys or key > self._keys[-1]:
+            self._keys.append(key)
+        else:
+            insort(self._keys, key)
+        org_keys = self._by_org.setdefault(record.org_id, array('q'))
+        if not org_keys or key > org_keys[-1]:
+            org_keys.append(key)
+        else:
+            insort(org_keys, key)
+
+    def extend(self, documents: Iterable[Dict[str, Any]]):
+        for doc in documents:
+            self.add(doc)
+
+    def trim(self, size: int):
+        """Оставляет size самых новых по дате документов, порядок остальных сохраняется"""
+        if len(self._records) <= size:
+            return
+        records = [self._records[key & SEQ_MASK] for key in self._keys[len(self._keys) - size:]]
+        self._records = []
+        self._keys = array('q')
+        self._by_org = {}
+        for record in records:
+            self._add_record(record)
+
+    def _keys_for(self, organization: Optional[str]) -> array:
+        if organization is None:
+            return self._keys
+        org_id = self.organizations.id_of(organization)
+        return self._by_org.get(org_id, array('q')) if org_id is not None else array('q')
+
+    def _documents(self, keys: Iterable[int]) -> List[Dict[str, Any]]:
+        return [self._records[key & SEQ_MASK].to_dict(self.organizations) for key in keys]
+
+    # ==============================
+    # 🔎 ВЫБОРКИ
+    # ==============================
+
+    def count(self, organization: Optional[str] = None) -> int:
+        return len(self._keys_for(organization))
+
+    def recent(self, limit: int, offset: int = 0, organization: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Документы от новых к старым, пропустив offset самых новых"""
+        keys = self._keys_for(organization)
+        end = max(len(keys) - offset, 0)
+        return self._documents(reversed(keys[max(end - limit, 0):end]))
+
+    def between(self, date_from: int = 0, date_to: int = 99991231,
+                organization: Optional[str] = None, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Документы с датой публикации в [date_from, date_to] (ГГГГММДД), от новых к старым"""
+        keys = self._keys_for(organization)
+        start = bisect_left(keys, date_from << SEQ_BITS)
+        end = bisect_right(keys, (date_to << SEQ_BITS) | SEQ_MASK)
+        if limit is not None:
+            start = max(start, end - limit)
+        return self._documents(reversed(keys[start:end]))
+
+    def update_details(self, details: Dict[str, Dict[str, Any]]):
+        """Дописывает доп. поля к документам, которые есть в индексе
+
+        Реквизиты приходят для только что добавленных документов, поэтому
+        поиск идет с конца (без словаря URL → запись) и заканчивается, как
+        только найдены все; документы вне индекса пропускаются.
+        """
+        pending = dict(details)
+        for record in reversed(self._records):
+            fields = pending.pop(record.url, None)
+            if fields:
+                record.extra = {**(record.extra or {}), **fields}
+                if not pending:
+                    break
@@ -0,0 +1,484 @@
+# storage/sqlite_storage.py - хранение в SQLite (WAL) с индексами и счетчиками
+import json
+import os
+import sqlite3
+import logging
+import threading
+import time
+from typing import List, Dict, Any, Set, Iterable, Optional, Tuple
+
+from parsers.urls import document_key
+from storage.base import Storage, DOCUMENT_FIELDS, publish_date_key
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    user_id TEXT PRIMARY KEY
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS subscriptions (
+    user_id TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    value TEXT NOT NULL,
+    position INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, kind, value)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS documents (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    url TEXT NOT NULL UNIQUE,
+    doc_key TEXT,
+    organization TEXT NOT NULL DEFAULT '',
+    documentTitle TEXT NOT NULL DEFAULT '',
+    publishDate TEXT NOT NULL DEFAULT '',
+    publish_key INTEGER NOT NULL DEFAULT 0,
+    extra TEXT
+);
+
+CREATE INDEX IF NOT EXISTS idx_documents_publish ON documents(publish_key, id);
+CREATE INDEX IF NOT EXISTS idx_documents_org_publish ON documents(organization, publish_key, id);
+
+CREATE TABLE IF NOT EXISTS counters (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+) WITHOUT ROWID;
+
+INSERT OR IGNORE INTO counters(name, value) VALUES ('users', 0), ('documents', 0);
+
+CREATE TRIGGER IF NOT EXISTS trg_users_insert AFTER INSERT ON users
+BEGIN UPDATE counters SET value = value + 1 WHERE name = 'users'; END;
+
+CREATE TRIGGER IF NOT EXISTS trg_users_delete AFTER DELETE ON users
+BEGIN UPDATE counters SET value = value - 1 WHERE name = 'users'; END;
+
+CREATE TRIGGER IF NOT EXISTS trg_documents_insert AFTER INSERT ON documents
+BEGIN UPDATE counters SET value = value + 1 WHERE name = 'documents'; END;
+
+CREATE TRIGGER IF NOT EXISTS trg_documents_delete AFTER DELETE ON documents
+BEGIN UPDATE counters SET value = value - 1 WHERE name = 'documents'; END;
+
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS leases (
+    name TEXT PRIMARY KEY,
+    holder TEXT NOT NULL,
+    expires_at REAL NOT NULL
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS broadcast_outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    created_at REAL NOT NULL,
+    documents TEXT NOT NULL
+);
+"""
+
+DOCUMENT_COLUMNS = "organization, documentTitle, url, publishDate, extra"
+
+
+class SqliteStorage(Storage):
+    """Хранилище на SQLite: уникальные индексы по url и ключу документа, O(1) счетчики, пакетные вставки"""
+
+    # WAL и BEGIN IMMEDIATE позволяют работать с базой нескольким процессам
+    shared = True
+
+    def __init__(self, db_file: str = 'data/bot.db',
+                 users_json: str = 'data/users.json',
+                 documents_json: str = 'data/documents.json',
+                 subscriptions_json: str = 'data/subscriptions.json'):
+        self.db_file = db_file
+        self.users_json = users_json
+        self.documents_json = documents_json
+        self.subscriptions_json = subscriptions_json
+        self._conn = None
+        self._lock = threading.RLock()
+
+    def init(self):
+        """Открывает базу, создает схему и переносит данные из JSON (один раз)"""
+        with self._lock:
+            if self._conn is not None:
+                return
+            os.makedirs(os.path.dirname(self.db_file) or '.', exist_ok=True)
+            conn = sqlite3.connect(self.db_file, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=5000")
+            conn.executescript(SCHEMA)
+            self._conn = conn
+            self._migrate_document_keys()
+            self._migrate_from_json()
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.init()
+        return self._conn
+
+    def _transaction(self):
+        """Контекст транзакции BEGIN IMMEDIATE ... COMMIT"""
+        return _Transaction(self._connection())
+
+    # ==============================
+    # 🔁 МИГРАЦИЯ
+    # ==============================
+
+    def _migrate_document_keys(self):
+        """Заполняет doc_key (document_key адреса) и создает по нему уникальный индекс
+
+        Варианты одной ссылки (http/https, параметры) - один документ, как и
+        в DedupIndex. Дубликаты по ключу, сохраненные до появления индекса,
+        удаляются (остается первая запись).
+        """
+        conn = self._conn
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(documents)")}
+        with _Transaction(conn):
+            if 'doc_key' not in columns:
+                conn.execute("ALTER TABLE documents ADD COLUMN doc_key TEXT")
+            rows = conn.execute("SELECT id, url FROM documents WHERE doc_key IS NULL").fetchall()
+            if rows:
+                keys = {}
+                duplicates = []
+                for row_id, url in conn.execute("SELECT id, url FROM documents ORDER BY id"):
+                    key = document_key(url)
+                    if key in keys:
+                        duplicates.append((row_id,))
+                    else:
+                        keys[key] = row_id
+                conn.executemany("DELETE FROM documents WHERE id = ?", duplicates)
+                conn.executemany(
+                    "UPDATE documents SET doc_key = ? WHERE id = ?",
+                    ((key, row_id) for key, row_id in keys.items())
+                )
+                if duplicates:
+                    logger.info(f"🧹 Удалено дубликатов по каноническому адресу: {len(duplicates)}")
+            conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_documents_key ON documents(doc_key)")
+
+    def _migrate_from_json(self):
+        """Однократно импортирует data/users.json, data/documents.json и фильтры подписчиков"""
+        self._migrate_users_and_documents()
+        self._migrate_subscriptions()
+
+    def _migrate_users_and_documents(self):
+        conn = self._conn
+        if conn.execute("SELECT 1 FROM meta WHERE key = 'json_migrated'").fetchone():
+            return
+
+        users = self._read_json(self.users_json) or []
+        documents = self._read_json(self.documents_json) or []
+
+        with _Transaction(conn):
+            conn.executemany(
+                "INSERT OR IGNORE INTO users(user_id) VALUES (?)",
+                ((str(user_id),) for user_id in users)
+            )
+            self._insert_documents(conn, documents)
+            conn.execute("INSERT OR REPLACE INTO meta(key, value) VALUES ('json_migrated', '1')")
+
+        if users or documents:
+            logger.info(f"📦 Перенесено из JSON: {len(users)} пользователей, {len(documents)} документов")
+
+    def _migrate_subscriptions(self):
+        """Импортирует data/subscriptions.json (отдельный флаг: фильтры появились позже)
+
+        Базы, перенесенные из JSON до появления фильтров, тоже получают их
+        при следующем запуске. Подписчики, у которых фильтры уже есть в базе,
+        не трогаются.
+        """
+        conn = self._conn
+        if conn.execute("SELECT 1 FROM meta WHERE key = 'json_subscriptions_migrated'").fetchone():
+            return
+
+        subscriptions = self._read_json(self.subscriptions_json) or {}
+        imported = 0
+        with _Transaction(conn):
+            existing = {row[0] for row in conn.execute("SELECT DISTINCT user_id FROM subscriptions")}
+            for user_id, rule in subscriptions.items():
+                user_id = str(user_id)
+                if user_id in existing:
+                    continue
+                rows = [(user_id, 'sources', value, i)
+                        for i, value in enumerate(dict.fromkeys(rule.get('sources', [])))]
+                rows += [(user_id, 'keywords', value, i)
+                         for i, value in enumerate(dict.fromkeys(rule.get('keywords', [])))]
+                conn.executemany(
+                    "INSERT OR IGNORE INTO subscriptions(user_id, kind, value, position) VALUES (?, ?, ?, ?)",
+                    rows
+                )
+                imported += bool(rows)
+            conn.execute("INSERT OR REPLACE INTO meta(key, value) VALUES ('json_subscriptions_migrated', '1')")
+
+        if imported:
+            logger.info(f"📦 Перенесено из JSON: фильтры {imported} подписчиков")
+
+    @staticmethod
+    def _read_json(path: str):
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            logger.error(f"Ошибка чтения {path} при миграции: {e}")
+            return None
+
+    # ==============================
+    # 📊 ПОЛЬЗОВАТЕЛИ
+    # ==============================
+
+    def load_users(self) -> Set[str]:
+        with self._lock:
+            rows = self._connection().execute("SELECT user_id FROM users").fetchall()
+        return {row[0] for row in rows}
+
+    def save_users(self, users: Set[str]):
+        with self._lock, self._transaction() as conn:
+            conn.execute("DELETE FROM users")
+            conn.executemany("INSERT INTO users(user_id) VALUES (?)", ((u,) for u in users))
+
+    def add_user(self, user_id: str) -> bool:
+        with self._lock:
+            cursor = self._connection().execute(
+                "INSERT OR IGNORE INTO users(user_id) VALUES (?)", (user_id,)
+            )
+            return cursor.rowcount > 0
+
+    def remove_user(self, user_id: str) -> bool:
+        with self._lock, self._transaction() as conn:
+            cursor = conn.execute("DELETE FROM users WHERE user_id = ?", (user_id,))
+            conn.execute("DELETE FROM subscriptions WHERE user_id = ?", (user_id,))
+            return cursor.rowcount > 0
+
+    def user_count(self) -> int:
+        return self._counter('users')
+
+    # ==============================
+    # 🎯 ФИЛЬТРЫ ПОДПИСЧИКОВ
+    # ==============================
+
+    def load_subscriptions(self) -> Dict[str, Dict[str, List[str]]]:
+        with self._lock:
+            rows = self._connection().execute(
+                "SELECT user_id, kind, value FROM subscriptions ORDER BY user_id, kind, position"
+            ).fetchall()
+        subscriptions: Dict[str, Dict[str, List[str]]] = {}
+        for user_id, kind, value in rows:
+            rule = subscriptions.setdefault(user_id, {"sources": [], "keywords": []})
+            rule.setdefault(kind, []).append(value)
+        return subscriptions
+
+    def save_subscription(self, user_id: str, sources: List[str], keywords: List[str]):
+        rows = [(user_id, 'sources', value, i) for i, value in enumerate(dict.fromkeys(sources))]
+        rows += [(user_id, 'keywords', value, i) for i, value in enumerate(dict.fromkeys(keywords))]
+        with self._lock, self._transaction() as conn:
+            conn.execute("DELETE FROM subscriptions WHERE user_id = ?", (user_id,))
+            conn.executemany(
+                "INSERT INTO subscriptions(user_id, kind, value, position) VALUES (?, ?, ?, ?)", rows
+            )
+
+    # ==============================
+    # 📄 ДОКУМЕНТЫ
+    # ==============================
+
+    def load_documents(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._connection().execute(
+                f"SELECT {DOCUMENT_COLUMNS} FROM documents ORDER BY id"
+            ).fetchall()
+        return [self._row_to_document(row) for row in rows]
+
+    def save_documents(self, documents: List[Dict[str, Any]]):
+        with self._lock, self._transaction() as conn:
+            conn.execute("DELETE FROM documents")
+            self._insert_documents(conn, documents)
+
+    def add_documents(self, documents: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        if not documents:
+            return []
+        with self._lock, self._transaction() as conn:
+            return self._insert_documents(conn, documents)
+
+    def update_document_details(self, details: Dict[str, Dict[str, Any]]):
+        with self._lock, self._transaction() as conn:
+            for url, fields in details.items():
+                row = conn.execute("SELECT extra FROM documents WHERE url = ?", (url,)).fetchone()
+                if row is None:
+                    continue
+                extra = json.loads(row[0]) if row[0] else {}
+                extra.update({k: v for k, v in fields.items() if k not in DOCUMENT_FIELDS})
+                conn.execute(
+                    "UPDATE documents SET extra = ? WHERE url = ?",
+                    (json.dumps(extra, ensure_ascii=False), url)
+                )
+
+    def known_urls(self) -> Set[str]:
+        with self._lock:
+            rows = self._connection().execute("SELECT url FROM documents").fetchall()
+        return {row[0] for row in rows}
+
+    def recent_documents(self, limit: int) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._connection().execute(
+                f"SELECT {DOCUMENT_COLUMNS} FROM documents ORDER BY id DESC LIMIT ?", (limit,)
+            ).fetchall()
+        return [self._row_to_document(row) for row in reversed(rows)]
+
+    def documents_page(self, offset: int, limit: int,
+                       organization: Optional[str] = None) -> List[Dict[str, Any]]:
+        # Обход индекса по дате с конца; пропущенные строки не разбираются
+        where, params = ("WHERE organization = ? ", (organization,)) if organization is not None else ("", ())
+        with self._lock:
+            rows = self._connection().execute(
+                f"SELECT {DOCUMENT_COLUMNS} FROM documents {where}"
+                "ORDER BY publish_key DESC, id DESC LIMIT ? OFFSET ?",
+                (*params, limit, offset)
+            ).fetchall()
+        return [self._row_to_document(row) for row in rows]
+
+    def document_count(self, organization: Optional[str] = None) -> int:
+        if organization is None:
+            return self._counter('documents')
+        with self._lock:
+            return self._connection().execute(
+                "SELECT COUNT(*) FROM documents WHERE organization = ?", (organization,)
+            ).fetchone()[0]
+
+    # ==============================
+    # 🤝 НЕСКОЛЬКО ПРОЦЕССОВ
+    # ==============================
+
+    def data_version(self) -> Optional[int]:
+        with self._lock:
+            return self._connection().execute("PRAGMA data_version").fetchone()[0]
+
+    def acquire_lease(self, name: str, holder: str, ttl: float) -> bool:
+        with self._lock, self._transaction() as conn:
+            row = conn.execute("SELECT holder, expires_at FROM leases WHERE name = ?", (name,)).fetchone()
+            now = time.time()
+            if row is not None and row[0] != holder and row[1] > now:
+                return False
+            conn.execute(
+                "INSERT OR REPLACE INTO leases(name, holder, expires_at) VALUES (?, ?, ?)",
+                (name, holder, now + ttl)
+            )
+            return True
+
+    def release_lease(self, name: str, holder: str):
+        with self._lock:
+            self._connection().execute("DELETE FROM leases WHERE name = ? AND holder = ?", (name, holder))
+
+    def enqueue_broadcast(self, documents: List[Dict[str, Any]]) -> int:
+        with self._lock:
+            cursor = self._connection().execute(
+                "INSERT INTO broadcast_outbox(created_at, documents) VALUES (?, ?)",
+                (time.time(), json.dumps(documents, ensure_ascii=False))
+            )
+            return cursor.lastrowid
+
+    def pending_broadcasts(self, after_id: int, limit: int = 100) -> List[Tuple[int, List[Dict[str, Any]]]]:
+        with self._lock:
+            rows = self._connection().execute(
+                "SELECT id, documents FROM broadcast_outbox WHERE id > ? ORDER BY id LIMIT ?",
+                (after_id, limit)
+            ).fetchall()
+        return [(outbox_id, json.loads(documents)) for outbox_id, documents in rows]
+
+    def broadcast_cursor(self, worker: str) -> Optional[int]:
+        with self._lock:
+            row = self._connection().execute(
+                "SELECT value FROM meta WHERE key = ?", (f"outbox_cursor:{worker}",)
+            ).fetchone()
+        return int(row[0]) if row else None
+
+    def save_broadcast_cursor(self, worker: str, outbox_id: int):
+        with self._lock:
+            self._connection().execute(
+                "INSERT OR REPLACE INTO meta(key, value) VALUES (?, ?)",
+                (f"outbox_cursor:{worker}", str(outbox_id))
+            )
+
+    def last_broadcast_id(self) -> int:
+        with self._lock:
+            row = self._connection().execute("SELECT MAX(id) FROM broadcast_outbox").fetchone()
+        return row[0] or 0
+
+    def prune_broadcasts(self, older_than: float) -> int:
+        with self._lock:
+            cursor = self._connection().execute(
+                "DELETE FROM broadcast_outbox WHERE created_at < ?", (time.time() - older_than,)
+            )
+            return cursor.rowcount
+
+    # ==============================
+    # 🔧 ВСПОМОГАТЕЛЬНЫЕ
+    # ==============================
+
+    def _counter(self, name: str) -> int:
+        with self._lock:
+            row = self._connection().execute(
+                "SELECT value FROM counters WHERE name = ?", (name,)
+            ).fetchone()
+        return row[0] if row else 0
+
+    @staticmethod
+    def _insert_documents(conn: sqlite3.Connection,
+                          documents: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Вставляет документы внутри открытой транзакции, возвращает новые"""
+        inserted = []
+        for doc in documents:
+            extra = {k: v for k, v in doc.items() if k not in DOCUMENT_FIELDS}
+            cursor = conn.execute(
+                "INSERT OR IGNORE INTO documents"
+                "(url, doc_key, organization, documentTitle, publishDate, publish_key, extra) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    doc['url'],
+                    document_key(doc['url']),
+                    doc.get('organization', ''),
+                    doc.get('documentTitle', ''),
+                    doc.get('publishDate', ''),
+                    publish_date_key(doc.get('publishDate', '')),
+                    json.dumps(extra, ensure_ascii=False) if extra else None,
+                )
+            )
+            if cursor.rowcount > 0:
+                inserted.append(doc)
+        return inserted
+
+    @staticmethod
+    def _row_to_document(row) -> Dict[str, Any]:
+        organization, title, url, publish_date, extra = row
+        doc = {
+            "organization": organization,
+            "documentTitle": title,
+            "url": url,
+            "publishDate": publish_date,
+        }
+        if extra:
+            doc.update(json.loads(extra))
+        return doc
+
+
+class _Transaction:
+    """BEGIN IMMEDIATE / COMMIT / ROLLBACK для соединения в autocommit-режиме"""
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+
+    def __enter__(self) -> sqlite3.Connection:
+        self.conn.execute("BEGIN IMMEDIATE")
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.conn.execute("COMMIT")
+        else:
+            self.conn.execute("ROLLBACK")
+        return False
@@ -0,0 +1,26 @@
+# tests/conftest.py - общие фикстуры тестов
+import os
+import sys
+
+import pytest
+
+# Тесты импортируют модули бота так же, как main.py (из корня репозитория)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def make_document(number: int, organization: str = "Минпросвещения России",
+                  publish_date: str = "01.01.2024", **extra) -> dict:
+    """Документ в формате архива с URL вида /Document/View/<number>"""
+    doc = {
+        "organization": organization,
+        "documentTitle": f"Приказ № {number}",
+        "url": f"http://publication.pravo.gov.ru/Document/View/{number:016d}",
+        "publishDate": publish_date,
+    }
+    doc.update(extra)
+    return doc
+
+
+@pytest.fixture
+def document():
+    return make_document
@@ -0,0 +1,78 @@
+import asyncio
+import time
+
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import SendMessage
+
+from bot.broadcast import Broadcaster, format_documents_messages
+
+
+class FakeBot:
+    """Запоминает отправленные сообщения; первые flood_errors отправок получают RetryAfter"""
+
+    def __init__(self, flood_errors: int = 0, retry_after: int = 0):
+        self.flood_errors = flood_errors
+        self.retry_after = retry_after
+        self.sent = []
+
+    async def send_message(self, chat_id, text, **kwargs):
+        if self.flood_errors:
+            self.flood_errors -= 1
+            raise TelegramRetryAfter(SendMessage(chat_id=chat_id, text=text), 'Too Many Requests', self.retry_after)
+        self.sent.append((chat_id, text, time.monotonic()))
+
+
+def test_messages_respect_length_and_count(document):
+    documents = [document(n, documentTitle='Приказ ' + 'о' * 1000) for n in range(7)]
+    messages = format_documents_messages(documents, per_message=5)
+
+    assert messages[0].startswith('🔔 <b>Новые документы (7):</b>')
+    assert all(len(message) <= 4096 for message in messages)
+    assert sum(message.count('🔗') for message in messages) == 7
+
+
+def test_chat_interval_holds_between_broadcasts(document):
+    bot = FakeBot()
+    broadcaster = Broadcaster(bot, lambda: ['1', '2'], per_chat_interval=0.2, global_rate=1000)
+
+    async def run():
+        await broadcaster.broadcast([document(1)])
+        await broadcaster.broadcast([document(2)])
+
+    asyncio.run(run())
+    sent_to_first = [sent for chat_id, _, sent in bot.sent if chat_id == 1]
+    assert len(sent_to_first) == 2
+    assert sent_to_first[1] - sent_to_first[0] >= 0.2
+
+
+def test_retry_after_does_not_spend_attempts(document):
+    bot = FakeBot(flood_errors=5)
+    broadcaster = Broadcaster(bot, lambda: ['1'], per_chat_interval=0, max_attempts=3)
+    stats = asyncio.run(broadcaster.broadcast([document(1)]))
+    assert (stats.delivered, stats.failed, stats.retry_after_hits) == (1, 0, 5)
+
+
+def test_flood_wait_is_capped(document):
+    bot = FakeBot(flood_errors=10, retry_after=5)
+    broadcaster = Broadcaster(bot, lambda: ['1'], per_chat_interval=0, max_flood_wait=1)
+    stats = asyncio.run(broadcaster.broadcast([document(1)]))
+    assert (stats.delivered, stats.failed, stats.retry_after_hits) == (0, 1, 1)
+    assert bot.sent == []
+
+
+def test_batches_during_broadcast_are_combined(document):
+    bot = FakeBot()
+    broadcaster = Broadcaster(bot, lambda: ['1', '2'], per_chat_interval=0)
+
+    async def run():
+        broadcaster.start([document(1)])
+        await asyncio.sleep(0)
+        # Пакеты обхода, пришедшие во время первой рассылки, уходят одной следующей
+        broadcaster.start([document(2)])
+        broadcaster.start([document(3)])
+        await broadcaster.join()
+
+    asyncio.run(run())
+    to_first = [text for chat_id, text, _ in bot.sent if chat_id == 1]
+    assert len(to_first) == 2
+    assert 'Новые документы (1)' in to_first[0] and 'Новые документы (2)' in to_first[1]
@@ -0,0 +1,79 @@
+import os
+
+from parsers.urls import canonical_url, document_id, document_key
+from storage.dedup import DedupIndex, HASH_SIZE
+from storage.json_storage import JsonStorage
+
+VIEW_URL = "http://publication.pravo.gov.ru/Document/View/0001202401010001"
+
+
+def test_document_view_variants_share_canonical_url():
+    variants = [
+        VIEW_URL,
+        "https://publication.pravo.gov.ru/Document/View/0001202401010001?index=1",
+        "http://publication.pravo.gov.ru/document/view/0001202401010001#page",
+        "https://mirror.example/Document/View/0001202401010001",
+    ]
+    assert {canonical_url(url) for url in variants} == {VIEW_URL}
+    assert {document_key(url) for url in variants} == {'0001202401010001'}
+    assert canonical_url(variants[1], "http://localhost:8080") == \
+        "http://localhost:8080/Document/View/0001202401010001"
+
+
+def test_other_urls_normalized():
+    assert document_id("http://example.com/news/1") is None
+    assert canonical_url("HTTPS://Example.com:443/list?b=2&a=1#top") == "https://example.com/list?a=1&b=2"
+    assert canonical_url("http://example.com:80") == "http://example.com/"
+
+
+class FakeStorage:
+    def __init__(self, urls):
+        self.urls = set(urls)
+
+    def document_count(self):
+        return len(self.urls)
+
+    def known_urls(self):
+        return set(self.urls)
+
+
+def test_index_add_and_contains():
+    index = DedupIndex(capacity=4)
+    urls = [f"http://publication.pravo.gov.ru/Document/View/{n:016d}" for n in range(3000)]
+    assert index.add(urls) == 3000
+    assert index.add(urls[:10]) == 0
+    assert len(index) == 3000
+    assert all(url in index for url in urls)
+    assert urls[5].replace('http://', 'https://') in index
+    assert "http://publication.pravo.gov.ru/Document/View/9999" not in index
+
+
+def test_index_file_reused_and_rebuilt(tmp_path):
+    path = str(tmp_path / 'dedup.idx')
+    storage = FakeStorage(["http://example.com/1", "http://example.com/2"])
+
+    index = DedupIndex(path).load(storage)
+    index.add(["http://example.com/3"])
+    index.close()
+    storage.urls.add("http://example.com/3")
+    assert os.path.getsize(path) == 3 * HASH_SIZE
+
+    # Размер файла совпадает с числом документов - хранилище не читается
+    storage.known_urls = None
+    index = DedupIndex(path).load(storage)
+    assert "http://example.com/3" in index
+    index.close()
+
+    storage = FakeStorage(["http://example.com/1", "http://example.com/4"])
+    index = DedupIndex(path).load(storage)
+    assert "http://example.com/4" in index and "http://example.com/3" not in index
+    index.close()
+    assert sorted(os.listdir(tmp_path)) == ['dedup.idx']
+
+
+def test_json_storage_compares_document_keys(tmp_path, document):
+    storage = JsonStorage(str(tmp_path / 'users.json'), str(tmp_path / 'documents.json'),
+                          str(tmp_path / 'subscriptions.json'))
+    variant = dict(document(1), url=document(1)['url'].replace('http://', 'https://'))
+    assert storage.add_documents([document(1), variant]) == [document(1)]
+    assert storage.add_documents([variant, document(2)]) == [document(2)]
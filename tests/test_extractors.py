@@ -0,0 +1,34 @@
+import pytest
+
+from benchmarks.synthetic import listing_page
+from parsers.extractors import EXTRACTORS
+from parsers.web_parser import WebParser
+
+CURRENT_URL = WebParser.SOURCE_URLS['federal']
+ORG_NAME = WebParser.ORGANIZATION_NAMES['federal']
+
+
+def parser_for(backend: str) -> WebParser:
+    parser = WebParser(limit=10 ** 6, extractor=backend)
+    if parser.extractor.name != backend:
+        pytest.skip(f"движок {backend} недоступен")
+    return parser
+
+
+@pytest.mark.parametrize('backend', sorted(EXTRACTORS))
+@pytest.mark.parametrize('html', ['', '   ', '<!-- c -->', '<html><body></body></html>'])
+def test_empty_pages_give_empty_result(backend, html):
+    assert parser_for(backend).process_page(html, CURRENT_URL, ORG_NAME) == ([], None)
+
+
+@pytest.mark.parametrize('layout', ['containers', 'links'])
+def test_backends_agree(layout):
+    html = listing_page(20, page=1, pages=3, seed=7, layout=layout)
+    results = {
+        backend: parser_for(backend).process_page(html, CURRENT_URL, ORG_NAME)
+        for backend in EXTRACTORS
+    }
+    expected = results.pop('soup')
+    assert len(expected[0]) == 20
+    for backend, result in results.items():
+        assert result == expected, backend
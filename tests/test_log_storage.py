@@ -0,0 +1,188 @@
+import json
+import os
+
+import pytest
+
+from storage.log_storage import LogStorage
+
+
+def open_storage(tmp_path, **kwargs) -> LogStorage:
+    storage = LogStorage(
+        log_file=str(tmp_path / 'documents.jsonl'),
+        users_file=str(tmp_path / 'users.json'),
+        documents_json=str(tmp_path / 'documents.json'),
+        subscriptions_file=str(tmp_path / 'subscriptions.json'),
+        users_log=str(tmp_path / 'users.jsonl'),
+        **kwargs,
+    )
+    storage.init()
+    return storage
+
+
+def test_reopen_keeps_documents_and_details(tmp_path, document):
+    storage = open_storage(tmp_path, index_interval=3)
+    storage.add_documents([document(n) for n in range(10)])
+    storage.update_document_details({document(4)['url']: {'documentNumber': '12'}})
+    storage.add_documents([document(n) for n in range(8, 12)])
+    storage.close()
+
+    storage = open_storage(tmp_path)
+    assert storage.document_count() == 12
+    assert [d['url'] for d in storage.documents_page(0, 2)] == [document(11)['url'], document(10)['url']]
+    assert storage.documents_page(7, 1)[0]['documentNumber'] == '12'
+    assert storage.load_documents()[4]['documentNumber'] == '12'
+    storage.close()
+
+
+def test_tail_after_checkpoint_is_rescanned(tmp_path, document):
+    storage = open_storage(tmp_path, index_interval=1000)
+    storage.add_documents([document(1)])
+    storage._checkpoint()
+    storage.add_documents([document(2)])
+    # Процесс "упал": контрольная точка и индекс не обновлены после второго пакета
+    storage._append.close()
+
+    storage = open_storage(tmp_path)
+    assert storage.known_urls() == {document(1)['url'], document(2)['url']}
+    storage.close()
+
+
+def test_checkpoint_does_not_grow_with_archive(tmp_path, document):
+    storage = open_storage(tmp_path)
+    storage.add_documents([document(n) for n in range(2000)])
+    storage.close()
+    assert os.path.getsize(storage.checkpoint_file) < 200
+
+
+def test_torn_last_line_is_truncated(tmp_path, document):
+    storage = open_storage(tmp_path)
+    storage.add_documents([document(1), document(2)])
+    storage.close()
+    os.remove(storage.checkpoint_file)
+    with open(storage.log_file, 'ab') as f:
+        f.write(b'{"url":"http://torn')
+
+    storage = open_storage(tmp_path)
+    assert storage.document_count() == 2
+    with open(storage.log_file, 'rb') as f:
+        assert f.read().endswith(b'\n')
+    storage.add_documents([document(3)])
+    assert [d['url'] for d in storage.load_documents()] == [document(n)['url'] for n in (1, 2, 3)]
+    storage.close()
+
+
+def test_corrupt_middle_line_keeps_later_records(tmp_path, document):
+    log_file = tmp_path / 'documents.jsonl'
+    lines = [json.dumps(document(1)), '{"url": "http://broken', json.dumps(document(2))]
+    log_file.write_text('\n'.join(lines) + '\n', encoding='utf-8')
+
+    storage = open_storage(tmp_path)
+    assert storage.known_urls() == {document(1)['url'], document(2)['url']}
+    assert len(storage.load_documents()) == 2
+    storage.close()
+    assert log_file.read_text(encoding='utf-8').count('\n') == 3
+
+
+def test_compaction_folds_details(tmp_path, document):
+    storage = open_storage(tmp_path)
+    storage.add_documents([document(n) for n in range(5)])
+    for n in range(5):
+        storage.update_document_details({document(n)['url']: {'documentNumber': str(n)}})
+    storage.compact()
+    with open(storage.log_file, encoding='utf-8') as f:
+        assert len(f.readlines()) == 5
+    storage.close()
+
+    storage = open_storage(tmp_path)
+    assert [d['documentNumber'] for d in storage.recent_documents(5)] == ['0', '1', '2', '3', '4']
+    storage.close()
+
+
+def test_users_and_filters_are_journaled(tmp_path):
+    (tmp_path / 'users.json').write_text('["1", "2"]', encoding='utf-8')
+    (tmp_path / 'subscriptions.json').write_text(
+        '{"1": {"sources": ["federal"], "keywords": []}}', encoding='utf-8'
+    )
+    storage = open_storage(tmp_path)
+    assert storage.load_users() == {'1', '2'}
+    assert storage.load_subscriptions() == {'1': {'sources': ['federal'], 'keywords': []}}
+    assert storage.add_user('3') and not storage.add_user('3')
+    storage.save_subscription('3', [], ['ФГОС'])
+    assert storage.remove_user('1')
+    storage.close()
+
+    storage = open_storage(tmp_path)
+    assert storage.load_users() == {'2', '3'}
+    assert storage.user_count() == 2
+    assert storage.load_subscriptions() == {'3': {'sources': [], 'keywords': ['ФГОС']}}
+    storage.close()
+
+
+def test_url_variants_are_one_document(tmp_path, document):
+    storage = open_storage(tmp_path)
+    variant = dict(document(1), url=document(1)['url'].replace('http://', 'https://'))
+    assert storage.add_documents([document(1), variant]) == [document(1)]
+    storage.close()
+
+    storage = open_storage(tmp_path)
+    assert storage.add_documents([variant, document(2)]) == [document(2)]
+    storage.close()
+
+
+def test_documents_page_by_publish_date(tmp_path, document):
+    from storage.records import DocumentIndex
+
+    archive = [document(n, publish_date=f"{n % 7 + 1:02d}.02.2024",
+                        organization="Рособрнадзор" if n % 2 else "Минпросвещения России")
+               for n in range(20)]
+    storage = open_storage(tmp_path)
+    storage.add_documents(archive)
+    index = DocumentIndex(archive)
+    assert storage.documents_page(3, 5) == index.recent(5, 3)
+    assert storage.documents_page(0, 4, "Рособрнадзор") == index.recent(4, 0, "Рособрнадзор")
+    assert storage.document_count("Рособрнадзор") == 10
+    storage.close()
+
+
+def test_corrupt_tail_during_compaction_is_skipped(tmp_path, document, monkeypatch):
+    storage = open_storage(tmp_path)
+    storage.add_documents([document(n) for n in range(3)])
+    iter_records = storage._iter_records
+
+    def iter_with_concurrent_writes(*args, **kwargs):
+        # Пока журнал копируется, дописываются документ и поврежденная строка
+        storage.add_documents([document(3)])
+        storage._append.write(b'{"url": "http://broken\n')
+        storage._append.flush()
+        storage._size += len(b'{"url": "http://broken\n')
+        storage.add_documents([document(4)])
+        return iter_records(*args, **kwargs)
+
+    monkeypatch.setattr(storage, '_iter_records', iter_with_concurrent_writes)
+    storage.compact()
+    monkeypatch.undo()
+    assert not os.path.exists(f"{storage.log_file}.compact")
+    assert storage.known_urls() == {document(n)['url'] for n in range(5)}
+    storage.close()
+
+    storage = open_storage(tmp_path)
+    assert [d['url'] for d in storage.load_documents()] == [document(n)['url'] for n in range(5)]
+    storage.close()
+
+
+def test_failed_compaction_removes_temp_file(tmp_path, document, monkeypatch):
+    storage = open_storage(tmp_path)
+    storage.add_documents([document(n) for n in range(3)])
+
+    def broken_swap(*args, **kwargs):
+        raise OSError("диск переполнен")
+
+    monkeypatch.setattr(storage, '_swap', broken_swap)
+    with pytest.raises(OSError):
+        storage.compact()
+    assert not os.path.exists(f"{storage.log_file}.compact")
+    monkeypatch.undo()
+
+    storage.compact()
+    assert len(storage.load_documents()) == 3
+    storage.close()
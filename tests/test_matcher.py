@@ -0,0 +1,76 @@
+from search.matcher import Subscription, SubscriptionMatcher
+
+ORGANIZATIONS = {
+    'federal': 'Минпросвещения России',
+    'regional': 'Минобрнауки Якутии',
+}
+
+
+def titled(document, number: int, title: str, source: str = 'federal') -> dict:
+    return document(number, organization=ORGANIZATIONS[source], documentTitle=title)
+
+
+def test_keywords_match_word_forms(document):
+    matcher = SubscriptionMatcher(ORGANIZATIONS)
+    matcher.set('1', keywords=['аттестация педагогов'])
+
+    assert matcher.match(titled(document, 1, 'О порядке аттестации педагогических работников')) == set()
+    assert matcher.match(titled(document, 2, 'Об аттестации педагогов')) == {'1'}
+
+
+def test_phrase_requires_every_word(document):
+    matcher = SubscriptionMatcher(ORGANIZATIONS)
+    matcher.set('1', keywords=['аттестация педагогов', 'ФГОС'])
+
+    assert matcher.match(titled(document, 1, 'Об аттестации')) == set()
+    assert matcher.match(titled(document, 2, 'Об утверждении ФГОС')) == {'1'}
+
+
+def test_source_and_keywords_combine(document):
+    matcher = SubscriptionMatcher(ORGANIZATIONS)
+    matcher.set('1', sources=['regional'])
+    matcher.set('2', sources=['regional'], keywords=['ФГОС'])
+
+    assert matcher.match(titled(document, 1, 'Об утверждении ФГОС')) == set()
+    assert matcher.match(titled(document, 2, 'Об утверждении ФГОС', 'regional')) == {'1', '2'}
+    assert matcher.match(titled(document, 3, 'О стипендиях', 'regional')) == {'1'}
+
+
+def test_set_replaces_and_remove_clears(document):
+    matcher = SubscriptionMatcher(ORGANIZATIONS)
+    matcher.set('1', keywords=['ФГОС'])
+    matcher.set('1', keywords=['стипендия'])
+
+    assert matcher.match(titled(document, 1, 'Об утверждении ФГОС')) == set()
+    assert matcher.match(titled(document, 2, 'О стипендиях')) == {'1'}
+
+    matcher.remove('1')
+    assert matcher.match(titled(document, 3, 'О стипендиях')) == set()
+    assert matcher.get('1').empty
+
+
+def test_stop_word_keywords_do_not_filter(document):
+    # "/keywords и" не должен отключать рассылку подписчику навсегда
+    assert Subscription(keywords=('и', 'на, в')).empty
+
+    matcher = SubscriptionMatcher(ORGANIZATIONS)
+    matcher.set('1', keywords=['и'])
+    matcher.set('2', sources=['regional'], keywords=['и'])
+    documents = [titled(document, 1, 'О стипендиях'), titled(document, 2, 'О стипендиях', 'regional')]
+
+    deliveries = matcher.route(documents, ['1', '2'])
+    assert deliveries['1'] == documents
+    assert deliveries['2'] == documents[1:]
+
+
+def test_route_skips_recipients_without_matches(document):
+    matcher = SubscriptionMatcher(ORGANIZATIONS)
+    matcher.load({
+        '1': {'sources': [], 'keywords': ['ФГОС']},
+        '2': {'sources': ['regional'], 'keywords': []},
+    })
+    fgos = titled(document, 1, 'Об утверждении ФГОС')
+    other = titled(document, 2, 'О стипендиях')
+
+    deliveries = matcher.route([fgos, other], ['1', '2', '3'])
+    assert deliveries == {'1': [fgos], '3': [fgos, other]}
@@ -0,0 +1,142 @@
+import asyncio
+
+import pytest
+
+from aiogram import Bot, Dispatcher
+from aiogram.types import Update
+from aiohttp import web
+from aiohttp.test_utils import TestClient, TestServer
+
+from bot.middlewares import ConcurrencyLimitMiddleware, LimitedDispatcher
+from bot.webhook import LimitedRequestHandler, WebhookConfig, run_webhook
+
+TOKEN = "42:TEST"
+
+
+def raw_update(update_id: int) -> dict:
+    return {
+        'update_id': update_id,
+        'message': {
+            'message_id': update_id, 'date': 0, 'text': 'привет',
+            'chat': {'id': update_id, 'type': 'private'},
+        },
+    }
+
+
+def blocking_dispatcher(limiter: ConcurrencyLimitMiddleware):
+    """Dispatcher, обработчик которого ждет release; started - номера начатых апдейтов"""
+    dp = LimitedDispatcher(limiter)
+    release = asyncio.Event()
+    started = []
+
+    @dp.message()
+    async def handler(message):
+        started.append(message.message_id)
+        await release.wait()
+
+    return dp, release, started
+
+
+def test_polling_waits_for_free_slot(monkeypatch):
+    async def fake_listen(cls, bot, **kwargs):
+        for update_id in (1, 2):
+            yield Update.model_validate(raw_update(update_id))
+
+    monkeypatch.setattr(Dispatcher, '_listen_updates', classmethod(fake_listen))
+
+    async def run():
+        limiter = ConcurrencyLimitMiddleware(limit=1)
+        dp, release, started = blocking_dispatcher(limiter)
+        bot = Bot(TOKEN)
+        updates = dp._listen_updates(bot)
+
+        first = await updates.__anext__()
+        processing = asyncio.create_task(dp._process_update(bot, first, call_answer=False))
+        second = asyncio.create_task(updates.__anext__())
+        await asyncio.sleep(0.05)
+        # Второй апдейт не читается, пока первый занимает единственный слот
+        assert not second.done() and started == [1] and limiter.pending == 1
+
+        release.set()
+        await processing
+        second_update = await second
+        assert second_update.update_id == 2 and limiter.pending == 1
+        await dp._process_update(bot, second_update, call_answer=False)
+        assert limiter.pending == 0
+        await bot.session.close()
+
+    asyncio.run(run())
+
+
+def test_webhook_answers_only_with_free_slot():
+    async def run():
+        limiter = ConcurrencyLimitMiddleware(limit=2)
+        dp, release, started = blocking_dispatcher(limiter)
+        bot = Bot(TOKEN)
+        app = web.Application()
+        LimitedRequestHandler(dispatcher=dp, bot=bot, limiter=limiter).register(app, path='/webhook')
+
+        async with TestClient(TestServer(app)) as client:
+            requests = [asyncio.create_task(client.post('/webhook', json=raw_update(n))) for n in range(1, 5)]
+            await asyncio.sleep(0.1)
+            # Ответ получили только апдейты, для которых нашелся слот
+            assert sum(request.done() for request in requests) == 2
+            assert len(started) == 2
+            assert limiter.pending == 2
+
+            release.set()
+            responses = await asyncio.gather(*requests)
+            assert all(response.status == 200 for response in responses)
+            assert await limiter.drain(1)
+            assert sorted(started) == [1, 2, 3, 4]
+        await bot.session.close()
+
+    asyncio.run(run())
+
+
+def test_direct_feed_counts_in_middleware():
+    async def run():
+        limiter = ConcurrencyLimitMiddleware(limit=1)
+        dp, release, started = blocking_dispatcher(limiter)
+        bot = Bot(TOKEN)
+        feeds = [asyncio.create_task(dp.feed_raw_update(bot, raw_update(n))) for n in (1, 2)]
+        await asyncio.sleep(0.05)
+        assert started == [1] and limiter.pending == 1
+        release.set()
+        await asyncio.gather(*feeds)
+        assert started == [1, 2] and limiter.pending == 0
+        await bot.session.close()
+
+    asyncio.run(run())
+
+
+def test_webhook_requires_secret():
+    async def run():
+        bot = Bot(TOKEN)
+        with pytest.raises(ValueError):
+            await run_webhook(Dispatcher(), bot, WebhookConfig(port=0))
+        await bot.session.close()
+
+    asyncio.run(run())
+
+
+def test_webhook_rejects_forged_updates():
+    async def run():
+        limiter = ConcurrencyLimitMiddleware(limit=2)
+        dp, release, started = blocking_dispatcher(limiter)
+        release.set()
+        bot = Bot(TOKEN)
+        app = web.Application()
+        LimitedRequestHandler(dispatcher=dp, bot=bot, secret_token='s3cret', limiter=limiter).register(app, path='/webhook')
+
+        async with TestClient(TestServer(app)) as client:
+            forged = await client.post('/webhook', json=raw_update(1))
+            assert forged.status == 401
+            genuine = await client.post('/webhook', json=raw_update(2),
+                                        headers={'X-Telegram-Bot-Api-Secret-Token': 's3cret'})
+            assert genuine.status == 200
+            assert await limiter.drain(1)
+        assert started == [2]
+        await bot.session.close()
+
+    asyncio.run(run())
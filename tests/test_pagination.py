@@ -0,0 +1,35 @@
+from bot.pagination import DocsPage, RenderCache, render_docs_page
+
+
+def test_docs_page_round_trip():
+    for page in (DocsPage(page=3), DocsPage(page=0, source='federal')):
+        assert DocsPage.unpack(page.pack()) == page
+    assert DocsPage.unpack(DocsPage(page=1).pack()).source is None
+
+
+def test_navigation_buttons_keep_source(document):
+    documents = [document(n) for n in range(5)]
+    text, keyboard = render_docs_page(documents, 1, 12, 5, RenderCache(), 'federal')
+
+    assert text.startswith("📄 <b>Документы 6–10 из 12</b>")
+    buttons = keyboard.inline_keyboard[0]
+    assert [button.text for button in buttons] == ["« Новее", "2/3", "Старее »"]
+    targets = [DocsPage.unpack(button.callback_data) for button in buttons]
+    assert [(target.page, target.source) for target in targets] == [(0, 'federal'), (1, 'federal'), (2, 'federal')]
+
+    _, keyboard = render_docs_page(documents, 0, 12, 5, RenderCache())
+    assert DocsPage.unpack(keyboard.inline_keyboard[0][-1].callback_data) == DocsPage(page=1)
+
+
+def test_single_page_has_no_keyboard(document):
+    _, keyboard = render_docs_page([document(1)], 0, 1, 5, RenderCache())
+    assert keyboard is None
+
+
+def test_render_cache_redraws_enriched_document(document):
+    cache = RenderCache(maxsize=1)
+    doc = document(1)
+    cache.render(doc)
+    cache.render(doc)
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert '№ 15' in cache.render(dict(doc, documentNumber='15'))
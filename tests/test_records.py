@@ -0,0 +1,105 @@
+import asyncio
+
+import pytest
+
+from database import DatabaseCache
+from storage.records import DocumentIndex, DocumentRecord, OrganizationTable
+from storage.sqlite_storage import SqliteStorage
+
+FEDERAL = "Минпросвещения России"
+REGIONAL = "Минобрнауки Якутии"
+
+
+def dated(document, number: int, day: int, organization: str = FEDERAL) -> dict:
+    return document(number, organization, f"{day:02d}.01.2024" if day else "Дата не указана")
+
+
+def urls(documents):
+    return [int(doc['url'].rsplit('/', 1)[1]) for doc in documents]
+
+
+def test_record_round_trip(document):
+    organizations = OrganizationTable()
+    doc = document(1, documentNumber='12', pdfUrl='http://example.com/1.pdf')
+    record = DocumentRecord.from_dict(doc, organizations)
+    assert record.to_dict(organizations) == doc
+    assert record.publish_key == 20240101
+    assert DocumentRecord.from_dict(document(2), organizations).org_id == record.org_id
+    assert len(organizations) == 1
+
+
+def test_index_orders_by_publish_date(document):
+    index = DocumentIndex([
+        dated(document, 1, 5), dated(document, 2, 0), dated(document, 3, 9, REGIONAL),
+        dated(document, 4, 5), dated(document, 5, 1, REGIONAL),
+    ])
+    # Без даты - самые старые, при одной дате новее добавленный позже
+    assert urls(index.recent(10)) == [3, 4, 1, 5, 2]
+    assert urls(index.recent(2, offset=1)) == [4, 1]
+    assert urls(index.recent(10, organization=REGIONAL)) == [3, 5]
+    assert index.count(REGIONAL) == 2 and index.count("Рособрнадзор") == 0
+    assert urls(index.between(20240102, 20240109)) == [3, 4, 1]
+    assert urls(index.between(20240101, 20240105, FEDERAL, limit=1)) == [4]
+
+
+def test_trim_keeps_newest_and_details(document):
+    index = DocumentIndex(dated(document, n, n % 28 + 1) for n in range(100))
+    index.update_details({document(27)['url']: {'documentNumber': '27'}})
+    index.trim(10)
+    assert len(index) == 10
+    assert urls(index.recent(10)) == [83, 55, 27, 82, 54, 26, 81, 53, 25, 80]
+    assert index.recent(1, offset=2)[0]['documentNumber'] == '27'
+
+    index.add(dated(document, 200, 28))
+    index.update_details({document(200)['url']: {'documentNumber': '200'}, 'http://missing': {'x': 1}})
+    assert index.recent(1)[0]['documentNumber'] == '200'
+
+
+@pytest.fixture
+def storage(tmp_path):
+    storage = SqliteStorage(str(tmp_path / 'bot.db'), str(tmp_path / 'users.json'),
+                            str(tmp_path / 'documents.json'), str(tmp_path / 'subscriptions.json'))
+    storage.init()
+    yield storage
+    storage.close()
+
+
+def test_cache_serves_old_pages_from_storage(storage, document):
+    archive = [dated(document, n, n % 28 + 1, FEDERAL if n % 3 else REGIONAL) for n in range(60)]
+    storage.save_documents(archive)
+    full = DocumentIndex(archive)
+
+    cache = DatabaseCache(storage, window=8)
+    cache.load()
+    assert len(cache.documents) == 8
+
+    async def pages(organization=None):
+        return [await cache.get_documents_page(offset, 5, organization) for offset in range(0, 60, 5)]
+
+    assert asyncio.run(pages()) == [full.recent(5, offset) for offset in range(0, 60, 5)]
+    assert asyncio.run(pages(REGIONAL)) == [full.recent(5, offset, REGIONAL) for offset in range(0, 60, 5)]
+    assert cache.get_document_count(REGIONAL) == 20
+
+    # Новые документы попадают в окно, при переполнении оно обрезается
+    new = [dated(document, n, 28) for n in range(100, 104)]
+    asyncio.run(cache.add_documents(new))
+    full.extend(new)
+    assert len(cache.documents) == 8
+    assert asyncio.run(pages()) == [full.recent(5, offset) for offset in range(0, 60, 5)]
+    assert cache.get_document_count(FEDERAL) == 44
+
+
+def test_follower_picks_up_documents_and_details(storage, document):
+    storage.save_documents([dated(document, n, 1) for n in range(5)])
+    cache = DatabaseCache(storage, window=100)
+    cache.load()
+
+    # Запись "ведущего" в то же хранилище
+    storage.add_documents([dated(document, 5, 2)])
+    storage.update_document_details({document(3)['url']: {'documentNumber': '3'}})
+    cache._data_version = -1
+    assert cache._reload_shared()
+
+    assert cache.get_document_count() == 6
+    assert urls(cache.get_recent_documents(1)) == [5]
+    assert asyncio.run(cache.get_documents_page(2, 1))[0]['documentNumber'] == '3'
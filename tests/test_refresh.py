@@ -0,0 +1,58 @@
+import asyncio
+
+from database import DatabaseCache
+from main import create_refresher
+from storage.sqlite_storage import SqliteStorage
+
+
+class FakeParser:
+    """Отдает страницы по одной; вторую - только после разрешения"""
+    ORGANIZATION_NAMES = {}
+
+    def __init__(self, pages):
+        self.pages = pages
+        self.deadline_hit = False
+        self.next_page = asyncio.Event()
+
+    async def iter_documents(self, known_urls=None, deadline=None):
+        for page in self.pages:
+            yield page
+            await self.next_page.wait()
+            self.next_page.clear()
+
+
+class FakeBroadcaster:
+    def __init__(self):
+        self.started = []
+
+    def start(self, documents):
+        self.started.append([doc['url'] for doc in documents])
+
+
+def test_batches_are_published_during_crawl(tmp_path, document):
+    storage = SqliteStorage(str(tmp_path / 'bot.db'), str(tmp_path / 'users.json'),
+                            str(tmp_path / 'documents.json'), str(tmp_path / 'subscriptions.json'))
+    storage.init()
+    storage.save_documents([document(1)])
+    db = DatabaseCache(storage)
+    db.load()
+    broadcaster = FakeBroadcaster()
+
+    async def run():
+        parser = FakeParser([[document(1), document(2)], [document(3)]])
+        refresher = create_refresher(db, parser, broadcaster)
+        refresh = asyncio.create_task(refresher.refresh())
+        await asyncio.sleep(0.1)
+        # Первый пакет уже разослан, хотя обход еще не закончен
+        assert not refresh.done()
+        assert broadcaster.started == [[document(2)['url']]]
+
+        parser.next_page.set()
+        await asyncio.sleep(0.1)
+        parser.next_page.set()
+        return await refresh
+
+    result = asyncio.run(run())
+    assert (result.fetched, result.added) == (3, 2)
+    assert broadcaster.started == [[document(2)['url']], [document(3)['url']]]
+    storage.close()
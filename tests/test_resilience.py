@@ -0,0 +1,197 @@
+import asyncio
+import time
+
+import pytest
+import requests
+
+from parsers.async_parser import AsyncWebParser
+from parsers.resilience import (
+    CLOSED, OPEN, HALF_OPEN, SourceGuard, CircuitOpenError, CrawlDeadlineExceeded,
+)
+from parsers.web_parser import WebParser
+
+SOURCE = 'federal'
+
+
+def open_guard(tmp_path, **kwargs) -> SourceGuard:
+    return SourceGuard(str(tmp_path / 'breakers.json'), failure_threshold=2,
+                       open_seconds=60, **kwargs)
+
+
+def trip(guard: SourceGuard):
+    for _ in range(guard.failure_threshold):
+        guard.before_request(SOURCE)
+        guard.record_failure(SOURCE)
+
+
+def expire(guard: SourceGuard):
+    """Срок отключения истек - следующий запрос станет пробным"""
+    guard.sources[SOURCE].opened_until = time.time() - 1
+
+
+def test_open_half_open_closed(tmp_path):
+    guard = open_guard(tmp_path)
+    trip(guard)
+    assert guard.sources[SOURCE].state == OPEN and guard.is_open(SOURCE)
+    with pytest.raises(CircuitOpenError):
+        guard.before_request(SOURCE)
+
+    expire(guard)
+    guard.before_request(SOURCE)
+    assert guard.sources[SOURCE].state == HALF_OPEN
+    # Пока идет проба, остальные запросы отклоняются
+    with pytest.raises(CircuitOpenError):
+        guard.before_request(SOURCE)
+
+    guard.record_success(SOURCE, 0.1)
+    state = guard.sources[SOURCE]
+    assert (state.state, state.failures, state.trips) == (CLOSED, 0, 0)
+    guard.before_request(SOURCE)
+
+
+def test_failed_probe_reopens_for_longer(tmp_path):
+    guard = open_guard(tmp_path)
+    trip(guard)
+    expire(guard)
+    probe = guard.before_request(SOURCE)
+    assert probe
+    guard.record_failure(SOURCE, probe)
+
+    state = guard.sources[SOURCE]
+    assert state.state == OPEN and state.trips == 2
+    assert state.opened_until - time.time() == pytest.approx(120, abs=1)
+
+
+def test_failures_while_open_do_not_extend(tmp_path):
+    guard = open_guard(tmp_path)
+    trip(guard)
+    opened_until = guard.sources[SOURCE].opened_until
+    # Ответы на запросы, начатые до отключения, приходят позже
+    guard.record_failure(SOURCE)
+    guard.record_failure(SOURCE)
+    state = guard.sources[SOURCE]
+    assert state.trips == 1 and state.opened_until == opened_until
+
+
+def test_probe_without_outcome_is_released(tmp_path):
+    guard = open_guard(tmp_path)
+    trip(guard)
+    expire(guard)
+    assert guard.before_request(SOURCE)
+    guard.release_probe(SOURCE)
+    # Следующий запрос снова становится пробным, а не отклоняется навсегда
+    assert guard.before_request(SOURCE)
+    assert guard.sources[SOURCE].state == HALF_OPEN
+
+
+def test_only_probe_owner_decides(tmp_path):
+    guard = open_guard(tmp_path)
+    assert not guard.before_request(SOURCE)   # запрос начат, пока источник включен
+    trip(guard)
+    expire(guard)
+    assert guard.before_request(SOURCE)       # проба
+
+    # Старый запрос завершается ошибкой во время пробы: это не итог пробы
+    guard.record_failure(SOURCE)
+    state = guard.sources[SOURCE]
+    assert (state.state, state.trips, state.probing) == (HALF_OPEN, 1, True)
+    with pytest.raises(CircuitOpenError):
+        guard.before_request(SOURCE)
+
+
+def test_state_survives_restart(tmp_path):
+    guard = open_guard(tmp_path)
+    trip(guard)
+    guard.save()
+
+    guard = open_guard(tmp_path)
+    assert guard.is_open(SOURCE) and guard.sources[SOURCE].trips == 1
+
+    expire(guard)
+    guard.before_request(SOURCE)
+    guard._dirty = True
+    guard.save()
+    # Незавершенная проба после перезапуска снова считается отключением
+    assert open_guard(tmp_path).sources[SOURCE].state == OPEN
+
+
+def half_open_parser(tmp_path, parser_class=WebParser):
+    guard = open_guard(tmp_path)
+    trip(guard)
+    expire(guard)
+    return parser_class(guard=guard), guard
+
+
+def test_deadline_releases_probe(tmp_path):
+    parser, guard = half_open_parser(tmp_path)
+    parser._start_deadline(0.001)
+    time.sleep(0.01)
+
+    with pytest.raises(CrawlDeadlineExceeded):
+        parser._guarded_get('http://example.test/', SOURCE)
+    assert parser.deadline_hit
+    state = guard.sources[SOURCE]
+    assert state.state == HALF_OPEN and not state.probing
+
+
+def test_unexpected_error_releases_probe(tmp_path, monkeypatch):
+    parser, guard = half_open_parser(tmp_path)
+
+    def broken_get(*args, **kwargs):
+        raise ValueError("битый ответ")
+
+    monkeypatch.setattr(parser.session, 'get', broken_get)
+    with pytest.raises(ValueError):
+        parser._guarded_get('http://example.test/', SOURCE)
+    assert not guard.sources[SOURCE].probing
+
+    def failing_get(*args, **kwargs):
+        raise requests.ConnectionError("нет связи")
+
+    monkeypatch.setattr(parser.session, 'get', failing_get)
+    with pytest.raises(requests.ConnectionError):
+        parser._guarded_get('http://example.test/', SOURCE)
+    assert guard.sources[SOURCE].state == OPEN and guard.sources[SOURCE].trips == 2
+
+
+def test_cancelled_async_probe_is_released(tmp_path, monkeypatch):
+    parser, guard = half_open_parser(tmp_path, AsyncWebParser)
+
+    async def hanging_request(*args, **kwargs):
+        await asyncio.sleep(10)
+
+    monkeypatch.setattr(parser, 'request', hanging_request)
+
+    async def run():
+        task = asyncio.create_task(parser.fetch_page('http://example.test/', 'Минпросвещения России', SOURCE))
+        await asyncio.sleep(0.01)
+        assert guard.sources[SOURCE].probing
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(run())
+    assert guard.sources[SOURCE].state == HALF_OPEN and not guard.sources[SOURCE].probing
+
+
+def test_old_request_does_not_release_probe(tmp_path, monkeypatch):
+    guard = open_guard(tmp_path)
+    parser = WebParser(guard=guard)
+    parser._start_deadline(60)
+
+    def slow_get(*args, **kwargs):
+        # Пока запрос шел, источник отключился, и началась проба другого запроса
+        trip(guard)
+        expire(guard)
+        assert guard.before_request(SOURCE)
+        parser._deadline = time.monotonic() - 1
+        raise requests.Timeout("таймаут")
+
+    monkeypatch.setattr(parser, '_request_timeout', lambda source_key: (1.0, True))
+    monkeypatch.setattr(parser.session, 'get', slow_get)
+    monkeypatch.setattr(parser._deadline_session, 'get', slow_get)
+    with pytest.raises(CrawlDeadlineExceeded):
+        parser._guarded_get('http://example.test/', SOURCE)
+    assert guard.sources[SOURCE].probing
+    with pytest.raises(CircuitOpenError):
+        guard.before_request(SOURCE)
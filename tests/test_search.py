@@ -0,0 +1,133 @@
+import pytest
+
+from search.index import SearchIndex, parse_query
+from search.stemmer import normalize, stem, tokenize
+
+ORGANIZATIONS = {
+    'federal': 'Минпросвещения России',
+    'regional': 'Минобрнауки Якутии',
+}
+
+
+def doc(number: int, title: str, publish_date: str = "01.01.2024",
+        organization: str = 'Минпросвещения России') -> dict:
+    return {
+        "organization": organization,
+        "documentTitle": title,
+        "url": f"http://publication.pravo.gov.ru/Document/View/{number:016d}",
+        "publishDate": publish_date,
+    }
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = SearchIndex(str(tmp_path / 'search.db'))
+    yield index
+    index.close()
+
+
+def urls(documents):
+    return [str(int(d['url'].rsplit('/', 1)[1])) for d in documents]
+
+
+# ==============================
+# Стемминг и разбор запроса
+# ==============================
+
+def test_word_forms_share_stem():
+    assert stem('образования') == stem('образование') == stem('образованию')
+    assert stem('аттестации') == stem('аттестация')
+    assert stem('Ёлка') == stem('елка')
+
+
+def test_tokenize_drops_stop_words_and_punctuation():
+    assert tokenize('О порядке и сроках, ФГОС-2024') == ['порядке', 'сроках', 'фгос', '2024']
+
+
+def test_normalize_keeps_unique_stems_in_order():
+    assert normalize('приказ приказы приказа о приказе') == [stem('приказ')]
+
+
+def test_parse_query_filters_and_prefix():
+    query = parse_query('приказы аттест* с:2023 по:31.03.2024 орг:federal', ORGANIZATIONS)
+    assert query.terms == [stem('приказы')]
+    assert query.prefix == 'аттест'
+    assert query.date_from == 20230101
+    assert query.date_to == 20240331
+    assert query.organization == 'Минпросвещения России'
+
+
+def test_parse_query_rejects_unknown_source():
+    with pytest.raises(ValueError):
+        parse_query('приказ орг:минпрос', ORGANIZATIONS)
+
+
+# ==============================
+# Индекс
+# ==============================
+
+def test_all_terms_required_newest_first(index):
+    index.add_documents([
+        doc(1, 'Приказ об аттестации педагогов', '01.02.2023'),
+        doc(2, 'Приказ о порядке аттестации', '01.02.2024'),
+        doc(3, 'Приказ о стандарте', '01.03.2024'),
+    ])
+    assert urls(index.search(parse_query('приказы аттестация'))) == ['2', '1']
+    assert index.search(parse_query('аттестация стандарт')) == []
+    assert index.search(parse_query('отсутствующее')) == []
+
+
+def test_prefix_matches_several_forms_once(index):
+    index.add_documents([
+        doc(1, 'Об образовании и образовательных программах'),
+        doc(2, 'Образовательный стандарт'),
+        doc(3, 'Приказ о стандарте'),
+    ])
+    assert sorted(urls(index.search(parse_query('образоват*')))) == ['1', '2']
+    assert urls(index.search(parse_query('стандарт образоват*'))) == ['2']
+
+
+def test_date_and_source_filters(index):
+    index.add_documents([
+        doc(1, 'Приказ о стандарте', '01.02.2023'),
+        doc(2, 'Приказ о стандарте', '01.02.2024', organization='Минобрнауки Якутии'),
+        doc(3, 'Приказ о стандарте', '01.03.2024'),
+    ])
+    assert urls(index.search(parse_query('стандарт с:2024'))) == ['3', '2']
+    assert urls(index.search(parse_query('стандарт орг:regional', ORGANIZATIONS))) == ['2']
+    # Фильтр сравнивает название целиком, а не подстроку
+    assert index.search(parse_query('стандарт орг:Минпрос')) == []
+
+
+def test_reindexing_is_idempotent(index):
+    assert index.add_documents([doc(1, 'Приказ')]) == 1
+    assert index.add_documents([doc(1, 'Приказ')]) == 0
+    assert index.document_count() == 1
+
+
+@pytest.mark.parametrize('selective_df', [1, 2000])
+def test_common_terms_same_result_on_both_paths(index, selective_df):
+    index.SELECTIVE_DF = selective_df
+    index.add_documents([
+        doc(i, 'Приказ о стандарте' + (' аттестации' if i % 7 == 0 else ''), f"{i % 28 + 1:02d}.01.2024")
+        for i in range(1, 200)
+    ])
+    result = index.search(parse_query('приказ стандарт аттестация'), limit=5)
+    expected = sorted((i for i in range(1, 200) if i % 7 == 0), key=lambda i: (i % 28, i), reverse=True)[:5]
+    assert urls(result) == [str(i) for i in expected]
+    # Пустое пересечение частых терминов
+    assert index.search(parse_query('приказ образоват*'), limit=5) == []
+
+
+def test_rare_prefix_does_not_scan_archive(index):
+    index.add_documents([doc(i, 'Приказ о стандарте') for i in range(1, 3000)])
+    index.add_documents([doc(5000, 'Приказ об аккредитации')])
+    steps = []
+    conn = index._connection()
+    conn.set_progress_handler(lambda: steps.append(1), 100)
+    try:
+        assert urls(index.search(parse_query('приказ аккредит*'))) == ['5000']
+    finally:
+        conn.set_progress_handler(None, 0)
+    # Обход 3000 документов - десятки тысяч инструкций VM
+    assert len(steps) < 100
@@ -0,0 +1,98 @@
+import json
+
+from storage.sqlite_storage import SqliteStorage
+
+
+def write_json(path, data):
+    path.write_text(json.dumps(data, ensure_ascii=False), encoding='utf-8')
+
+
+def open_storage(tmp_path) -> SqliteStorage:
+    storage = SqliteStorage(
+        str(tmp_path / 'bot.db'),
+        str(tmp_path / 'users.json'),
+        str(tmp_path / 'documents.json'),
+        str(tmp_path / 'subscriptions.json'),
+    )
+    storage.init()
+    return storage
+
+
+def test_migrates_users_documents_and_subscriptions(tmp_path, document):
+    write_json(tmp_path / 'users.json', ['1', '2'])
+    write_json(tmp_path / 'documents.json', [document(1), document(2)])
+    write_json(tmp_path / 'subscriptions.json', {'1': {'sources': ['federal'], 'keywords': ['ФГОС']}})
+
+    storage = open_storage(tmp_path)
+    assert storage.load_users() == {'1', '2'}
+    assert storage.document_count() == 2
+    assert storage.load_subscriptions() == {'1': {'sources': ['federal'], 'keywords': ['ФГОС']}}
+    storage.close()
+
+
+def test_subscriptions_migrated_for_database_created_before_filters(tmp_path):
+    write_json(tmp_path / 'users.json', ['1', '2'])
+    storage = open_storage(tmp_path)
+    # База, перенесенная из JSON до появления фильтров
+    storage._conn.execute("DELETE FROM meta WHERE key = 'json_subscriptions_migrated'")
+    storage.save_subscription('2', ['regional'], [])
+    storage.close()
+
+    write_json(tmp_path / 'subscriptions.json', {
+        '1': {'sources': [], 'keywords': ['аттестация']},
+        '2': {'sources': ['federal'], 'keywords': []},
+    })
+    storage = open_storage(tmp_path)
+    subscriptions = storage.load_subscriptions()
+    assert subscriptions['1']['keywords'] == ['аттестация']
+    # Фильтры, уже заданные в SQLite, не перезаписываются
+    assert subscriptions['2']['sources'] == ['regional']
+    storage.close()
+
+
+def test_migration_runs_once(tmp_path):
+    storage = open_storage(tmp_path)
+    storage.close()
+    write_json(tmp_path / 'users.json', ['1'])
+    write_json(tmp_path / 'subscriptions.json', {'1': {'sources': ['federal'], 'keywords': []}})
+
+    storage = open_storage(tmp_path)
+    assert storage.load_users() == set()
+    assert storage.load_subscriptions() == {}
+    storage.close()
+
+
+def test_add_documents_skips_duplicates_and_counts(tmp_path, document):
+    storage = open_storage(tmp_path)
+    assert len(storage.add_documents([document(1), document(2)])) == 2
+    assert [doc['url'] for doc in storage.add_documents([document(2), document(3)])] == [document(3)['url']]
+    assert storage.document_count() == 3
+    assert [doc['url'] for doc in storage.documents_page(0, 2)] == [document(3)['url'], document(2)['url']]
+    storage.close()
+
+
+def test_url_variants_are_one_document(tmp_path, document):
+    storage = open_storage(tmp_path)
+    storage.add_documents([document(1)])
+    variant = dict(document(1), url=document(1)['url'].replace('http://', 'https://') + '?index=2')
+    assert storage.add_documents([variant]) == []
+    assert storage.document_count() == 1
+    storage.close()
+
+
+def test_document_keys_filled_for_old_database(tmp_path, document):
+    storage = open_storage(tmp_path)
+    conn = storage._conn
+    # База до появления doc_key: колонки нет, дубликаты по ключу возможны
+    conn.execute("DROP INDEX idx_documents_key")
+    conn.execute("ALTER TABLE documents DROP COLUMN doc_key")
+    conn.execute("INSERT INTO documents(url, documentTitle) VALUES (?, 'первый')", (document(1)['url'],))
+    conn.execute("INSERT INTO documents(url, documentTitle) VALUES (?, 'копия')",
+                 (document(1)['url'].replace('http://', 'https://'),))
+    storage.close()
+
+    storage = open_storage(tmp_path)
+    assert [doc['documentTitle'] for doc in storage.load_documents()] == ['первый']
+    assert storage.document_count() == 1
+    assert storage.add_documents([document(1), document(2)]) == [document(2)]
+    storage.close()